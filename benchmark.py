@@ -0,0 +1,219 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+# ============================================================================ #
+# Copyright (c) Peter Harrison 2022
+# License: MIT
+# description: Timing benchmarks for the maze editor
+# usage: $ python benchmark.py paint|static|overlays|startup
+# python version >= 3.8
+# ============================================================================ #
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# the benchmarks draw off screen unless told otherwise
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QEvent, QObject, QTimer
+from PyQt5.QtGui import QImage, QPainter, QPixmapCache
+from PyQt5.QtWidgets import QApplication, QStyleOptionGraphicsItem
+
+# the editor modules are imported by the benchmarks that use them, so that they are not loaded before a startup is timed
+
+BENCHMARK_MAZES = {
+    16: 'mazefiles/classic/japan2019.txt',
+    32: 'mazefiles/halfsize/japan2019hef.txt',
+}
+ZOOM_LEVELS = [0.25, 0.5, 1.0, 2.0]
+VIEW_SIZE = 1000  # pixels on each side of the image the maze is drawn into
+
+
+def load_maze(size):
+    """ one of the benchmark maze files, or a synthetic maze for other sizes """
+    from maze import Maze
+    from synthetic import random_maze
+    if size not in BENCHMARK_MAZES:
+        return random_maze(size, loops=0.1, seed=size)
+    with open(BENCHMARK_MAZES[size], 'r') as file:
+        return Maze.parse_maze_file(file)
+
+
+def time_repaints(item, zoom, repeats):
+    """ average time in ms to repaint the item into an image at a zoom level """
+    image = QImage(VIEW_SIZE, VIEW_SIZE, QImage.Format_ARGB32_Premultiplied)
+    option = QStyleOptionGraphicsItem()
+    painter = QPainter(image)
+    painter.scale(zoom * VIEW_SIZE / item.width, zoom * VIEW_SIZE / item.width)
+    item.paint(painter, option, None)  # flood and fill any caches first
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        item.paint(painter, option, None)
+    elapsed = time.perf_counter() - start_time
+    painter.end()
+    return elapsed * 1000 / repeats
+
+
+def paint_benchmark(args):
+    """ repaint time with and without the static layer pixmap """
+    import mazeitem
+    from mazeitem import MazeItem
+    modes = [('none', mazeitem.CACHE_NONE), ('pixmap', mazeitem.CACHE_PIXMAP)]
+    print(f'{"maze":>6} {"zoom":>6}' + ''.join(f'{name:>10}' for name, _ in modes) + '   (ms per repaint)')
+    for size in args.sizes:
+        item = MazeItem()
+        item.set_maze(load_maze(size))
+        for zoom in args.zooms:
+            times = []
+            for _, mode in modes:
+                item.static_cache = mode
+                times.append(time_repaints(item, zoom, args.repeats))
+            print(f'{size:>4}x{size:<2}{zoom:>6}' + ''.join(f'{t:>10.2f}' for t in times))
+
+
+def time_routine(item, routine, repeats, zoom=1.0):
+    """ average time in ms for one drawing routine into an image """
+    image = QImage(VIEW_SIZE, VIEW_SIZE, QImage.Format_ARGB32_Premultiplied)
+    painter = QPainter(image)
+    painter.scale(zoom * VIEW_SIZE / item.width, zoom * VIEW_SIZE / item.width)
+    routine(painter)  # build any cached geometry first
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        routine(painter)
+    elapsed = time.perf_counter() - start_time
+    painter.end()
+    return elapsed * 1000 / repeats
+
+
+def static_benchmark(args):
+    """ time to draw the uncached static layer, routine by routine """
+    from mazeitem import MazeItem
+    print(f'{"maze":>6}{"cells":>10}{"posts":>10}{"walls":>10}{"total":>10}   (ms per draw)')
+    for size in args.sizes:
+        item = MazeItem()
+        item.set_maze(load_maze(size))
+        routines = [item.paint_cells, item.paint_posts, item.paint_walls, item.paint_static]
+        times = [time_routine(item, routine, args.repeats) for routine in routines]
+        print(f'{size:>4}x{size:<2}' + ''.join(f'{t:>10.2f}' for t in times))
+
+
+def overlay_benchmark(args):
+    """ time to draw each overlay at several zoom levels, showing the level of detail cut in """
+    from mazeitem import MazeItem
+    print(f'{"maze":>6} {"zoom":>6}{"heatmap":>10}{"costs":>10}{"arrows":>10}{"path":>10}   (ms per draw)')
+    for size in args.sizes:
+        item = MazeItem()
+        item.set_maze(load_maze(size))
+        item.show_heatmap()
+        item.show_costs()
+        item.show_arrows()
+        item.show_paths()
+        item.ensure_flood()
+        routines = [item.paint_heatmap, item.paint_costs, item.paint_arrows, item.paint_path]
+        for zoom in args.zooms:
+            times = [time_routine(item, routine, args.repeats, zoom) for routine in routines]
+            print(f'{size:>4}x{size:<2}{zoom:>6}' + ''.join(f'{t:>10.2f}' for t in times))
+
+
+class PaintWatcher(QObject):
+    """ notes when a widget is first painted """
+
+    def __init__(self, paint):
+        super().__init__()
+        self.paint = paint
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Paint and self.paint is not None:
+            self.paint()
+            self.paint = None
+        return False
+
+
+def startup_child(args):
+    """
+    start the editor as main.py does and print, as JSON, the milliseconds
+    from the time given until its first paint, its first maze and the end
+    of listing the maze files
+    """
+    import main as editor  # sets the application attributes, which must come before the application
+    app = QApplication(sys.argv[:1])
+    times = {}
+
+    def note(event):
+        times.setdefault(event, (time.time() - args.child) * 1000)
+
+    window = editor.create_window(args.root)
+    watcher = PaintWatcher(lambda: note('paint'))
+    window.installEventFilter(watcher)
+    window.ready.connect(lambda: note('listed'))
+
+    def check():
+        if window.maze_item is not None and window.maze_item.maze is not None:
+            note('maze')
+        if len(times) == 3:
+            poll.stop()
+            window.close()
+            app.quit()
+
+    poll = QTimer()
+    poll.timeout.connect(check)
+    poll.start(1)
+    app.exec_()
+    print(json.dumps(times))
+
+
+def startup_benchmark(args):
+    """ time to first paint, to the first maze and to a full list, starting the editor in a new process each time """
+    if args.child is not None:
+        startup_child(args)
+        return
+    events = ['paint', 'maze', 'listed']
+    print(f'{"run":>6}' + ''.join(f'{event:>10}' for event in events) + '   (ms from starting python)')
+    runs = []
+    for run in range(args.repeats):
+        start_time = time.time()
+        result = subprocess.run([sys.executable, os.path.abspath(__file__), 'startup', '--root', args.root,
+                                 '--child', repr(start_time)],
+                                cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True,
+                                check=True)
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+        print(f'{run + 1:>6}' + ''.join(f'{runs[-1][event]:>10.0f}' for event in events))
+    print(f'{"median":>6}' + ''.join(f'{statistics.median(times[event] for times in runs):>10.0f}'
+                                      for event in events))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Maze editor benchmarks')
+    commands = parser.add_subparsers(dest='command', required=True)
+    paint = commands.add_parser('paint', help='time MazeItem repaints')
+    paint.add_argument('--sizes', type=int, nargs='+', default=sorted(BENCHMARK_MAZES))
+    paint.add_argument('--zooms', type=float, nargs='+', default=ZOOM_LEVELS)
+    paint.add_argument('--repeats', type=int, default=20)
+    paint.set_defaults(run=paint_benchmark)
+    static = commands.add_parser('static', help='time drawing the static layer without a cache')
+    static.add_argument('--sizes', type=int, nargs='+', default=sorted(BENCHMARK_MAZES))
+    static.add_argument('--repeats', type=int, default=20)
+    static.set_defaults(run=static_benchmark)
+    overlays = commands.add_parser('overlays', help='time drawing the costs, arrows and path')
+    overlays.add_argument('--sizes', type=int, nargs='+', default=sorted(BENCHMARK_MAZES))
+    overlays.add_argument('--zooms', type=float, nargs='+', default=ZOOM_LEVELS)
+    overlays.add_argument('--repeats', type=int, default=20)
+    overlays.set_defaults(run=overlay_benchmark)
+    startup = commands.add_parser('startup', help='time from starting the editor to its first paint')
+    startup.add_argument('--root', default='mazefiles', help='directory of maze files to list')
+    startup.add_argument('--repeats', type=int, default=5)
+    startup.add_argument('--child', type=float, help=argparse.SUPPRESS)  # when the timed run started
+    startup.set_defaults(run=startup_benchmark, own_application=True)
+    args = parser.parse_args(argv)
+    if not getattr(args, 'own_application', False):
+        app = QApplication(sys.argv[:1])
+        from layers import PIXMAP_CACHE_LIMIT_KB  # not needed by the startup benchmark
+        QPixmapCache.setCacheLimit(PIXMAP_CACHE_LIMIT_KB)  # as main.create_window sets it
+    args.run(args)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,249 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+# ============================================================================ #
+# Copyright (c) Peter Harrison 2022
+# License: MIT
+# description: Several mazes side by side, with the walls that differ marked
+# python version >= 3.8
+# ============================================================================ #
+import os
+
+import numpy as np
+from PyQt5 import QtCore, QtWidgets
+from PyQt5.QtGui import QColor, QPen
+from PyQt5.QtWidgets import QGraphicsScene
+
+from geometry import to_rects
+from layers import OverlayLayer
+from mazeitem import MazeItem, BLACK, GREEN
+from mazeview import MazeView
+
+ADDED_COLOR = QColor(0, 200, 255)  # walls a maze has that the first one does not
+REMOVED_COLOR = QColor(255, 0, 255)  # walls the first maze has that this one does not
+MAX_COMPARED = 4  # mazes side by side, more get too small to read
+PARTNER_SUFFIXES = ('-pre', '-fin')  # contest mazes are often kept as these two versions
+
+
+def partner_file(file_name):
+    ''' the other version of a contest maze, such as the -fin file of a -pre file, if there is one '''
+    if not file_name:
+        return None
+    stem, extension = os.path.splitext(file_name)
+    for suffix, partner in zip(PARTNER_SUFFIXES, reversed(PARTNER_SUFFIXES)):
+        if stem.endswith(suffix):
+            path = stem[:-len(suffix)] + partner + extension
+            return path if os.path.exists(path) else None
+    return None
+
+
+def wall_diff(reference, maze):
+    """
+    the walls that differ between two mazes of the same size, as boolean
+    arrays over the wall indices of the walls only maze has and of those
+    only reference has. The outer walls are always closed so are left out.
+    """
+    n = maze.size
+    inside = np.ones((2, n, n), dtype=bool)  # by wall index, z then y then x
+    inside[0, :, -1] = False
+    inside[1, -1, :] = False
+    changed = (reference.walls ^ maze.walls) & inside.ravel()
+    return changed & maze.walls, changed & reference.walls
+
+
+def diff_rects(geometry, walls):
+    ''' the scene rectangles of walls given as a mask over the wall indices '''
+    n = geometry.size
+    # rows count down the screen, so row 0 is the north side of the maze
+    east = walls[:n * n].reshape(n, n)[::-1]
+    north = walls[n * n:].reshape(n, n)[::-1]
+    rows, columns = np.nonzero(east)
+    vertical = geometry.vertical_walls[rows, columns + 1]
+    rows, columns = np.nonzero(north)
+    horizontal = geometry.horizontal_walls[rows, columns]
+    return to_rects(np.concatenate([vertical, horizontal]))
+
+
+class CompareMazeView(MazeView):
+    ''' a MazeView that tells the others when it is zoomed or panned so that they can follow '''
+    view_moved = QtCore.pyqtSignal(object)
+
+    def wheelEvent(self, event):
+        super().wheelEvent(event)
+        self.view_moved.emit(self)
+
+    def scrollContentsBy(self, dx, dy):
+        super().scrollContentsBy(dx, dy)
+        self.view_moved.emit(self)
+
+    def follow(self, view):
+        ''' show the scene from the same point at the same scale as another view '''
+        self._zoom = view._zoom
+        self.setTransform(view.transform())
+        # the same scroll bar values put the same point at the top left, exactly where centerOn would round
+        self.horizontalScrollBar().setValue(view.horizontalScrollBar().value())
+        self.verticalScrollBar().setValue(view.verticalScrollBar().value())
+
+
+class ComparePane(QtWidgets.QWidget):
+    """
+    One maze of a comparison: a read only MazeItem with its path, in its own
+    scene and view, under a line giving its path and how it differs from
+    the first maze. The walls it differs by are drawn over it in a layer of
+    their own, with the path of the first maze as a dashed line.
+    """
+
+    def __init__(self, name, maze, solver_name, reference=None, parent=None):
+        super().__init__(parent)
+        self.name = name
+        self.reference = reference  # the pane of the first maze, None for that pane itself
+        self.added_rects = []
+        self.removed_rects = []
+        self.item = MazeItem()
+        self.item.read_only = True
+        self.item.solver_name = solver_name
+        self.item.show_paths()
+        self.item.set_maze(maze)
+        self.item.ensure_flood()
+        self.diff_layer = OverlayLayer(self.item, self.paint_diff)
+        self.scene = QGraphicsScene(self)
+        self.scene.addItem(self.item)
+        self.view = CompareMazeView(self)
+        self.view.setScene(self.scene)
+        self.view.setBackgroundBrush(BLACK)  # as in the editor
+        self.label = QtWidgets.QLabel()
+        self.label.setTextInteractionFlags(QtCore.Qt.TextSelectableByMouse)
+        # wrapped so that a long line does not make the pane wider than the others, and
+        # all the same height so that the mazes line up
+        self.label.setWordWrap(True)
+        self.label.setAlignment(QtCore.Qt.AlignLeft | QtCore.Qt.AlignTop)
+        self.label.setFixedHeight(3 * self.label.fontMetrics().lineSpacing())
+        layout = QtWidgets.QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.label)
+        layout.addWidget(self.view)
+        self.setLayout(layout)
+        self.compare()
+
+    def cells_to_goal(self):
+        ''' the cell count of the shortest path, or None if the goal cannot be reached '''
+        path = self.item.flooder.path
+        return None if path is None else int(self.item.flooder.get_cost_at(*path[0]))
+
+    def compare(self):
+        ''' work out the walls and path that differ from the first maze and describe them '''
+        cells = self.cells_to_goal()
+        text = F'<b>{self.name}</b>: '
+        text += 'no path to the goal' if cells is None else F'{cells} cells, {self.item.path_length}mm'
+        reference = self.reference
+        if reference is None:
+            self.label.setText(text)
+            return
+        maze = self.item.maze
+        if maze.size != reference.item.maze.size:
+            self.label.setText(text + F' ({maze.size}x{maze.size}, not compared)')
+            return
+        added, removed = wall_diff(reference.item.maze, maze)
+        self.added_rects = diff_rects(self.item.geometry, added)
+        self.removed_rects = diff_rects(self.item.geometry, removed)
+        reference_cells = reference.cells_to_goal()
+        if cells is not None and reference_cells is not None:
+            text += F' ({cells - reference_cells:+d} cells, {self.item.path_length - reference.item.path_length:+d}mm)'
+        text += F', {len(self.added_rects) + len(self.removed_rects)} walls differ:'
+        text += F' <span style="color:{ADDED_COLOR.name()}">{len(self.added_rects)} added</span>,'
+        text += F' <span style="color:{REMOVED_COLOR.name()}">{len(self.removed_rects)} removed</span>'
+        self.label.setText(text)
+        self.diff_layer.update()
+
+    def show_diff(self, show):
+        self.diff_layer.setVisible(show)
+
+    def paint_diff(self, painter):
+        if self.reference is None:
+            return
+        item = self.item
+        painter.save()
+        painter.setPen(QPen(BLACK))
+        painter.setBrush(ADDED_COLOR)
+        painter.drawRects(self.added_rects)
+        painter.setBrush(REMOVED_COLOR)
+        painter.drawRects(self.removed_rects)
+        points = None
+        if item.display_paths and item.maze.size == self.reference.item.maze.size:
+            points = self.reference.item.path_points()
+        if points is not None:
+            pen = QPen(GREEN, item.wall_width / 2, QtCore.Qt.DashLine, QtCore.Qt.RoundCap, QtCore.Qt.RoundJoin)
+            painter.setPen(pen)
+            painter.setBrush(QtCore.Qt.NoBrush)
+            painter.setOpacity(0.6)
+            painter.drawPolyline(*points)
+        painter.restore()
+
+
+class CompareWindow(QtWidgets.QWidget):
+    """
+    Shows up to MAX_COMPARED mazes side by side, each compared with the
+    first. Zooming or panning any of them moves all of them together.
+
+    The mazes are drawn with the static layer cache of MazeItem, which
+    keeps its pixmaps in the global pixmap cache keyed by what is drawn,
+    so mazes that are the same share one pixmap, and zooming back to a
+    scale already shown does not draw any of them again.
+    """
+
+    def __init__(self, mazes, solver_name, parent=None):
+        '''
+        :param mazes: (name, maze) pairs, the first of which the others are compared with
+        '''
+        super().__init__(parent, QtCore.Qt.Window)
+        self.setWindowTitle('Compare Mazes - ' + ', '.join(name for name, _ in mazes[:MAX_COMPARED]))
+        self.setAttribute(QtCore.Qt.WA_DeleteOnClose)
+        self.following = False
+        self.panes = []
+        splitter = QtWidgets.QSplitter(QtCore.Qt.Horizontal)
+        for name, maze in mazes[:MAX_COMPARED]:
+            reference = self.panes[0] if self.panes else None
+            pane = ComparePane(name, maze, solver_name, reference)
+            pane.view.view_moved.connect(self.follow)
+            splitter.addWidget(pane)
+            splitter.setStretchFactor(len(self.panes), 1)
+            self.panes.append(pane)
+        # the same scene rectangle everywhere keeps the views in step
+        for pane in self.panes:
+            pane.scene.setSceneRect(self.panes[0].item.boundingRect())
+
+        self.cb_show_diff = QtWidgets.QCheckBox('Show wall differences')
+        self.cb_show_diff.setChecked(True)
+        self.cb_show_diff.toggled.connect(self.show_diff)
+        self.cb_show_paths = QtWidgets.QCheckBox('Show paths')
+        self.cb_show_paths.setChecked(True)
+        self.cb_show_paths.toggled.connect(self.show_paths)
+        controls = QtWidgets.QHBoxLayout()
+        controls.addWidget(self.cb_show_diff)
+        controls.addWidget(self.cb_show_paths)
+        controls.addStretch()
+        layout = QtWidgets.QVBoxLayout()
+        layout.addWidget(splitter)
+        layout.addLayout(controls)
+        self.setLayout(layout)
+        self.resize(480 * len(self.panes), 560)
+
+    def follow(self, view):
+        if self.following:
+            return  # moved by following another view
+        self.following = True
+        for pane in self.panes:
+            if pane.view is not view:
+                pane.view.follow(view)
+        self.following = False
+
+    def show_diff(self, show):
+        for pane in self.panes:
+            pane.show_diff(show)
+
+    def show_paths(self, show):
+        for pane in self.panes:
+            if show:
+                pane.item.show_paths()
+            else:
+                pane.item.hide_paths()
+            pane.diff_layer.update()  # which has the path of the first maze
@@ -0,0 +1,211 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+# ============================================================================ #
+# Copyright (c) Peter Harrison 2022
+# License: MIT
+# description: Connected regions, loops and dead ends of a maze
+# usage: $ python connectivity.py mazefile.txt
+# python version >= 3.8
+# ============================================================================ #
+import sys
+from collections import deque
+
+import numpy as np
+
+from maze import Maze
+from flooding import neighbour_table
+
+
+class Connectivity:
+    """
+    Labels the connected regions of a maze and keeps the labels current while
+    the maze is edited.
+
+    The regions are held as a union-find forest over the cells. Removing a wall
+    can only join two regions so it is a single union. Adding a wall may split
+    a region so the cells either side of it are searched, stopping as soon as
+    the two searches meet.
+    """
+
+    def __init__(self, maze):
+        self.maze = maze
+        self.parent = None  # union-find forest: parent cell of every cell
+        self.passages = 0  # number of open passages between neighbouring cells
+        self.label()
+
+    def label(self):
+        """
+        label every cell with the smallest cell index in its region.
+        Each pass hooks the larger root of every passage onto the smaller one
+        and then jumps pointers until every cell refers directly to its root.
+        """
+        table = neighbour_table(self.maze)
+        cells = np.arange(self.maze.cell_index_size, dtype=np.int32)
+        east = table[Maze.East] >= 0
+        north = table[Maze.North] >= 0
+        a = np.concatenate([cells[east], cells[north]])
+        b = np.concatenate([table[Maze.East][east], table[Maze.North][north]])
+        self.passages = a.size
+        parent = cells.copy()
+        while True:
+            root_a = parent[a]
+            root_b = parent[b]
+            joined = root_a != root_b
+            if not joined.any():
+                break
+            low = np.minimum(root_a[joined], root_b[joined])
+            high = np.maximum(root_a[joined], root_b[joined])
+            np.minimum.at(parent, high, low)
+            parent = self._compress(parent)
+        self.parent = parent
+
+    @staticmethod
+    def _compress(parent):
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                return parent
+            parent = grand
+
+    def find(self, cell):
+        parent = self.parent
+        while parent[cell] != cell:
+            parent[cell] = parent[parent[cell]]
+            cell = parent[cell]
+        return cell
+
+    def union(self, a, b):
+        root_a = self.find(a)
+        root_b = self.find(b)
+        if root_a == root_b:
+            return False
+        self.parent[max(root_a, root_b)] = min(root_a, root_b)
+        return True
+
+    def _wall_cells(self, x, y, z):
+        """ the cells either side of a wall, or None for an outer wall """
+        if z == 0:
+            nx, ny = x + 1, y
+        else:
+            nx, ny = x, y + 1
+        if self.maze.is_outside_maze(nx, ny):
+            return None
+        return self.maze.get_cell_index(x, y), self.maze.get_cell_index(nx, ny)
+
+    def _open_neighbours(self, cell):
+        x, y = cell % self.maze.size, cell // self.maze.size
+        for nx, ny, heading in [
+            [x + 1, y, Maze.East],
+            [x, y + 1, Maze.North],
+            [x - 1, y, Maze.West],
+            [x, y - 1, Maze.South],
+        ]:
+            if self.maze.is_outside_maze(nx, ny) or self.maze.wall(x, y, heading):
+                continue
+            yield self.maze.get_cell_index(nx, ny)
+
+    def _cut_off(self, a, b):
+        """
+        search outwards from both sides of a new wall in step.
+        Returns the cells on the side that ran out of cells first, or
+        None if the two searches met and the region is still connected
+        """
+        owner = {a: 0, b: 1}
+        queues = [deque([a]), deque([b])]
+        sides = [[a], [b]]
+        while True:
+            for side in (0, 1):
+                cell = queues[side].popleft()
+                for next_cell in self._open_neighbours(cell):
+                    seen = owner.get(next_cell)
+                    if seen is None:
+                        owner[next_cell] = side
+                        queues[side].append(next_cell)
+                        sides[side].append(next_cell)
+                    elif seen != side:
+                        return None
+                if not queues[side]:
+                    return sides[side]
+
+    def on_wall_changed(self, x, y, z, closed):
+        """ called by the maze after a wall has been added or removed """
+        cells = self._wall_cells(x, y, z)
+        if cells is None:
+            return
+        a, b = cells
+        if not closed:
+            self.passages += 1
+            self.union(a, b)
+            return
+        self.passages -= 1
+        piece = self._cut_off(a, b)
+        if piece is None:
+            return
+        # the old region becomes the piece that was cut off and the rest
+        old_root = self.find(a)
+        self.parent = self._compress(self.parent)
+        in_piece = np.zeros(self.maze.cell_index_size, dtype=bool)
+        in_piece[piece] = True
+        rest = np.flatnonzero((self.parent == old_root) & ~in_piece)
+        self.parent[in_piece] = min(piece)
+        self.parent[rest] = rest.min()
+
+    def component_ids(self):
+        """ the region id of every cell, in cell index order """
+        self.parent = self._compress(self.parent)
+        return self.parent
+
+    def component_count(self):
+        ids = self.component_ids()
+        return np.count_nonzero(ids == np.arange(ids.size))
+
+    def loop_count(self):
+        """ the number of independent loops: passages - cells + regions """
+        return self.passages - self.maze.cell_index_size + self.component_count()
+
+    def has_loops(self):
+        return self.loop_count() > 0
+
+    def dead_end_count(self):
+        east, north = self.maze.get_passages()
+        exits = east.astype(np.int8) + north
+        exits[:, 1:] += east[:, :-1]
+        exits[1:, :] += north[:-1, :]
+        return np.count_nonzero(exits == 1)
+
+    def start_cell(self):
+        start = self.maze.start if self.maze.start else [[0, 0]]
+        x, y = start[0]
+        return self.maze.get_cell_index(x, y)
+
+    def unreachable_cells(self):
+        """ boolean mask of the cells that cannot be reached from the start """
+        ids = self.component_ids()
+        return ids != ids[self.start_cell()]
+
+    def isolated_area_count(self):
+        """ the number of regions that cannot be reached from the start """
+        return self.component_count() - 1
+
+    def __str__(self):
+        return f'regions: {self.component_count()}\n' + \
+               f'isolated areas: {self.isolated_area_count()}\n' + \
+               f'unreachable cells: {np.count_nonzero(self.unreachable_cells())}\n' + \
+               f'loops: {self.loop_count()}\n' + \
+               f'dead ends: {self.dead_end_count()}'
+
+
+# ============================================================================ #
+# example
+if __name__ == "__main__":
+    # check arguments
+    if len(sys.argv) < 2:
+        print('please specify a maze file.')
+        sys.exit(1)
+
+    # read maze file
+    with open(sys.argv[1], 'r') as file:
+        maze = Maze.parse_maze_file(file)
+
+    print(maze)
+    print(maze.get_connectivity())
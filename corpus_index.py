@@ -0,0 +1,366 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+# ============================================================================ #
+# Copyright (c) Peter Harrison 2022
+# License: MIT
+# description: An index of structural features of every maze file, for searching
+# usage: $ python corpus_index.py [--root mazefiles] [query ...]
+# python version >= 3.8
+# ============================================================================ #
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import numpy as np
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+from connectivity import Connectivity
+from diskcache import cache_dir, write_atomic
+from flooding import Manhattan, neighbour_table, wavefront
+from maze import MAZE_FILE_ERRORS, Maze
+
+INDEX_VERSION = 1  # bump when the features change so that old indexes are rebuilt
+INDEX_CHUNK_SIZE = 16  # maze files handed to a worker process at a time
+INDEX_BATCH_SIZE = 512  # maze files read between checks for being stopped
+
+# the goal region by the third of the maze its centre falls in, south west first
+GOAL_REGIONS = ['sw', 's', 'se', 'w', 'centre', 'e', 'nw', 'n', 'ne']
+GOAL_ALIASES = {'c': 'centre', 'center': 'centre', 'middle': 'centre'}
+
+# field: what it holds, as shown by --fields
+FIELDS = {
+    'size': 'cells along each side of the maze',
+    'goal': 'region holding the goal: ' + ' '.join(GOAL_REGIONS),
+    'goalx': 'x of the centre of the goal cells',
+    'goaly': 'y of the centre of the goal cells',
+    'path': 'steps from cell to cell along the shortest route from the start to the goal, -1 with no route',
+    'turns': 'turns along the shortest route the editor shows',
+    'deadends': 'cells with a single exit',
+    'reach': 'fraction of the cells that can be reached from the start',
+}
+
+OPERATORS = {
+    '<=': np.less_equal,
+    '>=': np.greater_equal,
+    '!=': np.not_equal,
+    '=': np.equal,
+    '<': np.less,
+    '>': np.greater,
+}
+# a query term such as path>100, with nothing after the operator while it is being typed
+QUERY_PATTERN = re.compile(r'^(' + '|'.join(FIELDS) + r')(<=|>=|!=|=|<|>)(.*)$')
+SPACED_OPERATOR_PATTERN = re.compile(r'\s*(<=|>=|!=|=|<|>)\s*')
+
+
+def goal_region(maze, goal_x, goal_y):
+    column = min(int(3 * (goal_x + 0.5) / maze.size), 2)
+    row = min(int(3 * (goal_y + 0.5) / maze.size), 2)
+    return GOAL_REGIONS[3 * row + column]
+
+
+def turn_count(path):
+    ''' the changes of direction along a path of [x, y] cells '''
+    if path is None or len(path) < 3:
+        return 0
+    steps = np.diff(np.asarray(path), axis=0)
+    return int(np.count_nonzero(np.any(steps[1:] != steps[:-1], axis=1)))
+
+
+def maze_features(maze):
+    """ the indexed features of a maze, as a dict by field name """
+    goals = maze.goals or [[maze.size // 2, maze.size // 2]]
+    goal_x, goal_y = np.mean(goals, axis=0)
+    dist = np.empty(maze.cell_index_size, dtype=np.int32)
+    start = maze.start[:1] or [[0, 0]]
+    wavefront(neighbour_table(maze), [maze.get_cell_index(x, y) for x, y in start], dist)
+    reached_goals = [dist[maze.get_cell_index(x, y)] for x, y in maze.goals if dist[maze.get_cell_index(x, y)] >= 0]
+    solver = Manhattan(maze)
+    solver.set_maze(maze)
+    solver.update()
+    return {
+        'size': int(maze.size),
+        'goal': goal_region(maze, goal_x, goal_y),
+        'goalx': float(goal_x),
+        'goaly': float(goal_y),
+        'path': int(min(reached_goals)) if reached_goals else -1,
+        'turns': turn_count(solver.path),
+        'deadends': int(Connectivity(maze).dead_end_count()),
+        'reach': float(np.count_nonzero(dist >= 0) / maze.cell_index_size),
+    }
+
+
+def file_features(path):
+    """ the features of a maze file, or an error message if it cannot be read """
+    try:
+        with open(path, 'r') as file:
+            return maze_features(Maze.parse_maze_file(file))
+    except MAZE_FILE_ERRORS as error:  # a bad file is recorded so that it is not read again until it changes
+        return str(error)
+
+
+def parse_query(text):
+    """
+    split filter text into filename keywords and field terms such as
+    path>100 or goal=ne. Spaces around an operator are allowed. Terms
+    whose value has not been typed yet are dropped.
+
+    :returns: the keywords as one string, and a list of (field, operator, value)
+    """
+    keywords = []
+    terms = []
+    for word in SPACED_OPERATOR_PATTERN.sub(r'\1', text.lower()).split():
+        match = QUERY_PATTERN.match(word)
+        if match is None:
+            keywords.append(word)
+        elif match.group(3):
+            terms.append(match.groups())
+    return ' '.join(keywords), terms
+
+
+class FeatureTable:
+    """
+    The features of a list of names as numpy columns in the same order,
+    so that a query is a few vectorised comparisons. Names that are not
+    indexed, or could not be read, hold NaN and never match a term.
+    """
+
+    def __init__(self, names, entries):
+        self.names = names
+        self.columns = {field: np.full(len(names), np.nan) for field in FIELDS}
+        self.set_rows(range(len(names)), entries)
+
+    def __len__(self):
+        return len(self.names)
+
+    def set_rows(self, rows, entries):
+        ''' take the features of the names in some rows from the entries again '''
+        for row in rows:
+            features = entries.get(self.names[row], {}).get('features') or {}
+            for field, column in self.columns.items():
+                value = features.get(field, np.nan)
+                column[row] = GOAL_REGIONS.index(value) if field == 'goal' and value in GOAL_REGIONS else value
+
+    def moved(self, names, moved, entries):
+        """
+        a table of a new list of names made from this one. moved gives the
+        new row of each old row, or -1 if it was removed, and the names that
+        are new are looked up in the entries
+        """
+        table = FeatureTable([], entries)
+        table.names = names
+        kept = moved >= 0
+        added = np.ones(len(names), dtype=bool)
+        added[moved[kept]] = False
+        for field, column in self.columns.items():
+            table.columns[field] = np.full(len(names), np.nan)
+            table.columns[field][moved[kept]] = column[kept]
+        table.set_rows(np.flatnonzero(added).tolist(), entries)
+        return table
+
+    def matches(self, terms):
+        ''' a mask of the rows that satisfy every (field, operator, value) term '''
+        shown = np.ones(len(self.names), dtype=bool)
+        for field, operator, value in terms:
+            if field == 'goal':
+                value = GOAL_ALIASES.get(value, value)
+                if value not in GOAL_REGIONS:
+                    return np.zeros(len(self.names), dtype=bool)
+                number = GOAL_REGIONS.index(value)
+            else:
+                try:
+                    number = float(value)
+                except ValueError:
+                    return np.zeros(len(self.names), dtype=bool)
+            column = self.columns[field]
+            shown &= ~np.isnan(column) & OPERATORS[operator](column, number)
+        return shown
+
+
+class CorpusIndex:
+    """
+    The features of every maze file under a root directory, by name
+    relative to the root, kept in the per user cache directory. Each entry
+    holds the modification time and size of the file it was made from, so
+    update only reads the files that have changed since the last run.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.entries = {}  # name: {'mtime_ns': ..., 'bytes': ..., 'features': dict or None}
+        self.updated = []  # the names read by the last update
+
+    @property
+    def path(self):
+        key = hashlib.sha1(str(self.root.resolve()).encode('utf-8')).hexdigest()
+        return cache_dir() / 'corpus-index' / (key + '.json')
+
+    def load(self):
+        ''' read the saved index, starting again if it is missing, damaged or out of date '''
+        try:
+            with open(self.path, 'r') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return
+        if data.get('version') == INDEX_VERSION:
+            self.entries = data.get('entries', {})
+
+    def save(self):
+        data = {'version': INDEX_VERSION, 'root': str(self.root.resolve()), 'entries': self.entries}
+        try:
+            write_atomic(self.path, json.dumps(data, separators=(',', ':')).encode('utf-8'))
+        except OSError:
+            pass  # the index is still used, it is just made again next time
+
+    def stale(self, names):
+        ''' the names whose files are not indexed or have changed, with their stat results '''
+        stale = []
+        for name in names:
+            try:
+                info = os.stat(self.root / name)
+            except OSError:
+                continue
+            entry = self.entries.get(name)
+            if entry is None or entry['mtime_ns'] != info.st_mtime_ns or entry['bytes'] != info.st_size:
+                stale.append((name, info))
+        return stale
+
+    def update(self, names, jobs=None, stopped=None):
+        """
+        index the named files that have changed, in worker processes when
+        there are enough of them, forget files that are no longer listed
+        and save the index if anything changed. Files are read in batches
+        and stopped, if given, is asked after each one whether to give up.
+        What was read is kept, so the next update carries on from there.
+
+        :returns: the number of files read
+        """
+        names = [str(name) for name in names]
+        listed = set(names)
+        forgotten = [name for name in self.entries if name not in listed]
+        for name in forgotten:
+            del self.entries[name]
+        stale = self.stale(names)
+        jobs = min(jobs or os.cpu_count() or 1, len(stale) // INDEX_CHUNK_SIZE + 1)
+        pool = None
+        if jobs > 1:
+            # spawned workers do not inherit the threads of a running application
+            pool = ProcessPoolExecutor(jobs, mp_context=multiprocessing.get_context('spawn'))
+        read = 0
+        self.updated = []
+        try:
+            for begin in range(0, len(stale), INDEX_BATCH_SIZE):
+                batch = stale[begin:begin + INDEX_BATCH_SIZE]
+                paths = [str(self.root / name) for name, _ in batch]
+                if pool is None:
+                    results = [file_features(path) for path in paths]
+                else:
+                    results = pool.map(file_features, paths, chunksize=INDEX_CHUNK_SIZE)
+                for (name, info), result in zip(batch, results):
+                    self.entries[name] = {
+                        'mtime_ns': info.st_mtime_ns,
+                        'bytes': info.st_size,
+                        'features': result if isinstance(result, dict) else None,
+                    }
+                read += len(batch)
+                self.updated.extend(name for name, _ in batch)
+                if stopped is not None and stopped():
+                    break
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        if read or forgotten:
+            self.save()
+        return read
+
+    def table(self, names):
+        return FeatureTable([str(name) for name in names], self.entries)
+
+
+class IndexSignals(QObject):
+    finished = pyqtSignal(object, object, int)
+
+
+class IndexTask(QRunnable):
+    """
+    brings the index of a directory up to date on a pool thread and emits
+    finished with the entries, the names that were read and how many there
+    were. The index is
+    loaded from the disk unless the entries it already holds are given, in
+    which case only the names read have changed and otherwise None is sent
+    for them, as anything may have.
+    """
+
+    def __init__(self, root, names, signals, entries=None):
+        super().__init__()
+        self.root = root
+        self.names = [str(name) for name in names]
+        self.signals = signals
+        self.entries = entries
+        self.is_stopped = False
+        self.setAutoDelete(False)  # the window keeps it so that it can be stopped
+
+    def run(self):
+        index = CorpusIndex(self.root)
+        if self.entries is None:
+            index.load()
+        else:
+            index.entries = dict(self.entries)
+        try:
+            read = index.update(self.names, stopped=lambda: self.is_stopped)
+        except (OSError, BrokenProcessPool):  # the worker processes could not be started, or one of them died
+            read = 0
+        self.signals.finished.emit(index.entries, None if self.entries is None else index.updated, read)
+
+    def stop(self):
+        self.is_stopped = True
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Index the maze files and list those matching a query')
+    parser.add_argument('query', nargs='*', help='filename keywords and terms such as path>100 goal=ne')
+    parser.add_argument('--root', default='mazefiles', help='directory of maze files')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='worker processes, 1 to index in this process')
+    parser.add_argument('--fields', action='store_true', help='describe the fields that can be queried')
+    args = parser.parse_args(argv)
+    if args.fields:
+        for field, description in FIELDS.items():
+            print(f'{field:>9}  {description}')
+        return
+
+    root = Path(args.root)
+    names = sorted(str(path.relative_to(root)) for pattern in ['**/*.txt', '**/*.maze']
+                   for path in root.glob(pattern) if path.is_file())
+    index = CorpusIndex(root)
+    start_time = time.perf_counter()
+    index.load()
+    read = index.update(names, args.jobs)
+    elapsed = time.perf_counter() - start_time
+    print(f'{len(names)} mazes indexed, {read} read, in {elapsed:.2f}s', file=sys.stderr)
+
+    keywords, terms = parse_query(' '.join(args.query))
+    table = index.table(names)
+    start_time = time.perf_counter()
+    shown = table.matches(terms)
+    for keyword in keywords.split():
+        shown &= np.array([keyword in name.lower() for name in names], dtype=bool)
+    elapsed = time.perf_counter() - start_time
+    for row in np.flatnonzero(shown):
+        features = index.entries[names[row]]['features']
+        if features is None:
+            print(names[row], 'unreadable')
+            continue
+        print(names[row], ' '.join(f'{field}={features[field]:.2f}' if isinstance(features[field], float)
+                                   else f'{field}={features[field]}' for field in FIELDS))
+    print(f'{np.count_nonzero(shown)} of {len(names)} mazes match, in {elapsed * 1000:.1f}ms', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
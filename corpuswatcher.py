@@ -0,0 +1,195 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+# ============================================================================ #
+# Copyright (c) Peter Harrison 2022
+# License: MIT
+# description: Watches the maze directory for files added, removed or changed
+# python version >= 3.8
+# ============================================================================ #
+import os
+import time
+
+from PyQt5 import QtCore
+from PyQt5.QtCore import QFileSystemWatcher, QObject, pyqtSignal
+
+from mazelist import name_key
+
+MAZE_SUFFIXES = ('.txt', '.maze')  # anything else in the directory is ignored
+WATCH_DELAY_MS = 250  # events in this long are handled together
+MAX_FILE_WATCHES = 8192  # files watched for changes in place, well inside the usual limit on watches
+
+
+def scan_directory(directory):
+    """
+    the maze files directly inside a directory with their stat results,
+    by file name, and the paths of its subdirectories
+    """
+    files = {}
+    subdirectories = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(entry.path)
+                    elif entry.name.endswith(MAZE_SUFFIXES) and entry.is_file():
+                        files[entry.name] = entry.stat()
+                except OSError:
+                    continue  # gone since the directory was listed
+    except OSError:
+        pass
+    return files, subdirectories
+
+
+class CorpusWatcher(QObject):
+    """
+    Keeps track of the maze files under a directory while the editor runs.
+    Every directory is watched, for files being added, removed or replaced,
+    and the files themselves are watched for being written in place, up to
+    MAX_FILE_WATCHES of them.
+
+    Events only mark a directory as changed, and the marked directories
+    are scanned again together once WATCH_DELAY_MS has passed since the
+    first, so a burst of thousands of new files is handled in a few goes.
+    Scans are compared with the last one by modification time and size.
+
+    changed is emitted with the names, relative to the root, of the files
+    added, then of those removed and of those modified, both as dicts
+    holding the stat results the files had before.
+    """
+    changed = pyqtSignal(list, dict, dict)
+
+    def __init__(self, root, parent=None):
+        super().__init__(parent)
+        self.root = os.path.normpath(str(root))
+        self.directories = {}  # the maze files of each directory watched, {file name: stat result}
+        self.dirty = set()  # directories to scan again
+        self.pending = []  # directories still to be scanned for the first time, the next one last
+        self.file_watches = 0
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.mark)
+        self.watcher.fileChanged.connect(self.mark_file)
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(WATCH_DELAY_MS)
+        self.timer.timeout.connect(self.flush)
+
+    def scan(self):
+        ''' watch the whole tree and return the names of the maze files in it, in list order '''
+        self.start_scan()
+        return sorted(self.scan_some(), key=name_key)
+
+    def start_scan(self):
+        ''' start watching the tree, which is scanned a few directories at a time by scan_some '''
+        self.pending = [self.root]
+
+    @property
+    def scanning(self):
+        return bool(self.pending)
+
+    def scan_some(self, seconds=None):
+        '''
+        scan directories still to be scanned, for about some seconds or until
+        they are all done with None, and return the names of the maze files found
+        '''
+        added = []
+        deadline = None if seconds is None else time.perf_counter() + seconds
+        while self.pending and (deadline is None or time.perf_counter() < deadline):
+            directory = self.pending.pop()
+            if directory not in self.directories:
+                self.pending.extend(sorted(self.watch_directory(directory, added), reverse=True))
+        return added
+
+    def names(self, directory, file_names):
+        ''' the names relative to the root of files in a directory '''
+        relative = os.path.relpath(directory, self.root)
+        prefix = '' if relative == os.curdir else relative + os.sep
+        return [prefix + file_name for file_name in file_names]
+
+    def watch_directory(self, directory, added):
+        ''' start watching a directory, adding the names of its files to added, and return its subdirectories '''
+        files, subdirectories = scan_directory(directory)
+        self.directories[directory] = files
+        self.watcher.addPath(directory)
+        self.watch_files(directory, files)
+        added.extend(self.names(directory, files))
+        return subdirectories
+
+    def add_directory(self, directory, added):
+        ''' start watching a directory and everything below it, adding the names of its files to added '''
+        pending = [directory]
+        while pending:
+            directory = pending.pop()
+            if directory not in self.directories:
+                pending.extend(self.watch_directory(directory, added))
+
+    def watch_files(self, directory, file_names):
+        paths = [os.path.join(directory, file_name) for file_name in file_names]
+        paths = paths[:max(0, MAX_FILE_WATCHES - self.file_watches)]
+        if paths:
+            self.file_watches += len(paths) - len(self.watcher.addPaths(paths))
+
+    def forget_directory(self, directory, removed):
+        ''' stop watching a directory that has gone, and everything below it '''
+        prefix = directory + os.sep
+        for known in [known for known in self.directories if known == directory or known.startswith(prefix)]:
+            files = self.directories.pop(known)
+            removed.update(zip(self.names(known, files), files.values()))
+            self.unwatch_files(known, files)
+            self.watcher.removePath(known)
+
+    def unwatch_files(self, directory, file_names):
+        paths = [os.path.join(directory, file_name) for file_name in file_names]
+        if paths:
+            self.file_watches -= len(paths) - len(self.watcher.removePaths(paths))
+
+    def stop(self):
+        ''' stop watching, dropping any changes not handled yet '''
+        self.timer.stop()
+        self.dirty = set()
+        self.pending = []
+        self.watcher.blockSignals(True)
+
+    def mark(self, directory):
+        self.dirty.add(directory)
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def mark_file(self, path):
+        self.mark(os.path.dirname(path))
+
+    def flush(self):
+        ''' scan the directories marked since the last time and emit changed if any files have '''
+        added = []
+        removed = {}
+        modified = {}
+        dirty = sorted(self.dirty)
+        self.dirty = set()
+        for directory in dirty:
+            if directory not in self.directories:
+                continue  # gone with a directory above it
+            if not os.path.isdir(directory):
+                self.forget_directory(directory, removed)
+                continue
+            files, subdirectories = scan_directory(directory)
+            before = self.directories[directory]
+            new = [file_name for file_name in files if file_name not in before]
+            changed = [file_name for file_name, info in files.items() if file_name in before and
+                       (before[file_name].st_mtime_ns != info.st_mtime_ns or before[file_name].st_size != info.st_size)]
+            gone = [file_name for file_name in before if file_name not in files]
+            added.extend(self.names(directory, new))
+            modified.update(zip(self.names(directory, changed), [before[file_name] for file_name in changed]))
+            removed.update(zip(self.names(directory, gone), [before[file_name] for file_name in gone]))
+            self.unwatch_files(directory, gone)
+            # a file replaced by a new one loses its watch along with the old one
+            self.watch_files(directory, new + changed)
+            self.directories[directory] = files
+            listed = set(subdirectories)
+            for known in [known for known in self.directories
+                          if os.path.dirname(known) == directory and known not in listed]:
+                self.forget_directory(known, removed)
+            for subdirectory in subdirectories:
+                if subdirectory not in self.directories:
+                    self.add_directory(subdirectory, added)
+        if added or removed or modified:
+            self.changed.emit(added, removed, modified)
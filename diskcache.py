@@ -0,0 +1,74 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+# ============================================================================ #
+# Copyright (c) Peter Harrison 2022
+# License: MIT
+# description: Files derived from maze files, cached on disk between runs
+# python version >= 3.8
+# ============================================================================ #
+import hashlib
+import os
+import sys
+import threading
+from pathlib import Path
+
+APPLICATION_NAME = 'pyqt_maze_editor'
+
+
+def cache_dir():
+    """
+    the per user cache directory for the editor, following the platform
+    conventions. MAZE_EDITOR_CACHE overrides it.
+    """
+    override = os.environ.get('MAZE_EDITOR_CACHE')
+    if override:
+        return Path(override)
+    if sys.platform.startswith('win'):
+        base = os.environ.get('LOCALAPPDATA') or Path.home() / 'AppData' / 'Local'
+    elif sys.platform == 'darwin':
+        base = Path.home() / 'Library' / 'Caches'
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+    return Path(base) / APPLICATION_NAME
+
+
+def source_key(source, info=None):
+    """
+    a key that changes whenever the source file is edited, made from its
+    full path, size and modification time. info gives the stat result to
+    use, for the key of a version of the file that has since changed
+    """
+    source = Path(source).resolve()
+    if info is None:
+        info = source.stat()
+    text = f'{source}|{info.st_size}|{info.st_mtime_ns}'
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def cache_path(kind, source, suffix, info=None):
+    """
+    where to cache a file of one kind made from a source file, for example
+    cache_path('thumbnails-64', 'mazefiles/classic/japan2019.txt', '.png').
+    Returns None if the source cannot be read
+    """
+    try:
+        key = source_key(source, info)
+    except OSError:
+        return None
+    return cache_dir() / kind / key[:2] / (key + suffix)
+
+
+def write_atomic(path, data, sync=False):
+    """
+    write bytes to a cache file so that readers never see half a file.
+    With sync the data is on the disk before the file is replaced
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    with open(temp, 'wb') as file:
+        file.write(data)
+        if sync:
+            file.flush()
+            os.fsync(file.fileno())
+    os.replace(temp, path)
@@ -7,28 +7,253 @@
 # usage: $ python maze_step_map.py mazefile.maze
 # python version >= 3.8
 # ============================================================================ #
+import math
 import sys
 import numpy as np
 from itertools import product
 from maze import Maze
+from instrumentation import timed
 
 
-class Manhattan:
+def neighbour_table(maze, walls=None, out=None, offset=0):
     """
-    Simple costs based on the cell count to the goal
+    build a (4, cells) table of the cell reached by one step from each cell.
+    Rows are in heading order: East, North, West, South. Blocked moves hold -1
+
+    walls replaces the wall array of the maze, for example to decide how
+    unknown walls are treated. When out is given it is filled in place.
+    offset is added to every cell index so that tables can be stacked
+    side by side and searched together.
+    """
+    size = maze.size
+    cells = maze.cell_index_size
+    walls = maze.walls if walls is None else walls
+    if out is None:
+        out = np.empty((4, cells), dtype=np.int32)
+    east = ~walls[:cells].reshape(size, size)
+    north = ~walls[cells:].reshape(size, size)
+    east[:, -1] = False
+    north[-1, :] = False
+    east = east.ravel()
+    north = north.ravel()
+    index = np.arange(offset, offset + cells, dtype=np.int32)
+    out.fill(-1)
+    np.copyto(out[Maze.East], index + 1, where=east)
+    np.copyto(out[Maze.North], index + size, where=north)
+    np.copyto(out[Maze.West][1:], index[:-1], where=east[:-1])
+    np.copyto(out[Maze.South][size:], index[:-size], where=north[:-size])
+    return out
+
+
+def wavefront(neighbours, seeds, dist):
+    """
+    vectorised breadth first search over a neighbour table.
+    Each pass expands a whole level of the search at once.
+    dist is filled in place with the step count from the nearest seed, or -1
+    where no seed can be reached.
+
+    :returns: list of cell index arrays, one per level
+    """
+    dist.fill(-1)
+    frontier = np.unique(np.asarray(seeds, dtype=np.int32))
+    dist[frontier] = 0
+    levels = []
+    level = 0
+    while frontier.size:
+        levels.append(frontier)
+        level += 1
+        reached = neighbours[:, frontier].ravel()
+        reached = reached[reached >= 0]
+        frontier = np.unique(reached[dist[reached] < 0])
+        dist[frontier] = level
+    return levels
+
+
+class FloodResult:
+    """
+    The output of a solver, held in typed arrays that are kept between floods
+    so that nothing is allocated while editing.
+
+    cost holds the step count to the goal for each cell, np.inf where it is
+    not known. heading holds the direction to leave each cell along the path
+    and Maze.Unknown elsewhere. The first path_length rows of path_cells are
+    the x, y coordinates of the path from the start to the goal and
+    path_mask marks the cells on it.
+
+    remember() keeps a copy of the result so that after the next flood
+    changed_cells() can report which cells are different.
+    """
+
+    def __init__(self, cells=0):
+        self.cost = None
+        self.heading = None
+        self.path_cells = None
+        self.path_mask = None
+        self.path_length = 0
+        self.previous_cost = None
+        self.previous_heading = None
+        self.previous_path = None
+        self.resize(cells)
+
+    def resize(self, cells):
+        if self.cost is not None and self.cost.size == cells:
+            return
+        self.cost = np.full(cells, np.inf, dtype=np.float32)
+        self.heading = np.full(cells, Maze.Unknown, dtype=np.int8)
+        self.path_cells = np.zeros((cells, 2), dtype=np.int32)
+        self.path_mask = np.zeros(cells, dtype=bool)
+        self.path_length = 0
+
+    def clear(self):
+        self.cost.fill(np.inf)
+        self.heading.fill(Maze.Unknown)
+        self.clear_path()
+
+    def clear_path(self):
+        self.path_mask.fill(False)
+        self.path_length = 0
+
+    @property
+    def size(self):
+        """ the number of cells along each side of the maze """
+        return math.isqrt(self.cost.size)
+
+    @property
+    def path(self):
+        """ view of the path cells in use """
+        return self.path_cells[:self.path_length]
+
+    def set_path(self, path):
+        """ store a path given as a list of [x, y] cells """
+        self.clear_path()
+        self.path_length = len(path)
+        if path:
+            self.path_cells[:self.path_length] = path
+            self.path_mask[self.path_cells[:self.path_length, 1] * self.size + self.path_cells[:self.path_length, 0]] = True
+
+    def copy_from(self, other):
+        """ take the costs, headings and path of another result, keeping these arrays """
+        self.resize(other.cost.size)
+        np.copyto(self.cost, other.cost)
+        np.copyto(self.heading, other.heading)
+        np.copyto(self.path_cells, other.path_cells)
+        np.copyto(self.path_mask, other.path_mask)
+        self.path_length = other.path_length
+
+    def remember(self):
+        """ keep a copy of the current result to compare the next flood with """
+        if self.previous_cost is None or self.previous_cost.size != self.cost.size:
+            self.previous_cost = self.cost.copy()
+            self.previous_heading = self.heading.copy()
+        else:
+            np.copyto(self.previous_cost, self.cost)
+            np.copyto(self.previous_heading, self.heading)
+        self.previous_path = self.path.copy()
+
+    def changed_cells(self):
+        """
+        boolean mask of the cells whose cost or heading differ from the
+        remembered result, or None if there is nothing to compare with
+        """
+        if self.previous_cost is None or self.previous_cost.size != self.cost.size:
+            return None
+        return (self.cost != self.previous_cost) | (self.heading != self.previous_heading)
+
+    def path_changed(self):
+        if self.previous_path is None:
+            return True
+        return not np.array_equal(self.path, self.previous_path)
+
+    def set_route(self, cells, size):
+        """
+        store a route given as a list of cell indexes from the start to the
+        goal, filling in the costs and headings of the cells along it
+        """
+        cells = np.asarray(cells, dtype=np.int32)
+        self.clear_path()
+        self.path_mask[cells] = True
+        self.path_length = cells.size
+        self.path_cells[:cells.size, 0] = cells % size
+        self.path_cells[:cells.size, 1] = cells // size
+        self.cost[cells] = np.arange(cells.size - 1, -1, -1)
+        steps = np.diff(cells)
+        headings = np.select([steps == 1, steps == size, steps == -1],
+                             [Maze.East, Maze.North, Maze.West], Maze.South)
+        self.heading[cells[:-1]] = headings
+
+
+# solvers by display name, filled in by the register_solver decorator
+SOLVERS = {}
+
+
+def register_solver(name):
+    """ class decorator that adds a solver to SOLVERS """
+
+    def register(cls):
+        SOLVERS[name] = cls
+        return cls
+
+    return register
+
+
+class Solver:
+    """
+    Common parts of the solvers. Each solver floods its maze into a
+    FloodResult with its update method, and keeps the result for as long
+    as the maze size stays the same
     """
 
     def __init__(self, maze):
         self.maze = None
+        self.result = FloodResult()
+        self.expansions = 0  # cells taken from the open list by the last flood
+
+    def set_maze(self, maze):
+        self.maze = maze
+        self.result.resize(maze.cell_index_size)
+
+    def start_cell(self):
+        ''' the index of the first start cell of the maze, or of the bottom left cell if it has none '''
+        x, y = self.maze.start[0] if self.maze.start else (0, 0)
+        return self.maze.get_cell_index(x, y)
+
+    @property
+    def path(self):
+        if self.result.path_length == 0:
+            return None
+        return self.result.path
+
+    def get_cost_at(self, x, y):
+        if self.maze.is_outside_maze(x, y):
+            return np.inf
+        return self.result.cost[self.maze.get_cell_index(x, y)]
+
+    def get_heading(self, x, y):
+        return self.result.heading[self.maze.get_cell_index(x, y)]
+
+
+@register_solver('Manhattan')
+class Manhattan(Solver):
+    """
+    Simple costs based on the cell count to the goal
+    """
+
+    def __init__(self, maze):
+        super().__init__(maze)
         self.step_map = None
         self.heading_map = None
-        self.path = None
+        self.neighbours = None
+        self.dist = None
 
     def set_maze(self, maze):
-        self.maze = maze
-        self.step_map = [np.inf] * maze.cell_index_size
-        self.heading_map = [Maze.Unknown] * maze.cell_index_size
+        super().set_maze(maze)
+        self.step_map = self.result.cost
+        self.heading_map = self.result.heading
+        if self.dist is None or self.dist.size != maze.cell_index_size:
+            self.neighbours = np.empty((4, maze.cell_index_size), dtype=np.int32)
+            self.dist = np.empty(maze.cell_index_size, dtype=np.int32)
 
+    @timed()
     def update(self, roots=None):
         if self.maze is None:
             return
@@ -40,48 +265,14 @@ class Manhattan:
         """
         calculate cost map of cells using breadth first search
         """
-        # prepare
         maze = self.maze
-        step_map = self.step_map
         roots = roots if roots else maze.goals
-        # initialize
-        for c in step_map:
-            c = np.inf
-        open_list = []
-        for x, y in roots:
-            step_map[maze.get_cell_index(x, y)] = 0
-            open_list.append([x, y])
-        # breadth first search
-        while open_list:
-            x, y = open_list.pop(0)
-            i = maze.get_cell_index(x, y)
-            cost_here = step_map[i]
-            next_cost = cost_here + 1
-
-            # update neighbors
-            for nx, ny, nd in [
-                [x, y + 1, Maze.North],
-                [x + 1, y, Maze.East],
-                [x, y - 1, Maze.South],
-                [x - 1, y, Maze.West],
-            ]:
-                # see if the next cell can be visited
-                if maze.wall(x, y, nd):
-                    continue
-                next_i = maze.get_cell_index(nx, ny)
-                neighbour_cost = step_map[next_i]
-                if neighbour_cost <= next_cost:
-                    continue
-                step_map[next_i] = next_cost
-                open_list.append([nx, ny])
-        self.step_map = step_map
-        return step_map
-
-    def get_cost_at(self, x, y):
-        if self.maze.is_outside_maze(x, y):
-            return np.inf
-        cost = self.step_map[self.maze.get_cell_index(x, y)]
-        return cost
+        neighbour_table(maze, out=self.neighbours)
+        levels = wavefront(self.neighbours, [maze.get_cell_index(x, y) for x, y in roots], self.dist)
+        self.expansions = sum(level.size for level in levels)
+        np.copyto(self.step_map, self.dist)
+        self.step_map[self.dist < 0] = np.inf
+        return self.step_map
 
     def get_neighbour_cost(self, x, y, heading):
         if self.maze.wall(x, y, heading):
@@ -122,20 +313,18 @@ class Manhattan:
         self.heading_map = heading_map
         return heading_map
 
-    def get_heading(self,x,y):
-        i = self.maze.get_cell_index(x, y)
-        return self.heading_map[i]
-
     def update_path_map(self):
         if self.maze is None:
             return
-        self.heading_map = [Maze.Unknown] * self.maze.cell_index_size
-        if self.step_map[0] == np.inf:
-            self.heading_map[0] = Maze.South
+        self.heading_map.fill(Maze.Unknown)
+        self.result.clear_path()
+        start = self.start_cell()
+        if self.step_map[start] == np.inf:
+            self.heading_map[start] = Maze.South
             return
-        self.heading_map[0] = Maze.North
+        self.heading_map[start] = Maze.North
         last_heading = Maze.North
-        x,y = self.maze.get_cell_xy(0)
+        x,y = self.maze.get_cell_xy(start)
         path = [[x,y]]
         while not [x,y] in self.maze.goals:
             i = self.maze.get_cell_index(x,y)
@@ -152,7 +341,7 @@ class Manhattan:
             elif direction == Maze.West:
                 x = x - 1
             path.append([x,y])
-        self.path = path
+        self.result.set_path(path)
         return path
 
 
@@ -162,7 +351,7 @@ class Manhattan:
         for y in reversed(range(maze.size)):
             for x in range(maze.size):
                 c = self.step_map[maze.get_cell_index(x, y)]
-                res += f'{c:>4}'
+                res += f'{c:>4.0f}'
             res += '\n'
         return res
 
@@ -170,26 +359,317 @@ class Manhattan:
         return self.step_map[key]
 
 
+def trace_back(steps, cost, cell):
+    """
+    follow the step counts in cost back down to zero from a cell. steps are
+    the four rows of a neighbour table.
+
+    :returns: list of cell indexes, ending with the cell given
+    """
+    cells = [cell]
+    while cost[cell] > 0:
+        for row in steps:
+            next_cell = row[cell]
+            if next_cell >= 0 and cost[next_cell] == cost[cell] - 1:
+                cell = next_cell
+                break
+        cells.append(cell)
+    cells.reverse()
+    return cells
+
+
+@register_solver('A*')
+class AStar(Solver):
+    """
+    A* search from the start cell to the nearest goal cell.
+
+    The heuristic is the Manhattan distance to the rectangle holding the goal
+    cells so it never overestimates. Every step costs one cell, so a neighbour
+    has an estimated total of zero, one or two more than the cell being
+    expanded. That lets the open list be three fixed size stacks of cell
+    indexes, one for each of those totals, rather than a heap of python objects.
+    The moves and the heuristic are worked out for every cell with numpy
+    before the search, which only looks them up.
+    """
+
+    def __init__(self, maze):
+        super().__init__(maze)
+        self.cost = None  # steps from the start, -1 where not yet reached
+        self.closed = None
+        self.open_stacks = None
+        self.neighbours = None
+        self.estimate = None  # the heuristic for each cell
+        self.is_goal = None
+
+    def set_maze(self, maze):
+        super().set_maze(maze)
+        cells = maze.cell_index_size
+        if self.cost is None or self.cost.size != cells:
+            self.cost = np.full(cells, -1, dtype=np.int32)
+            self.closed = np.zeros(cells, dtype=bool)
+            self.open_stacks = np.zeros((3, cells), dtype=np.int32)
+            self.neighbours = np.empty((4, cells), dtype=np.int32)
+            self.estimate = np.empty(cells, dtype=np.int32)
+            self.is_goal = np.zeros(cells, dtype=bool)
+
+    def update_estimate(self):
+        ''' the Manhattan distance from every cell to the rectangle around the goals '''
+        size = self.maze.size
+        goals = np.array(self.maze.goals)
+        low_x, low_y = goals.min(axis=0)
+        high_x, high_y = goals.max(axis=0)
+        line = np.arange(size)
+        across = np.maximum(np.maximum(low_x - line, line - high_x), 0)
+        up = np.maximum(np.maximum(low_y - line, line - high_y), 0)
+        np.add(up[:, None], across[None, :], out=self.estimate.reshape(size, size))  # indexed [y, x]
+
+    @timed()
+    def update(self):
+        if self.maze is None:
+            return
+        self.result.clear()
+        self.expansions = 0
+        if not self.maze.goals:
+            return
+        neighbour_table(self.maze, out=self.neighbours)
+        self.update_estimate()
+        self.is_goal.fill(False)
+        self.is_goal[[self.maze.get_cell_index(x, y) for x, y in self.maze.goals]] = True
+        self.cost.fill(-1)
+        self.closed.fill(False)
+        steps = [memoryview(row) for row in self.neighbours]
+        estimate = memoryview(self.estimate)
+        cost = memoryview(self.cost)
+        closed = memoryview(self.closed)
+        goal = memoryview(self.is_goal)
+        stacks = [memoryview(stack) for stack in self.open_stacks]
+        tops = [0, 0, 0]
+        start = self.start_cell()
+        cost[start] = 0
+        total = estimate[start]
+        stacks[total % 3][0] = start
+        tops[total % 3] = 1
+        found = -1
+        while True:
+            bucket = total % 3
+            if tops[bucket] == 0:
+                if not any(tops):
+                    break
+                total += 1
+                continue
+            tops[bucket] -= 1
+            cell = stacks[bucket][tops[bucket]]
+            if closed[cell]:
+                continue
+            closed[cell] = True
+            self.expansions += 1
+            if goal[cell]:
+                found = cell
+                break
+            next_cost = cost[cell] + 1
+            for row in steps:
+                next_cell = row[cell]
+                if next_cell < 0 or closed[next_cell]:
+                    continue
+                if 0 <= cost[next_cell] <= next_cost:
+                    continue
+                cost[next_cell] = next_cost
+                next_bucket = (next_cost + estimate[next_cell]) % 3
+                stacks[next_bucket][tops[next_bucket]] = next_cell
+                tops[next_bucket] += 1
+        if found < 0:
+            return
+        self.result.set_route(trace_back(steps, cost, found), self.maze.size)
+        return self.path
+
+
+@register_solver('Bidirectional BFS')
+class BidirectionalBFS(Solver):
+    """
+    Breadth first search from the start and from the goal cells at the same
+    time, always growing the side with the smaller frontier by one whole level.
+    The search stops at the end of the first level where the two sides meet.
+
+    Each side keeps its step counts and its queue in flat int32 arrays, and
+    the moves from each cell are looked up in a neighbour table.
+    """
+
+    def __init__(self, maze):
+        super().__init__(maze)
+        self.from_start = None
+        self.to_goal = None
+        self.queues = None
+        self.neighbours = None
+
+    def set_maze(self, maze):
+        super().set_maze(maze)
+        cells = maze.cell_index_size
+        if self.queues is None or self.queues.shape[1] != cells:
+            self.from_start = np.full(cells, -1, dtype=np.int32)
+            self.to_goal = np.full(cells, -1, dtype=np.int32)
+            self.queues = np.zeros((2, cells), dtype=np.int32)
+            self.neighbours = np.empty((4, cells), dtype=np.int32)
+
+    @timed()
+    def update(self):
+        if self.maze is None:
+            return
+        self.result.clear()
+        self.expansions = 0
+        if not self.maze.goals:
+            return
+        size = self.maze.size
+        neighbour_table(self.maze, out=self.neighbours)
+        steps = [memoryview(row) for row in self.neighbours]
+        self.from_start.fill(-1)
+        self.to_goal.fill(-1)
+        costs = [memoryview(self.from_start), memoryview(self.to_goal)]
+        queues = [memoryview(self.queues[0]), memoryview(self.queues[1])]
+        heads = [0, 0]
+        tails = [0, 0]
+        start = self.start_cell()
+        for side, seeds in enumerate([[start], [self.maze.get_cell_index(x, y) for x, y in self.maze.goals]]):
+            for cell in seeds:
+                if costs[side][cell] < 0:
+                    costs[side][cell] = 0
+                    queues[side][tails[side]] = cell
+                    tails[side] += 1
+        if costs[1][start] == 0:
+            self.result.set_route([start], size)
+            return self.path
+        best = None
+        while best is None and heads[0] < tails[0] and heads[1] < tails[1]:
+            side = 0 if tails[0] - heads[0] <= tails[1] - heads[1] else 1
+            own, other, queue = costs[side], costs[1 - side], queues[side]
+            level_end = tails[side]
+            while heads[side] < level_end:
+                cell = queue[heads[side]]
+                heads[side] += 1
+                self.expansions += 1
+                next_cost = own[cell] + 1
+                for row in steps:
+                    next_cell = row[cell]
+                    if next_cell < 0:
+                        continue
+                    if other[next_cell] >= 0:
+                        length = next_cost + other[next_cell]
+                        if best is None or length < best[0]:
+                            best = (length, side, cell, next_cell)
+                    if own[next_cell] < 0:
+                        own[next_cell] = next_cost
+                        queue[tails[side]] = next_cell
+                        tails[side] += 1
+        if best is None:
+            return
+        length, side, cell, next_cell = best
+        start_cell, goal_cell = (cell, next_cell) if side == 0 else (next_cell, cell)
+        route = trace_back(steps, costs[0], start_cell)
+        route += reversed(trace_back(steps, costs[1], goal_cell))
+        self.result.set_route(route, size)
+        return self.path
+
+
+@register_solver('Dual flood')
+class DualFlood(Solver):
+    """
+    Floods a partly explored maze twice in one search: once with the unknown
+    walls treated as open (optimistic) and once with them treated as closed
+    (pessimistic). Cells where the two costs differ are where more exploration
+    could still change, and so shorten, the route.
+
+    The result holds the optimistic costs and the route through them, as a
+    mouse exploring the maze would plan it. The pessimistic costs are kept
+    alongside, with np.inf for unreachable cells in both.
+
+    The two copies of the maze are stacked into one neighbour table that is
+    kept while the maze size stays the same and refilled in place, so a
+    sensor update only costs the table refill and the search.
+    """
+
+    def __init__(self, maze):
+        super().__init__(maze)
+        self.neighbours = None  # (4, 2 * cells): optimistic cells then pessimistic cells
+        self.closed = None  # (2, walls) wall arrays for the two copies
+        self.dist = None  # steps from the goal for both copies, -1 where not reached
+        self.optimistic = None
+        self.pessimistic = None
+        self.differs = None
+
+    def set_maze(self, maze):
+        super().set_maze(maze)
+        cells = maze.cell_index_size
+        self.optimistic = self.result.cost
+        if self.differs is None or self.differs.size != cells:
+            self.neighbours = np.empty((4, 2 * cells), dtype=np.int32)
+            self.closed = np.empty((2, maze.wall_index_size), dtype=bool)
+            self.dist = np.empty(2 * cells, dtype=np.int32)
+            self.pessimistic = np.full(cells, np.inf, dtype=np.float32)
+            self.differs = np.zeros(cells, dtype=bool)
+
+    @timed()
+    def update(self, roots=None):
+        if self.maze is None:
+            return
+        maze = self.maze
+        cells = maze.cell_index_size
+        self.result.clear()
+        roots = roots if roots else maze.goals
+        if not roots:
+            self.pessimistic.fill(np.inf)
+            self.differs.fill(False)
+            return
+        # unknown walls are open in the first copy and closed in the second
+        np.logical_and(maze.walls, maze.knowns, out=self.closed[0])
+        np.logical_not(maze.knowns, out=self.closed[1])
+        np.logical_or(maze.walls, self.closed[1], out=self.closed[1])
+        neighbour_table(maze, self.closed[0], self.neighbours[:, :cells])
+        neighbour_table(maze, self.closed[1], self.neighbours[:, cells:], offset=cells)
+        seeds = [maze.get_cell_index(x, y) for x, y in roots]
+        levels = wavefront(self.neighbours, seeds + [seed + cells for seed in seeds], self.dist)
+        self.expansions = sum(level.size for level in levels)
+        for cost, dist in ((self.optimistic, self.dist[:cells]), (self.pessimistic, self.dist[cells:])):
+            np.copyto(cost, dist)
+            cost[dist < 0] = np.inf
+        np.not_equal(self.optimistic, self.pessimistic, out=self.differs)
+        start = self.start_cell()
+        if self.optimistic[start] != np.inf:
+            steps = [memoryview(row) for row in self.neighbours[:, :cells]]
+            self.result.set_route(trace_back(steps, memoryview(self.optimistic), start)[::-1], maze.size)
+        return self.optimistic, self.pessimistic
+
+    def route_may_shorten(self, x=0, y=0):
+        """ True when exploring could still give a shorter route from a cell """
+        return bool(self.differs[self.maze.get_cell_index(x, y)])
+
+
 # ============================================================================ #
 # example
 if __name__ == "__main__":
+    import time
+    from synthetic import random_maze
+
     # check arguments
     if len(sys.argv) < 2:
-        print('please specify a maze file.')
+        print('please specify a maze file or the size of a random maze.')
         sys.exit(1)
 
-    # set filepath
-    filepath = sys.argv[1]
-
-    # read maze file
-    with open(filepath, 'r') as file:
-        maze = Maze.parse_maze_string(file)
+    # read maze file or make a synthetic one
+    if sys.argv[1].isdigit():
+        maze = random_maze(int(sys.argv[1]), loops=0.05, seed=1)
+    else:
+        with open(sys.argv[1], 'r') as file:
+            maze = Maze.parse_maze_file(file)
 
     # show info
     print(maze)
-    print(maze.get_maze_string())
+    if maze.size <= 32:
+        print(maze.get_maze_string())
 
-    # show cost map
-    step_map = Manhattan(maze)
-    step_map.update()
-    print(step_map)
+    # compare the solvers
+    for solver in [Manhattan(maze), AStar(maze), BidirectionalBFS(maze), DualFlood(maze)]:
+        solver.set_maze(maze)
+        start_time = time.perf_counter()
+        solver.update()
+        elapsed = time.perf_counter() - start_time
+        steps = len(solver.path) - 1 if solver.path is not None else None
+        print(f'{type(solver).__name__:>16}: {steps} steps, {solver.expansions} expansions, {elapsed * 1000:.1f}ms')
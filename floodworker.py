@@ -0,0 +1,126 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+# ============================================================================ #
+# Copyright (c) Peter Harrison 2022
+# License: MIT
+# description: Floods of maze snapshots on a worker thread, newest first
+# python version >= 3.8
+# ============================================================================ #
+import traceback
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from flooding import SOLVERS
+from routes import RouteStats
+
+
+class MazeSnapshot:
+    """
+    A frozen copy of a maze as it was at one edit, tagged with the edit
+    version, with what to flood it with. The wall arrays are read only so
+    that nothing on the worker thread can change them by mistake.
+    """
+
+    def __init__(self, maze, version, solver_name, track_routes=True):
+        self.maze = maze.copy()
+        self.maze.walls.flags.writeable = False
+        self.maze.knowns.flags.writeable = False
+        self.version = version
+        self.solver_name = solver_name
+        self.track_routes = track_routes
+
+
+def flood_snapshot(snapshot):
+    """
+    flood a snapshot with a new solver, and count its routes if asked.
+    Returns the solver and the route statistics, or None for them
+    """
+    flooder = SOLVERS[snapshot.solver_name](snapshot.maze)
+    flooder.set_maze(snapshot.maze)
+    flooder.update()
+    route_stats = None
+    if snapshot.track_routes:
+        route_stats = RouteStats(snapshot.maze)
+        route_stats.update()
+    return flooder, route_stats
+
+
+class FloodSignals(QObject):
+    finished = pyqtSignal(int, object, object)
+    failed = pyqtSignal(int)
+
+
+class FloodTask(QRunnable):
+    """
+    floods one snapshot on the worker thread and always says when it is
+    done, with finished or, if the flood raised, failed
+    """
+
+    def __init__(self, snapshot, signals):
+        super().__init__()
+        self.snapshot = snapshot
+        self.signals = signals
+        self.setAutoDelete(False)  # the worker keeps it so that it can be dropped
+
+    def run(self):
+        version = self.snapshot.version
+        try:
+            flooder, route_stats = flood_snapshot(self.snapshot)
+        except Exception:
+            # a bug in a solver, as the maze is already in memory. It is reported rather than raised,
+            # which would stop the editor from a pool thread
+            traceback.print_exc()
+            self.signals.failed.emit(version)
+            return
+        self.signals.finished.emit(version, flooder, route_stats)
+
+
+class FloodWorker(QObject):
+    """
+    Floods maze snapshots on a single worker thread. Only the newest
+    snapshot matters: one still waiting when another is submitted is
+    dropped, and a flood that was already running when it was superseded
+    is finished but not published.
+
+    flooded is emitted on the GUI thread with the version, the solver and
+    the route statistics of the newest snapshot, or flood_failed with the
+    version if its flood raised.
+    """
+    flooded = pyqtSignal(int, object, object)
+    flood_failed = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.latest = None  # the version of the newest snapshot submitted
+        self.tasks = {}  # tasks waiting or running, by version
+        self.signals = FloodSignals()
+        self.signals.finished.connect(self.on_finished)
+        self.signals.failed.connect(self.on_failed)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)  # floods run in order, one at a time
+
+    def submit(self, snapshot):
+        self.latest = snapshot.version
+        for version in list(self.tasks):
+            if self.pool.tryTake(self.tasks[version]):
+                del self.tasks[version]
+        task = FloodTask(snapshot, self.signals)
+        self.tasks[snapshot.version] = task
+        self.pool.start(task)
+
+    def on_finished(self, version, flooder, route_stats):
+        self.tasks.pop(version, None)
+        if version == self.latest:
+            self.flooded.emit(version, flooder, route_stats)
+
+    def on_failed(self, version):
+        self.tasks.pop(version, None)
+        if version == self.latest:
+            self.flood_failed.emit(version)
+
+    def stop(self):
+        """ drop the waiting snapshot and wait for the running flood """
+        self.latest = None
+        self.pool.clear()
+        self.pool.waitForDone()
+        self.tasks.clear()
@@ -0,0 +1,143 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+# ============================================================================ #
+# Copyright (c) Peter Harrison 2022
+# License: MIT
+# description: Scene coordinates of the cells, walls and posts of a maze
+# python version >= 3.8
+# ============================================================================ #
+import math
+
+import numpy as np
+from PyQt5 import QtCore
+
+from maze import Maze
+
+# every maze is drawn 2880 units across whatever its size
+MAZE_WIDTH = 2880
+
+
+class MazeGeometry:
+    """
+    Where everything is drawn for one size of maze, worked out once and held
+    in numpy tables. Cell tables are indexed by cell index, y * size + x, and
+    hold x, y or left, top, width, height in scene units with y down the screen.
+    Tables of walls are laid out down the screen with row 0 on the north side.
+
+    Use geometry_for(size) to share the tables between every maze of a size.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.cell_width = MAZE_WIDTH // size
+        self.wall_width = max(4, 192 // size)
+        self.width = size * self.cell_width + self.wall_width
+        cw = self.cell_width
+        ww = self.wall_width
+        cells = np.arange(size * size)
+        left = (cells % size * cw).astype(np.float64)
+        top = ((size - 1 - cells // size) * cw).astype(np.float64)
+        full = np.full(cells.size, 1.0)
+
+        # the space inside the walls, and the cell with its walls and a margin for the pens
+        self.inner_rects = np.column_stack([left + ww, top + ww, full * (cw - ww), full * (cw - ww)])
+        margin = ww / 2
+        self.cell_rects = np.column_stack([left - margin, top - margin, full * (cw + ww + 2 * margin), full * (cw + ww + 2 * margin)])
+
+        # the path runs through the centres of the cells and the middles of their sides
+        origin_x = left + ww / 2
+        origin_y = top + ww / 2
+        self.centres = np.column_stack([origin_x + cw / 2, origin_y + cw / 2])
+        self.text_centres = np.column_stack([left + (cw + ww) / 2, top + (cw + ww) / 2])
+        self.edge_points = np.empty((4, cells.size, 2))
+        self.edge_points[Maze.East] = np.column_stack([origin_x + cw, origin_y + cw / 2])
+        self.edge_points[Maze.North] = np.column_stack([origin_x + cw / 2, origin_y])
+        self.edge_points[Maze.West] = np.column_stack([origin_x, origin_y + cw / 2])
+        self.edge_points[Maze.South] = np.column_stack([origin_x + cw / 2, origin_y + cw])
+
+        # posts and walls, with a wall on every line between cells
+        line = np.arange(size + 1) * cw
+        step = np.arange(size) * cw
+        post_x, post_y = np.meshgrid(line, line)
+        self.post_rects = np.column_stack([post_x.ravel(), post_y.ravel(), np.full(post_x.size, ww), np.full(post_x.size, ww)])
+        self.post_qrects = to_rects(self.post_rects)  # the same for every maze, so made once
+        rows, lines = np.meshgrid(step, line, indexing='ij')
+        self.vertical_walls = np.stack([lines, rows + ww, np.full(rows.shape, ww), np.full(rows.shape, cw - ww)], axis=-1)
+        lines, cols = np.meshgrid(line, step, indexing='ij')
+        self.horizontal_walls = np.stack([cols + ww, lines, np.full(cols.shape, cw - ww), np.full(cols.shape, ww)], axis=-1)
+
+        # an arrow in each cell for each heading, as the shaft and the two sides of the head
+        self.arrow_lines = np.empty((4, cells.size, 3, 4))
+        quarter = cw / 4
+        arrow_left = left + ww / 2 + quarter
+        arrow_top = top + ww / 2 + quarter
+        north = [arrow_left + quarter, arrow_top]
+        east = [arrow_left + 2 * quarter, arrow_top + quarter]
+        south = [arrow_left + quarter, arrow_top + 2 * quarter]
+        west = [arrow_left, arrow_top + quarter]
+        for heading, src, dst in [(Maze.North, south, north), (Maze.East, west, east),
+                                  (Maze.South, north, south), (Maze.West, east, west)]:
+            self.arrow_lines[heading] = arrow_table(src, dst)
+
+    def cell_index(self, x, y):
+        return y * self.size + x
+
+    def wall_rects(self, maze):
+        """ the rectangles of every wall in a maze, including the outer walls """
+        n = self.size
+        east, north = maze.get_passages()
+        # rows count down the screen so row 0 is the north side of the maze
+        east = east[::-1]
+        north = north[::-1]
+        # a vertical wall on line c of row r closes the passage from column c-1 to c
+        vertical = np.ones((n, n + 1), dtype=bool)
+        vertical[:, 1:n] = ~east[:, :n - 1]
+        # a horizontal wall on line h of column c is the north wall of row h
+        horizontal = np.ones((n + 1, n), dtype=bool)
+        horizontal[1:n, :] = ~north[1:, :]
+        return np.concatenate([self.vertical_walls[vertical], self.horizontal_walls[horizontal]])
+
+
+def arrow_table(src, dst):
+    """
+    the three lines of arrows from src to dst, given as lists of x and y
+    arrays. Returns an array of [x1, y1, x2, y2] for each line of each arrow
+    """
+    sx, sy = src
+    dx, dy = dst
+    length = math.hypot(dx[0] - sx[0], dy[0] - sy[0])
+    angle = math.acos((dx[0] - sx[0]) / length)
+    if dy[0] - sy[0] >= 0:
+        angle = 2 * math.pi - angle
+    size = length / 4
+    head = []
+    for side in (angle - math.pi / 3, angle - math.pi + math.pi / 3):
+        head.append(np.column_stack([dx, dy, dx + math.sin(side) * size, dy + math.cos(side) * size]))
+    return np.stack([np.column_stack([sx, sy, dx, dy])] + head, axis=1)
+
+
+def to_rects(array):
+    """ QRectF objects from rows of left, top, width, height """
+    return [QtCore.QRectF(*r) for r in array.tolist()]
+
+
+def to_points(array):
+    """ QPointF objects from rows of x, y """
+    return [QtCore.QPointF(*p) for p in array.tolist()]
+
+
+def to_lines(array):
+    """ QLineF objects from rows of x1, y1, x2, y2 """
+    return [QtCore.QLineF(*line) for line in array.tolist()]
+
+
+_geometries = {}
+
+
+def geometry_for(size):
+    """ the shared geometry tables for a maze size """
+    geometry = _geometries.get(size)
+    if geometry is None:
+        geometry = MazeGeometry(size)
+        _geometries[size] = geometry
+    return geometry
@@ -0,0 +1,59 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+# ============================================================================ #
+# Copyright (c) Peter Harrison 2022
+# License: MIT
+# description: Colour maps of the flood costs as one pixel per cell images
+# python version >= 3.8
+# ============================================================================ #
+import numpy as np
+from PyQt5.QtGui import QImage
+
+# colours for low to high costs, as (position, red, green, blue), kept darker
+# than and clear of the red walls and the yellow and orange cost numbers
+HEATMAP_STOPS = [
+    (0.00, 90, 190, 130),
+    (0.25, 30, 150, 150),
+    (0.50, 25, 95, 160),
+    (0.75, 40, 45, 135),
+    (1.00, 30, 15, 80),
+]
+HEATMAP_ALPHA = 255
+
+
+def make_colormap(stops=HEATMAP_STOPS, entries=256, alpha=HEATMAP_ALPHA):
+    """ a lookup table of premultiplied ARGB32 values, blending between the stops """
+    stops = np.array(stops, dtype=np.float64)
+    position = np.linspace(0.0, 1.0, entries)
+    channels = [np.interp(position, stops[:, 0], stops[:, i]) * alpha / 255 for i in (1, 2, 3)]
+    red, green, blue = [np.round(c).astype(np.uint32) for c in channels]
+    return (np.uint32(alpha) << 24) | (red << 16) | (green << 8) | blue
+
+
+class Heatmap:
+    """
+    Turns an array of costs into a QImage with one pixel per cell. The
+    pixels are written straight into a numpy buffer that the image wraps, so
+    no Python loop runs over the cells. Unknown costs are left transparent.
+    """
+
+    def __init__(self, colormap=None):
+        self.colormap = make_colormap() if colormap is None else colormap
+        self.pixels = None
+        self.image = None
+
+    def update(self, cost, size):
+        """ colour the costs of a size x size maze and return the image """
+        if self.pixels is None or self.pixels.shape != (size, size):
+            self.pixels = np.zeros((size, size), dtype=np.uint32)
+            self.image = QImage(self.pixels.data, size, size, size * 4, QImage.Format_ARGB32_Premultiplied)
+        # image rows run down the screen and maze rows run up it
+        cost = cost.reshape(size, size)[::-1]
+        known = np.isfinite(cost)
+        highest = cost[known].max() if known.any() else 0
+        scale = (self.colormap.size - 1) / highest if highest > 0 else 0
+        index = np.zeros(cost.shape, dtype=np.intp)
+        np.multiply(cost, scale, out=index, where=known, casting='unsafe')
+        np.copyto(self.pixels, self.colormap[index])
+        self.pixels[~known] = 0
+        return self.image
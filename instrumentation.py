@@ -0,0 +1,142 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+# ============================================================================ #
+# Copyright (c) Peter Harrison 2022
+# License: MIT
+# description: Timings of painting, flooding and loading kept in ring buffers
+# python version >= 3.8
+# ============================================================================ #
+import functools
+import json
+import threading
+import time
+
+import numpy as np
+
+RING_SIZE = 1024  # the most recent calls kept for each timed routine
+
+
+class RingBuffer:
+    """
+    The start times and durations of the last few calls of one routine, in
+    seconds, held in fixed numpy arrays so that recording never allocates.
+    """
+
+    def __init__(self, size=RING_SIZE):
+        self.starts = np.zeros(size)
+        self.durations = np.zeros(size)
+        self.count = 0  # calls recorded since the last clear, may be more than the size
+
+    def add(self, start, duration):
+        i = self.count % self.durations.size
+        self.starts[i] = start
+        self.durations[i] = duration
+        self.count += 1
+
+    def clear(self):
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.durations.size)
+
+    def values(self):
+        ''' the start times and durations held, oldest first '''
+        n = len(self)
+        i = self.count % self.durations.size
+        order = np.arange(i - n, i) % self.durations.size
+        return self.starts[order], self.durations[order]
+
+
+class Timings:
+    """
+    A ring buffer for each timed routine, by name. Recording is off until
+    enabled so that the timed routines only pay for one attribute test.
+
+    The loader, flood worker and thumbnail threads record as well as the
+    GUI thread, so the buffers are only touched while holding the lock.
+    """
+
+    def __init__(self, size=RING_SIZE):
+        self.size = size
+        self.enabled = False
+        self.buffers = {}
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()  # start times are counted from here
+
+    def record(self, name, start, duration):
+        with self.lock:
+            buffer = self.buffers.get(name)
+            if buffer is None:
+                buffer = RingBuffer(self.size)
+                self.buffers[name] = buffer
+            buffer.add(start - self.origin, duration)
+
+    def clear(self):
+        with self.lock:
+            for buffer in self.buffers.values():
+                buffer.clear()
+
+    def snapshot(self):
+        ''' the start times, durations and call count of each routine, copied as they are now '''
+        with self.lock:
+            return {name: buffer.values() + (buffer.count,) for name, buffer in sorted(self.buffers.items())}
+
+    def summary(self):
+        '''
+        the rolling statistics of each routine in ms, as a dict of dicts with
+        count, p50, p95 and max. count is every call since the last clear
+        '''
+        return self.summarise(self.snapshot())
+
+    @staticmethod
+    def summarise(snapshot):
+        stats = {}
+        for name, (_, durations, count) in snapshot.items():
+            if not durations.size:
+                continue
+            durations = durations * 1000
+            p50, p95 = np.percentile(durations, [50, 95])
+            stats[name] = {'count': count, 'p50': float(p50), 'p95': float(p95), 'max': float(durations.max())}
+        return stats
+
+    def to_json(self):
+        ''' every call held, with the summary, for looking at elsewhere '''
+        snapshot = self.snapshot()
+        routines = {}
+        for name, (starts, durations, _) in snapshot.items():
+            routines[name] = {'start_s': starts.round(6).tolist(), 'duration_ms': (durations * 1000).round(4).tolist()}
+        data = {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'ring_size': self.size,
+            'summary': self.summarise(snapshot),
+            'routines': routines,
+        }
+        return json.dumps(data, indent=1)
+
+
+TIMINGS = Timings()
+
+
+def timed(name=None):
+    """
+    decorator that records how long each call of a function takes while
+    TIMINGS is enabled. The name defaults to the qualified function name,
+    for example MazeItem.paint
+    """
+
+    def decorate(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not TIMINGS.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                TIMINGS.record(label, start, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorate
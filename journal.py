@@ -0,0 +1,193 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+# ============================================================================ #
+# Copyright (c) Peter Harrison 2022
+# License: MIT
+# description: An append-only journal of maze edits, replayed after a crash
+# python version >= 3.8
+# ============================================================================ #
+import os
+import struct
+from pathlib import Path
+
+import numpy as np
+
+from diskcache import cache_dir, source_key, write_atomic
+from maze import Maze
+
+JOURNAL_MAGIC = b'MAZEJRNL'
+JOURNAL_VERSION = 1
+JOURNAL_SUFFIX = '.journal'
+HEADER = struct.Struct('<8sHH')  # magic, version, maze size
+
+# every record starts with its kind
+SNAPSHOT, WALL, GOAL = range(3)
+SNAPSHOT_RECORD = struct.Struct('<BHH')  # kind, start cells, goal cells, then the packed walls and knowns and the cells
+CELL = struct.Struct('<HH')
+WALL_RECORD = struct.Struct('<BHHBB')  # kind, x, y, direction, wall present
+GOAL_RECORD = struct.Struct('<BHHB')  # kind, x, y, goal present
+
+# when records are forced onto the disk
+SYNC_ALWAYS = 'always'  # after every record, the safest and the slowest
+SYNC_INTERVAL = 'interval'  # whenever sync() is called, which the editor does on a timer
+SYNC_NEVER = 'never'  # when the operating system gets round to it
+SYNC_POLICIES = (SYNC_ALWAYS, SYNC_INTERVAL, SYNC_NEVER)
+
+
+def sync_policy():
+    ''' the sync policy from MAZE_EDITOR_JOURNAL_SYNC, interval by default '''
+    policy = os.environ.get('MAZE_EDITOR_JOURNAL_SYNC', SYNC_INTERVAL)
+    return policy if policy in SYNC_POLICIES else SYNC_INTERVAL
+
+
+def journal_path(file_name):
+    """
+    journals are kept in the cache, never next to the maze files, keyed by
+    the maze file they are for, or as untitled for a new maze
+    """
+    directory = cache_dir() / 'journals'
+    if file_name:
+        try:
+            return directory / (source_key(file_name) + JOURNAL_SUFFIX)
+        except OSError:
+            pass  # the file has gone, and the maze is as good as untitled
+    return directory / ('untitled' + JOURNAL_SUFFIX)
+
+
+def snapshot_record(maze):
+    ''' the whole maze as one record '''
+    cells = [CELL.pack(x, y) for x, y in maze.start + maze.goals]
+    return b''.join([SNAPSHOT_RECORD.pack(SNAPSHOT, len(maze.start), len(maze.goals)),
+                     np.packbits(maze.walls).tobytes(), np.packbits(maze.knowns).tobytes()] + cells)
+
+
+class Journal:
+    """
+    An append-only file of the edits made to a maze since it was last
+    saved. Nothing is written until the first edit, which writes a
+    snapshot of the maze as a new journal, and every edit after that is
+    a few bytes appended to it, so recording one costs a single write.
+
+    The sync policy decides when the records are forced onto the disk.
+    compact() replaces the records with a new snapshot to keep the journal
+    short, and replay() rebuilds the maze from a journal after a crash.
+    """
+
+    def __init__(self, path, maze, sync=SYNC_INTERVAL):
+        self.path = Path(path)
+        self.maze = maze  # the maze being edited, which the records are applied to as they are made
+        self.sync_policy = sync
+        self.fd = None
+        self.records = 0  # records appended since the last snapshot
+        self.dirty = False  # records written but not synced
+        self.error = None  # why the journal could not be written, after which edits are no longer recorded
+
+    def record_wall(self, x, y, direction, state):
+        self.append(WALL_RECORD.pack(WALL, x, y, direction, bool(state)))
+
+    def record_goal(self, x, y, present):
+        self.append(GOAL_RECORD.pack(GOAL, x, y, bool(present)))
+
+    def append(self, record):
+        if self.error is not None:
+            return
+        try:
+            if self.fd is None:
+                # the maze already holds this edit, so the snapshot covers it. It is synced with the next records
+                self.compact(sync=self.sync_policy == SYNC_ALWAYS)
+                self.dirty = True
+                return
+            os.write(self.fd, record)
+            self.records += 1
+            self.dirty = True
+            if self.sync_policy == SYNC_ALWAYS:
+                self.sync()
+        except OSError as error:  # a journal that cannot be written must not stop the editing
+            self.error = error
+
+    def sync(self):
+        ''' force the records written so far onto the disk '''
+        if self.dirty and self.fd is not None and self.sync_policy != SYNC_NEVER:
+            try:
+                os.fsync(self.fd)
+            except OSError as error:
+                self.error = error
+        self.dirty = False
+
+    def compact(self, sync=True):
+        ''' replace the journal with a single snapshot of the maze, on the disk before it replaces it if sync '''
+        self.close()
+        data = HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION, self.maze.size) + snapshot_record(self.maze)
+        write_atomic(self.path, data, sync=sync and self.sync_policy != SYNC_NEVER)
+        self.fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | getattr(os, 'O_BINARY', 0))
+        self.records = 0
+        self.dirty = False
+
+    def close(self):
+        if self.fd is not None:
+            self.sync()
+            os.close(self.fd)
+            self.fd = None
+
+    def discard(self):
+        ''' close and delete the journal, once its edits are saved or thrown away '''
+        self.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def replay(path):
+        """
+        rebuild a maze from a journal. A record cut short by a crash, and
+        anything after it, is ignored.
+
+        :returns: the maze, or None if there is no readable journal
+        """
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+        except OSError:
+            return None
+        if len(data) < HEADER.size:
+            return None
+        magic, version, size = HEADER.unpack_from(data)
+        if magic != JOURNAL_MAGIC or version != JOURNAL_VERSION:
+            return None
+        maze = None
+        offset = HEADER.size
+        packed_size = (2 * size * size + 7) // 8
+        while offset < len(data):
+            kind = data[offset]
+            if kind == SNAPSHOT:
+                if offset + SNAPSHOT_RECORD.size > len(data):
+                    break
+                _, starts, goals = SNAPSHOT_RECORD.unpack_from(data, offset)
+                end = offset + SNAPSHOT_RECORD.size + 2 * packed_size + (starts + goals) * CELL.size
+                if end > len(data):
+                    break
+                offset += SNAPSHOT_RECORD.size
+                maze = Maze(size)
+                for flags in (maze.walls, maze.knowns):
+                    packed = np.frombuffer(data, np.uint8, packed_size, offset)
+                    flags[:] = np.unpackbits(packed)[:maze.wall_index_size].astype(bool)
+                    offset += packed_size
+                cells = [list(CELL.unpack_from(data, offset + i * CELL.size)) for i in range(starts + goals)]
+                maze.start = cells[:starts]
+                maze.goals = cells[starts:]
+                offset = end
+            elif kind == WALL and maze is not None and offset + WALL_RECORD.size <= len(data):
+                _, x, y, direction, state = WALL_RECORD.unpack_from(data, offset)
+                maze.wall(x, y, direction, bool(state), True)
+                offset += WALL_RECORD.size
+            elif kind == GOAL and maze is not None and offset + GOAL_RECORD.size <= len(data):
+                _, x, y, present = GOAL_RECORD.unpack_from(data, offset)
+                if present and [x, y] not in maze.goals:
+                    maze.goals.append([x, y])
+                elif not present and [x, y] in maze.goals:
+                    maze.goals.remove([x, y])
+                offset += GOAL_RECORD.size
+            else:
+                break  # cut short, or not a record at all
+        return maze
@@ -0,0 +1,38 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+# ============================================================================ #
+# Copyright (c) Peter Harrison 2022
+# License: MIT
+# description: Overlay layers drawn as child items over the maze
+# python version >= 3.8
+# ============================================================================ #
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QGraphicsItem
+
+# the layer caches live in the global pixmap cache, which by default only
+# holds about two full screen layers, so the applications set it to this
+PIXMAP_CACHE_LIMIT_KB = 64 * 1024
+
+
+class OverlayLayer(QGraphicsItem):
+    """
+    One overlay such as the costs or the path, drawn by a paint method of the
+    parent maze item. Each layer has its own cache so that showing, hiding or
+    redrawing one overlay leaves the static maze and the other overlays alone.
+    """
+
+    def __init__(self, parent, paint_method, cache_mode=QGraphicsItem.DeviceCoordinateCache):
+        super().__init__(parent)
+        self.paint_method = paint_method
+        self.setCacheMode(cache_mode)
+        self.setAcceptedMouseButtons(Qt.NoButton)  # clicks go through to the maze
+
+    def boundingRect(self):
+        return self.parentItem().boundingRect()
+
+    def paint(self, painter, *args):
+        maze_item = self.parentItem()
+        if maze_item.maze is None:
+            return
+        maze_item.ensure_flood()
+        self.paint_method(painter)
@@ -0,0 +1,173 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+# ============================================================================ #
+# Copyright (c) Peter Harrison 2022
+# License: MIT
+# description: Maze files parsed and flooded on worker threads, with prefetching
+# python version >= 3.8
+# ============================================================================ #
+import os
+from collections import OrderedDict
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from flooding import SOLVERS
+from maze import MAZE_FILE_ERRORS, Maze
+from routes import RouteStats
+
+PREFETCH_ROWS = 2  # list entries either side of the selection loaded ahead
+CACHE_SIZE = 8  # prefetched mazes kept in memory
+LOAD_THREADS = 2
+WANTED_PRIORITY = 1  # the selected maze goes ahead of any prefetching
+PREFETCH_PRIORITY = 0
+
+
+class LoadedMaze:
+    """ a maze read from a file, flooded with a solver and with its route statistics worked out """
+
+    def __init__(self, maze, flooder, route_stats, mtime_ns):
+        self.maze = maze
+        self.flooder = flooder
+        self.route_stats = route_stats
+        self.mtime_ns = mtime_ns
+
+
+def load_maze(path, solver_name):
+    """
+    read and flood a maze file. Everything MazeItem would work out when
+    given the maze is done here, so this can run away from the GUI thread.
+    """
+    mtime_ns = os.stat(path).st_mtime_ns
+    with open(path, 'r') as file:
+        maze = Maze.parse_maze_file(file)
+    maze.get_connectivity()
+    flooder = SOLVERS[solver_name](maze)
+    flooder.set_maze(maze)
+    flooder.update()
+    route_stats = RouteStats(maze)
+    route_stats.update()
+    return LoadedMaze(maze, flooder, route_stats, mtime_ns)
+
+
+class LoadSignals(QObject):
+    finished = pyqtSignal(object, str, object)
+
+
+class LoadTask(QRunnable):
+    """ loads one maze on a pool thread """
+
+    def __init__(self, key, path, signals):
+        super().__init__()
+        self.key = key
+        self.path = path
+        self.signals = signals
+        self.setAutoDelete(False)  # the loader keeps it so that it can be cancelled
+
+    def run(self):
+        try:
+            result = load_maze(self.path, self.key[1])
+        except MAZE_FILE_ERRORS as error:
+            result = str(error)
+        self.signals.finished.emit(self.key, self.path, result)
+
+
+class MazeLoader(QObject):
+    """
+    Loads mazes for the file list. Only the most recent request is wanted:
+    requests that have not started by the time the selection moves on are
+    dropped, and any that were already running are kept in a small cache
+    along with the prefetched neighbours of the selection.
+
+    Mazes are keyed by name and solver, as the flood depends on both.
+    maze_loaded is emitted on the GUI thread with the LoadedMaze.
+    """
+    maze_loaded = pyqtSignal(str, str, object)
+    load_failed = pyqtSignal(str, str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.wanted = None  # the key of the last request, until it arrives
+        self.tasks = {}  # tasks waiting or running, by key
+        self.cache = OrderedDict()  # LoadedMaze by key, least recently used first
+        self.signals = LoadSignals()
+        self.signals.finished.connect(self.on_finished)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(LOAD_THREADS)
+
+    def request(self, name, path, solver_name):
+        ''' load a maze and emit maze_loaded with it, straight away if it is in the cache '''
+        key = (name, solver_name)
+        self.wanted = key
+        self.cancel_except({key})
+        loaded = self.take_cached(key, path)
+        if loaded is not None:
+            self.wanted = None
+            self.maze_loaded.emit(name, str(path), loaded)
+            return
+        self.start(key, path, WANTED_PRIORITY)
+
+    def load_now(self, name, path, solver_name):
+        ''' load a maze on this thread, from the cache if possible '''
+        self.cancel()
+        loaded = self.take_cached((name, solver_name), path)
+        return loaded if loaded is not None else load_maze(path, solver_name)
+
+    def prefetch(self, entries, solver_name):
+        ''' load (name, path) entries into the cache in the background '''
+        for name, path in entries:
+            key = (name, solver_name)
+            if key not in self.cache:
+                self.start(key, path, PREFETCH_PRIORITY)
+
+    def cancel(self):
+        ''' stop waiting for the last request and drop anything not started '''
+        self.wanted = None
+        self.cancel_except(set())
+
+    def start(self, key, path, priority):
+        if key in self.tasks:
+            return
+        task = LoadTask(key, str(path), self.signals)
+        self.tasks[key] = task
+        self.pool.start(task, priority)
+
+    def cancel_except(self, keys):
+        for key in list(self.tasks):
+            if key not in keys and self.pool.tryTake(self.tasks[key]):
+                del self.tasks[key]
+
+    def take_cached(self, key, path):
+        '''
+        remove and return a cached maze if the file has not changed since it
+        was loaded. It is removed because the editor changes the maze it is given.
+        '''
+        loaded = self.cache.pop(key, None)
+        if loaded is None:
+            return None
+        try:
+            if os.stat(path).st_mtime_ns != loaded.mtime_ns:
+                return None
+        except OSError:
+            return None
+        return loaded
+
+    def on_finished(self, key, path, result):
+        self.tasks.pop(key, None)
+        if isinstance(result, str):
+            if key == self.wanted:
+                self.wanted = None
+                self.load_failed.emit(key[0], path, result)
+            return
+        if key == self.wanted:
+            self.wanted = None
+            self.maze_loaded.emit(key[0], path, result)
+            return
+        self.cache[key] = result
+        self.cache.move_to_end(key)
+        while len(self.cache) > CACHE_SIZE:
+            self.cache.popitem(last=False)
+
+    def stop(self):
+        ''' drop the waiting requests and wait for the running ones '''
+        self.cancel()
+        self.pool.waitForDone()
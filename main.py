@@ -13,8 +13,9 @@ import sys
 from pathlib import Path
 # This is a sample Python script.
 from PyQt5.QtCore import Qt, QT_VERSION_STR
-from PyQt5.QtGui import QIcon
+from PyQt5.QtGui import QIcon, QPixmapCache
 from PyQt5.QtWidgets import QApplication
+from layers import PIXMAP_CACHE_LIMIT_KB
 from mainwindow import MainWindow
 
 # this may or may not help with high DPI screen
@@ -30,16 +31,24 @@ if hasattr(Qt, "AA_EnableHighDpiScaling"):
 if hasattr(Qt, "AA_UseHighDpiPixmaps"):
     QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps, True)
 
-if __name__ == '__main__':
-    import sys
-
-    app = QApplication(sys.argv)
 
-    window = MainWindow()
+def create_window(path='mazefiles'):
+    ''' the editor window, shown. The rest of the editor starts once it has been painted '''
+    QPixmapCache.setCacheLimit(PIXMAP_CACHE_LIMIT_KB)
+    window = MainWindow(path)
     window.setWindowTitle("PyQt Micromouse Maze Editor")
     # for screen in app.screens():
     #     screen_dpi = screen.logicalDotsPerInch()
     #     print(screen_dpi)
     window.setWindowIcon(QIcon('icons/MazeEditSmall.png'))
     window.show()
+    return window
+
+
+if __name__ == '__main__':
+    import sys
+
+    app = QApplication(sys.argv)
+
+    window = create_window()
     sys.exit(app.exec_())
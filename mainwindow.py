@@ -17,14 +17,28 @@ from PyQt5.QtGui import QIcon, QKeySequence
 from PyQt5.QtWidgets import (QApplication, QFileDialog, QMainWindow,
                              QMessageBox, QTextEdit, QWidget, QAction)
 
-import maze
 from mainwindow_ui import Ui_MainWindow
-from maze import Maze
-from mazeitem import MazeItem
 import os
 
+# everything else, with numpy and the solvers, is imported once the window is on screen
+
+THUMBNAIL_DELAY_MS = 50  # wait for scrolling to settle before asking for thumbnails
+FILTER_DELAY_MS = 150  # wait for a pause in typing before filtering the list
+JOURNAL_SYNC_MS = 1000  # how often journalled edits are forced onto the disk with the interval policy
+AUTOSAVE_MS = 30000  # how often the journal is compacted into a single snapshot
+SCAN_STEP_MS = 20  # time spent listing maze files between events while the list is filled
+
 
 class MainWindow(QtWidgets.QMainWindow):
+    """
+    The editor window. Only what the first frame needs is made in the
+    constructor; start() makes the rest once the window has been painted,
+    and the maze files are listed a few directories at a time after that,
+    with the first of them loaded in the background. ready is emitted once
+    they are all listed.
+    """
+    ready = QtCore.pyqtSignal()
+
     def __init__(self, path='mazefiles', *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.do_not_repaint = True
@@ -35,44 +49,164 @@ class MainWindow(QtWidgets.QMainWindow):
         self.create_menu()
         self.create_tool_bars()
         self.statusBar().showMessage('ready')
+        self.recovery = None  # the journal left by a session that did not close, and the file it was for
         self.read_settings()
 
         self.recent_files = []
         self.current_file_name = ""
+        self.path_to_maze_files = Path(path)
+        self.list_name = None  # the list entry being edited, if the maze came from the list
+        self.is_started = False
+        self.maze_item = None
+        self.playback = None
+        self.journal = None
 
         self.maze_scene = QtWidgets.QGraphicsScene()
+        self.ui.maze_view.setScene(self.maze_scene)
+
+        self.filter_timer = QtCore.QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(FILTER_DELAY_MS)
+        self.filter_timer.timeout.connect(self.filter_filenames)
+
+        self.scan_timer = QtCore.QTimer(self)
+        self.scan_timer.timeout.connect(self.scan_step)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.is_started:
+            QtCore.QTimer.singleShot(0, self.start)  # after this frame has reached the screen
+
+    def start(self):
+        ''' make everything the first frame did not need and start listing the maze files '''
+        if self.is_started:
+            return
+        self.is_started = True
+        from corpus_index import FIELDS, IndexSignals
+        from corpuswatcher import CorpusWatcher
+        from flooding import SOLVERS
+        from floodworker import FloodWorker
+        from journal import sync_policy, SYNC_INTERVAL
+        from loader import MazeLoader
+        from mazeitem import MazeItem
+        from mazelist import MazeFilterModel, MazeListModel
+        from playback import Playback
+        from thumbnails import ThumbnailLoader, THUMBNAIL_SIZE
+        from timingsdock import TimingsDock
+
+        self.timings_dock = TimingsDock(self)
+        self.addDockWidget(Qt.LeftDockWidgetArea, self.timings_dock)
+        self.timings_dock.hide()
+        self._timings_act.toggled.connect(self.timings_dock.set_recording)
+
+        # every edit is journalled so that unsaved work survives a crash
+        self.journal_sync = sync_policy()
+        self.journal_timer = QtCore.QTimer(self)
+        self.journal_timer.setInterval(JOURNAL_SYNC_MS)
+        self.journal_timer.timeout.connect(self.sync_journal)
+        if self.journal_sync == SYNC_INTERVAL:
+            self.journal_timer.start()
+        self.autosave_timer = QtCore.QTimer(self)
+        self.autosave_timer.setInterval(AUTOSAVE_MS)
+        self.autosave_timer.timeout.connect(self.autosave)
+        self.autosave_timer.start()
+
         self.maze_item = MazeItem()
         self.maze_scene.addItem(self.maze_item)
+        # edits are flooded on a worker thread so that clicking never waits for the solver
+        self.flood_worker = FloodWorker(self)
+        self.maze_item.set_flood_worker(self.flood_worker)
+        self.maze_item.new_journal = self.open_journal
+        self.playback = Playback(self.maze_item, self)
+        self.playback.set_speed(self.ui.sb_speed.value())
+        self.playback.position_changed.connect(self.show_playback_position)
+        self.playback.playing_changed.connect(self.show_playing)
+        self.playback.frame_timed.connect(self.show_frame_time)
 
-        self.ui.maze_view.setScene(self.maze_scene)
         self.ui.maze_view.fitInView(self.maze_scene.sceneRect())
         self.ui.maze_view.update()
 
-        self.ui.le_maze_filter.textChanged.connect(self.filter_filenames)
-
-        self.path_to_maze_files = Path(path)
-        types = ['**/*.txt', '**/*.maze']
-        filenames = []
-        for t in types:
-            filenames.extend(self.path_to_maze_files.glob(t))
-        self.maze_file_names = sorted(
-            filename.relative_to(self.path_to_maze_files)
-            for filename in list(filenames)
-            if filename.is_file()
-        )
-        self.filter_filenames('')
-        self.ui.lw_maze_list.currentItemChanged.connect(self.list_value_changed)
-        self.ui.lw_maze_list.setCurrentRow(0)
-        self.set_maze(self.ui.lw_maze_list.currentItem().text())
-        self.ui.cb_solve_manhattan.setChecked(True)
+        self.ui.le_maze_filter.textChanged.connect(self.filter_timer.start)
+
+        # mazes picked from the list are read and flooded away from the GUI thread
+        self.loader = MazeLoader(self)
+        self.loader.maze_loaded.connect(self.on_maze_loaded)
+        self.loader.load_failed.connect(self.on_load_failed)
+
+        # thumbnails are only made for the rows in view, away from the GUI thread
+        self.thumbnails = ThumbnailLoader(THUMBNAIL_SIZE, self)
+        self.list_model = MazeListModel(self.thumbnails, self)
+        self.filter_model = MazeFilterModel(self)
+        self.filter_model.setSourceModel(self.list_model)
+        self.thumbnails.thumbnail_ready.connect(self.list_model.thumbnail_ready)
+        self.thumbnail_timer = QtCore.QTimer(self)
+        self.thumbnail_timer.setSingleShot(True)
+        self.thumbnail_timer.setInterval(THUMBNAIL_DELAY_MS)
+        self.thumbnail_timer.timeout.connect(self.request_visible_thumbnails)
+        self.ui.lv_maze_list.setModel(self.filter_model)
+        self.ui.lv_maze_list.setIconSize(QtCore.QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        self.ui.lv_maze_list.setUniformItemSizes(True)
+        # batched layout stops the view asking the model about every row after each filter
+        self.ui.lv_maze_list.setLayoutMode(QtWidgets.QListView.Batched)
+        self.ui.lv_maze_list.verticalScrollBar().valueChanged.connect(self.thumbnail_timer.start)
+        self.ui.lv_maze_list.selectionModel().currentChanged.connect(self.list_value_changed)
+        self.ui.le_maze_filter.setToolTip('Words in the file name, and terms such as path>100 or goal=ne on:\n' +
+                                          '\n'.join(f'{field}: {text}' for field, text in FIELDS.items()))
+
+        # the features of every maze file are indexed in the background for searching
+        self.index_task = None
+        self.index_pending = False  # the list changed while the index was being brought up to date
+        self.index_signals = IndexSignals()
+        self.index_signals.finished.connect(self.on_index_ready)
+
+        self.ui.cmb_solver.addItems(SOLVERS.keys())
+        self.ui.cmb_solver.setCurrentText(self.maze_item.solver_name)
+        self.ui.cmb_solver.currentTextChanged.connect(self.maze_item.set_solver)
         self.ui.maze_view.maze_clicked.connect(self.maze_item.on_maze_click)
-        # self.ui.pb_button_a.clicked.connect(self.save_file)
-        # self.ui.pb_button_b.clicked.connect(self.new_file)
+        self.ui.maze_view.maze_dragged.connect(self.maze_item.on_maze_drag)
+        self.ui.maze_view.maze_released.connect(self.maze_item.on_maze_release)
+        self.ui.pb_run.clicked.connect(self.run_or_pause)
+        self.ui.pb_stop.clicked.connect(self.stop_playback)
+        self.ui.sb_speed.valueChanged.connect(self.playback.set_speed)
+        self.ui.hs_progress.valueChanged.connect(self.playback.seek)
         self.ui.cb_show_costs.stateChanged.connect(self.enable_costs)
+        self.ui.cb_show_heatmap.stateChanged.connect(self.enable_heatmap)
         self.ui.cb_show_directions.stateChanged.connect(self.enable_directions)
         self.ui.cb_show_paths.stateChanged.connect(self.enable_paths)
         self.ui.cb_show_paths.setChecked(True)
 
+        # files added, removed or changed while the editor runs are followed in the list and the caches
+        self.corpus_watcher = CorpusWatcher(self.path_to_maze_files, self)
+        self.corpus_watcher.changed.connect(self.on_corpus_changed)
+        self.corpus_watcher.start_scan()
+        self.statusBar().showMessage('Listing maze files')
+        # a session that did not close is carried on, otherwise the first maze listed is shown
+        self.recover_journal()
+        self.scan_step()
+        self.scan_timer.start(0)
+
+    def scan_step(self):
+        ''' list some more maze files, and once they are all listed index them '''
+        self.list_model.update_names(self.corpus_watcher.scan_some(SCAN_STEP_MS / 1000), {})
+        if self.maze_item.maze is None and self.loader.wanted is None and self.list_model.names:
+            # the first maze is loaded as soon as there is one, the list carries on filling meanwhile
+            fname = self.list_model.name_at(0)
+            self.set_maze(fname)
+            self.ui.lv_maze_list.setCurrentIndex(self.filter_model.index(self.filter_model.row_of(fname)))
+        if self.corpus_watcher.scanning:
+            return
+        self.scan_timer.stop()
+        if self.statusBar().currentMessage() == 'Listing maze files':
+            self.statusBar().showMessage(f'{len(self.list_model.names)} maze files', 2000)
+        self.start_indexing()
+        self.thumbnail_timer.start()
+        self.ready.emit()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.is_started:
+            self.thumbnail_timer.start()
+
     def create_actions(self):
         icon = QIcon('./icons/filenew-16.png')
         self._new_16_act = QAction(icon, "New 16x16", self)
@@ -109,6 +243,18 @@ class MainWindow(QtWidgets.QMainWindow):
         self._exit_act.setStatusTip("Exit the application")
         self._exit_act.triggered.connect(self.close)
 
+        self._timings_act = QAction("&Timings", self)
+        self._timings_act.setCheckable(True)
+        self._timings_act.setStatusTip("Time painting, flooding and loading and show the results")
+
+        self._export_timings_act = QAction("&Export Timings...", self)
+        self._export_timings_act.setStatusTip("Save the recorded timings as JSON")
+        self._export_timings_act.triggered.connect(self.export_timings)
+
+        self._compare_act = QAction("&Compare Mazes...", self)
+        self._compare_act.setStatusTip("Show the maze beside other maze files with the walls that differ marked")
+        self._compare_act.triggered.connect(self.compare)
+
         self._about_act = QAction("&About", self)
         self._about_act.setStatusTip("Show the About Box")
         self._about_act.triggered.connect(self.about)
@@ -127,6 +273,12 @@ class MainWindow(QtWidgets.QMainWindow):
         self._file_menu.addSeparator()
         self._file_menu.addAction(self._exit_act)
 
+        self._tools_menu = self.menuBar().addMenu("&Tools")
+        self._tools_menu.addAction(self._compare_act)
+        self._tools_menu.addSeparator()
+        self._tools_menu.addAction(self._timings_act)
+        self._tools_menu.addAction(self._export_timings_act)
+
         self.menuBar().addSeparator()
 
         self._help_menu = self.menuBar().addMenu("&Help")
@@ -148,7 +300,14 @@ class MainWindow(QtWidgets.QMainWindow):
             self.maze_item.show_costs()
         else:
             self.maze_item.hide_costs()
-        self.maze_item.update()
+
+    def enable_heatmap(self,enable):
+        if self.maze_item is None:
+            return
+        if enable:
+            self.maze_item.show_heatmap()
+        else:
+            self.maze_item.hide_heatmap()
 
     def enable_directions(self,enable):
         if self.maze_item is None:
@@ -157,7 +316,6 @@ class MainWindow(QtWidgets.QMainWindow):
             self.maze_item.show_arrows()
         else:
             self.maze_item.hide_arrows()
-        self.maze_item.update()
 
     def enable_paths(self,enable):
         if self.maze_item is None:
@@ -166,37 +324,163 @@ class MainWindow(QtWidgets.QMainWindow):
             self.maze_item.show_paths()
         else:
             self.maze_item.hide_paths()
-        self.maze_item.update()
 
-    def list_value_changed(self, current_item, prev_item):
-        if not current_item:
+    def run_or_pause(self):
+        ''' start a simulated run of the maze, or pause and resume it '''
+        if self.maze_item.maze is None:
+            return
+        if not self.playback.active:
+            self.playback.start(self.maze_item.maze)
+            self.ui.hs_progress.setRange(0, self.playback.last_position)
+            self.ui.hs_progress.setEnabled(True)
+        if self.playback.playing:
+            self.playback.pause()
+        else:
+            self.playback.play()
+
+    def stop_playback(self):
+        self.playback.stop()
+        self.ui.hs_progress.setEnabled(False)
+        self.show_playback_position(0)
+        self.ui.lbl_frame_time.clear()
+
+    def show_playback_position(self, position):
+        self.ui.hs_progress.blockSignals(True)
+        self.ui.hs_progress.setValue(position)
+        self.ui.hs_progress.blockSignals(False)
+
+    def show_playing(self, playing):
+        self.ui.pb_run.setText('Pause' if playing else 'Run')
+
+    def show_frame_time(self, mean, worst, behind):
+        self.ui.lbl_frame_time.setText(f'{1000 / max(mean, 1):.0f} fps, {worst:.0f} ms worst')
+        self.ui.lbl_frame_time.setStyleSheet('color: red' if behind else '')
+
+    def list_value_changed(self, current, previous):
+        if not current.isValid():
             return
+        fname = self.filter_model.name_at(current.row())
+        if fname == self.list_name:
+            return  # the filter changed but the same maze is still selected
         if self.maybe_save():
-            fname = current_item.text()
             self.set_maze(fname)
 
-    def set_maze(self, fname):
+    def set_maze(self, fname, wait=False):
+        ''' show a maze from the list, loading it in the background unless told to wait '''
+        self.list_name = fname
         self.statusBar().showMessage(fname)
-        # TODO make this Path a simple string
-        maze_file = Path(fname)
-        pathname = QDir.currentPath() / self.path_to_maze_files / maze_file
-        with open(pathname, 'r') as maze_file:
-            # TODO do some error checking here
-            new_maze = Maze.parse_maze_file(maze_file)
-            self.maze_item.set_maze(new_maze)
-        self.set_current_file(str(pathname))
-        self.maze_item.update()
-
-    def filter_filenames(self, filter_text):
-        keywords = filter_text.lower().split(' ')
-        self.ui.lw_maze_list.clear()
-        for fname in self.maze_file_names:
-            for key in keywords:
-                if key not in str(fname).lower():
-                    break
-            else:
-                self.ui.lw_maze_list.addItem(str(fname))
-        self.ui.lw_maze_list.setCurrentRow(0)
+        pathname = self.list_path(fname)
+        if wait:
+            loaded = self.loader.load_now(fname, pathname, self.maze_item.solver_name)
+            self.on_maze_loaded(fname, str(pathname), loaded)
+        else:
+            self.loader.request(fname, pathname, self.maze_item.solver_name)
+        self.prefetch_neighbours()
+
+    def list_path(self, fname):
+        return QDir.currentPath() / self.path_to_maze_files / Path(fname)
+
+    def on_maze_loaded(self, fname, pathname, loaded):
+        self.maze_item.set_maze(loaded.maze, loaded)
+        self.set_current_file(pathname)
+
+    def on_load_failed(self, fname, pathname, error):
+        self.statusBar().showMessage(f"Cannot read {fname}: {error}")
+
+    def prefetch_neighbours(self):
+        ''' load the entries either side of the selection so that stepping through the list is quick '''
+        from loader import PREFETCH_ROWS
+        row = self.ui.lv_maze_list.currentIndex().row()
+        if row < 0:
+            return
+        entries = []
+        for offset in range(1, PREFETCH_ROWS + 1):
+            for neighbour in (row + offset, row - offset):
+                if 0 <= neighbour < self.filter_model.rowCount():
+                    fname = self.filter_model.name_at(neighbour)
+                    entries.append((fname, self.list_path(fname)))
+        self.loader.prefetch(entries, self.maze_item.solver_name)
+
+    def filter_filenames(self):
+        '''
+        show the files whose names hold every keyword typed. The selection
+        stays on the maze being edited if it is still listed, and otherwise
+        is cleared, so filtering never loads a maze by itself
+        '''
+        self.filter_model.set_filter(self.ui.le_maze_filter.text())
+        row = self.filter_model.row_of(self.list_name) if self.list_name else -1
+        if row >= 0:
+            self.ui.lv_maze_list.setCurrentIndex(self.filter_model.index(row))
+            self.ui.lv_maze_list.scrollTo(self.filter_model.index(row))
+        self.thumbnail_timer.start()
+
+    def start_indexing(self):
+        '''
+        bring the feature index of the listed files up to date in the
+        background. If it is already being done it is done again afterwards
+        for the files that changed in the meantime
+        '''
+        from corpus_index import IndexTask
+        if self.index_task is not None:
+            self.index_pending = True
+            return
+        entries = self.filter_model.feature_entries or None  # loaded from the disk the first time
+        self.index_task = IndexTask(self.path_to_maze_files, self.list_model.names, self.index_signals, entries)
+        QtCore.QThreadPool.globalInstance().start(self.index_task)
+
+    def on_index_ready(self, entries, updated, read):
+        from corpus_index import parse_query
+        self.index_task = None
+        self.filter_model.set_features(entries, updated)
+        if read:
+            self.statusBar().showMessage(f'{read} maze files indexed')
+        if parse_query(self.ui.le_maze_filter.text())[1]:
+            self.filter_filenames()
+        if self.index_pending:
+            self.index_pending = False
+            self.start_indexing()
+
+    def on_corpus_changed(self, added, removed, modified):
+        ''' follow maze files added, removed or changed on disk in the list, the caches and the index '''
+        self.list_model.update_names(added, removed)
+        for name, info in list(removed.items()) + list(modified.items()):
+            self.thumbnails.forget(name, self.path_to_maze_files / name, info)
+        for name in modified:
+            self.list_model.thumbnail_ready(name, None)  # repainted without it until it is drawn again
+        self.thumbnail_timer.start()
+        self.start_indexing()
+        if self.list_name in modified and not self.maze_item.is_modified and not self.playback.active:
+            try:
+                with open(self.list_path(self.list_name), 'r') as file:
+                    changed = file.read() != self.maze_item.maze.get_maze_string()
+            except OSError:
+                changed = False
+            if changed:  # changed by something other than a save from here
+                self.set_maze(self.list_name)
+        self.statusBar().showMessage(f'{len(added)} maze files added, {len(removed)} removed, '
+                                     f'{len(modified)} changed', 2000)
+
+    def request_visible_thumbnails(self):
+        ''' ask for the thumbnails of the rows in view and forget the rest '''
+        list_view = self.ui.lv_maze_list
+        count = self.filter_model.rowCount()
+        if count == 0:
+            return
+        top = list_view.indexAt(QtCore.QPoint(0, 0)).row()
+        bottom = list_view.indexAt(QtCore.QPoint(0, list_view.viewport().height() - 1)).row()
+        if top < 0:
+            top = 0
+        if bottom < 0:
+            # the list ends in view, or the batched layout has not reached the bottom of the view yet
+            row_height = max(list_view.sizeHintForRow(top), 1)
+            bottom = min(count - 1, top + list_view.viewport().height() // row_height)
+        visible = set()
+        for row in range(top, bottom + 1):
+            name = self.filter_model.name_at(row)
+            visible.add(name)
+            if self.thumbnails.icon(name) is None:
+                self.thumbnails.request(name, self.path_to_maze_files / name)
+        self.thumbnails.cancel_except(visible)
 
     def read_settings(self):
         ''' get path and recent files list '''
@@ -206,16 +490,95 @@ class MainWindow(QtWidgets.QMainWindow):
             self.restoreGeometry(geometry)
         else:
             self.resize(1200, 900)
+        journal = settings.value('journal', '')
+        if journal:
+            self.recovery = (journal, settings.value('journal_file', ''))
         pass
 
     def write_settings(self):
         ''' save path and recent files list '''
         settings = QSettings("micromouseonline.com", "pyqt_maze_editor")
         settings.setValue('geometry', self.saveGeometry())
+        settings.remove('journal')
+        settings.remove('journal_file')
         pass
 
+    def open_journal(self):
+        '''
+        the journal of the maze on show, made by the maze item at its first
+        edit, so that stepping through the list touches no journal at all
+        '''
+        from journal import Journal, journal_path
+        self.journal = Journal(journal_path(self.current_file_name), self.maze_item.maze, self.journal_sync)
+        # if the editor never gets to close cleanly this journal is replayed the next time it starts
+        settings = QSettings("micromouseonline.com", "pyqt_maze_editor")
+        settings.setValue('journal', str(self.journal.path))
+        settings.setValue('journal_file', self.current_file_name)
+        return self.journal
+
+    def end_journal(self):
+        '''
+        the edits in the last journal have been saved or thrown away by now,
+        so it goes. The next edit starts a new one.
+        '''
+        self.maze_item.set_journal(None)
+        if self.journal is None:
+            return
+        self.journal.discard()
+        self.journal = None
+        settings = QSettings("micromouseonline.com", "pyqt_maze_editor")
+        settings.remove('journal')
+        settings.remove('journal_file')
+
+    def recover_journal(self):
+        ''' replay the journal of a session that did not close, and carry on editing the maze it rebuilds '''
+        from journal import Journal
+        if self.recovery is None:
+            return
+        path, file_name = self.recovery
+        self.recovery = None
+        recovered = Journal.replay(path)
+        if recovered is None:
+            return
+        self.loader.cancel()
+        self.list_name = None
+        self.maze_item.set_maze(recovered)
+        self.current_file_name = file_name
+        self.end_journal()
+        self.maze_item.set_journal(self.open_journal())
+        if self.journal.path != Path(path):
+            # the maze file has changed since, so the recovered maze goes in a journal of its own
+            try:
+                self.journal.compact()
+                os.unlink(path)
+            except OSError:
+                pass  # the old journal is still there to recover from
+        name = QFileInfo(file_name).fileName() if file_name else 'untitled'
+        self.setWindowTitle(F"PyQt Maze Editor - [{name}]")
+        self.maze_item.is_modified = True
+        self.setWindowModified(True)
+        self.statusBar().showMessage(f"Recovered unsaved edits to {name}")
+
+    def sync_journal(self):
+        if self.journal is not None:
+            self.journal.sync()
+
+    def autosave(self):
+        '''
+        compact the journal into a snapshot of the maze, so that it stays
+        short and replays quickly. The maze file itself is only written when
+        it is saved.
+        '''
+        if self.journal is not None and self.journal.records:
+            try:
+                self.journal.compact()
+            except OSError as error:
+                self.statusBar().showMessage(f"Cannot write the journal: {error}", 2000)
+
     def maybe_save(self):
         ''' check for unsaved file and save if desired '''
+        self.start()
+        self.stop_playback()
         if self.maze_item.is_modified:
             act = QMessageBox.warning(self, "Application",
                                       "The document has been modified.\nDo you want to save "
@@ -230,12 +593,16 @@ class MainWindow(QtWidgets.QMainWindow):
 
     def new_file(self,size):
         ''' create new empty maze'''
+        from maze import Maze, empty_classic_maze, empty_half_size
         if size == 16:
-            new_maze = Maze.parse_maze_lines(maze.empty_classic_maze)
+            new_maze = Maze.parse_maze_lines(empty_classic_maze)
         else:
-            new_maze = Maze.parse_maze_lines(maze.empty_half_size)
+            new_maze = Maze.parse_maze_lines(empty_half_size)
         self.current_file_name = ""
+        self.loader.cancel()
+        self.list_name = None
         self.maze_item.set_maze(new_maze)
+        self.end_journal()
         self.setWindowTitle(F"PyQt Maze Editor - [{self.current_file_name}]")
         pass
 
@@ -283,13 +650,17 @@ class MainWindow(QtWidgets.QMainWindow):
 
     def load_file(self, file_name):
         """ Read maze file from disk """
+        from maze import Maze
         with open(file_name, 'r') as file:
             disk_maze = Maze.parse_maze_file(file)
+        self.loader.cancel()
+        self.list_name = None
         self.maze_item.set_maze(disk_maze)
         self.set_current_file(file_name)
 
     def save_file(self, filename):
         """ Saves the maze data to disk """
+        self.stop_playback()
         lines = self.maze_item.maze.get_maze_string()
         error = None
         file = QSaveFile(filename)
@@ -310,11 +681,52 @@ class MainWindow(QtWidgets.QMainWindow):
         self.statusBar().showMessage("File Saved",2000)
         return True
 
+    def export_timings(self):
+        ''' save every recorded timing with the rolling statistics '''
+        from instrumentation import TIMINGS
+        file_name, file_filter = QFileDialog.getSaveFileName(self, "Export timings",
+                                                             QtCore.QDir.currentPath() + "/timings.json",
+                                                             "JSON files (*.json);;All files (*.*)")
+        if not file_name:
+            return
+        try:
+            with open(file_name, 'w') as file:
+                file.write(TIMINGS.to_json())
+        except OSError as error:
+            QMessageBox.warning(self, "Unable to Export Timings", f"Cannot write file {file_name}:\n{error}.")
+            return
+        self.statusBar().showMessage("Timings Exported", 2000)
+
+    def compare(self):
+        ''' show the maze being edited beside maze files picked to compare it with '''
+        from compareview import CompareWindow, MAX_COMPARED, partner_file
+        from maze import MAZE_FILE_ERRORS, Maze
+        self.start()
+        if self.maze_item.maze is None:
+            return
+        current = self.current_file_name
+        start = partner_file(current) or (os.path.dirname(current) if current else str(self.path_to_maze_files))
+        filters = "Text files (*.txt);;Maze files (*.maze);;All files (*.*)"
+        file_names, file_filter = QFileDialog.getOpenFileNames(self, "Compare with", start, filters)
+        if not file_names:
+            return
+        name = QFileInfo(current).fileName() if current else 'untitled'
+        mazes = [(name + (' *' if self.maze_item.is_modified else ''), self.maze_item.maze.copy())]
+        for file_name in file_names[:MAX_COMPARED - 1]:
+            try:
+                with open(file_name, 'r') as file:
+                    mazes.append((QFileInfo(file_name).fileName(), Maze.parse_maze_file(file)))
+            except MAZE_FILE_ERRORS as error:
+                QMessageBox.warning(self, "Unable to Compare", f"Cannot read file {file_name}:\n{error}.")
+                return
+        CompareWindow(mazes, self.maze_item.solver_name, self).show()
+
     def set_current_file(self,filename):
         """ after save/load update recent files and window title """
         self.current_file_name = filename
         name = QFileInfo(self.current_file_name).fileName()
         self.maze_item.is_modified = False
+        self.end_journal()
         self.setWindowTitle(F"PyQt Maze Editor - [{name}]")
         self.setWindowModified(False)
 
@@ -334,8 +746,24 @@ class MainWindow(QtWidgets.QMainWindow):
                           "triple characters for horizontal walls")
 
     def closeEvent(self, event):
+        if not self.is_started:
+            event.accept()  # nothing has been opened yet, and a journal left to recover is kept for next time
+            return
         if self.maybe_save():
             self.write_settings()
+            # nothing more is started once the window has gone
+            self.scan_timer.stop()
+            self.thumbnail_timer.stop()
+            self.corpus_watcher.stop()
+            self.index_pending = False
+            self.thumbnails.stop()
+            self.loader.stop()
+            self.flood_worker.stop()
+            if self.journal is not None:
+                self.journal.discard()
+            if self.index_task is not None:
+                self.index_task.stop()
+            QtCore.QThreadPool.globalInstance().waitForDone()
             event.accept()
         else:
             event.ignore()
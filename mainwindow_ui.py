@@ -38,19 +38,33 @@ class Ui_MainWindow(object):
         self.maze_view.setBackgroundBrush(brush)
         self.maze_view.setObjectName("maze_view")
         self.verticalLayout_2.addWidget(self.maze_view)
+        self.horizontalLayout_playback = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_playback.setObjectName("horizontalLayout_playback")
         self.hs_progress = QtWidgets.QSlider(self.centralwidget)
+        self.hs_progress.setEnabled(False)
         self.hs_progress.setOrientation(QtCore.Qt.Horizontal)
         self.hs_progress.setObjectName("hs_progress")
-        self.verticalLayout_2.addWidget(self.hs_progress)
+        self.horizontalLayout_playback.addWidget(self.hs_progress)
+        self.sb_speed = QtWidgets.QSpinBox(self.centralwidget)
+        self.sb_speed.setMinimum(1)
+        self.sb_speed.setMaximum(1000)
+        self.sb_speed.setProperty("value", 20)
+        self.sb_speed.setObjectName("sb_speed")
+        self.horizontalLayout_playback.addWidget(self.sb_speed)
+        self.lbl_frame_time = QtWidgets.QLabel(self.centralwidget)
+        self.lbl_frame_time.setText("")
+        self.lbl_frame_time.setObjectName("lbl_frame_time")
+        self.horizontalLayout_playback.addWidget(self.lbl_frame_time)
+        self.verticalLayout_2.addLayout(self.horizontalLayout_playback)
         self.horizontalLayout_2.addLayout(self.verticalLayout_2)
         self.verticalLayout_5 = QtWidgets.QVBoxLayout()
         self.verticalLayout_5.setObjectName("verticalLayout_5")
-        self.pb_button_a = QtWidgets.QPushButton(self.centralwidget)
-        self.pb_button_a.setObjectName("pb_button_a")
-        self.verticalLayout_5.addWidget(self.pb_button_a)
-        self.pb_button_b = QtWidgets.QPushButton(self.centralwidget)
-        self.pb_button_b.setObjectName("pb_button_b")
-        self.verticalLayout_5.addWidget(self.pb_button_b)
+        self.pb_run = QtWidgets.QPushButton(self.centralwidget)
+        self.pb_run.setObjectName("pb_run")
+        self.verticalLayout_5.addWidget(self.pb_run)
+        self.pb_stop = QtWidgets.QPushButton(self.centralwidget)
+        self.pb_stop.setObjectName("pb_stop")
+        self.verticalLayout_5.addWidget(self.pb_stop)
         self.line = QtWidgets.QFrame(self.centralwidget)
         self.line.setFrameShape(QtWidgets.QFrame.HLine)
         self.line.setFrameShadow(QtWidgets.QFrame.Sunken)
@@ -65,9 +79,9 @@ class Ui_MainWindow(object):
         self.label_3.setFont(font)
         self.label_3.setObjectName("label_3")
         self.verticalLayout_4.addWidget(self.label_3)
-        self.cb_solve_manhattan = QtWidgets.QCheckBox(self.centralwidget)
-        self.cb_solve_manhattan.setObjectName("cb_solve_manhattan")
-        self.verticalLayout_4.addWidget(self.cb_solve_manhattan)
+        self.cmb_solver = QtWidgets.QComboBox(self.centralwidget)
+        self.cmb_solver.setObjectName("cmb_solver")
+        self.verticalLayout_4.addWidget(self.cmb_solver)
         self.horizontalLayout = QtWidgets.QHBoxLayout()
         self.horizontalLayout.setObjectName("horizontalLayout")
         self.cb_solve_weighted = QtWidgets.QCheckBox(self.centralwidget)
@@ -97,6 +111,9 @@ class Ui_MainWindow(object):
         self.cb_show_costs = QtWidgets.QCheckBox(self.centralwidget)
         self.cb_show_costs.setObjectName("cb_show_costs")
         self.verticalLayout_3.addWidget(self.cb_show_costs)
+        self.cb_show_heatmap = QtWidgets.QCheckBox(self.centralwidget)
+        self.cb_show_heatmap.setObjectName("cb_show_heatmap")
+        self.verticalLayout_3.addWidget(self.cb_show_heatmap)
         self.cb_show_directions = QtWidgets.QCheckBox(self.centralwidget)
         self.cb_show_directions.setObjectName("cb_show_directions")
         self.verticalLayout_3.addWidget(self.cb_show_directions)
@@ -123,9 +140,9 @@ class Ui_MainWindow(object):
         self.le_maze_filter.setText("")
         self.le_maze_filter.setObjectName("le_maze_filter")
         self.verticalLayout.addWidget(self.le_maze_filter)
-        self.lw_maze_list = QtWidgets.QListWidget(self.centralwidget)
-        self.lw_maze_list.setObjectName("lw_maze_list")
-        self.verticalLayout.addWidget(self.lw_maze_list)
+        self.lv_maze_list = QtWidgets.QListView(self.centralwidget)
+        self.lv_maze_list.setObjectName("lv_maze_list")
+        self.verticalLayout.addWidget(self.lv_maze_list)
         self.verticalLayout_5.addLayout(self.verticalLayout)
         self.horizontalLayout_2.addLayout(self.verticalLayout_5)
         self.horizontalLayout_2.setStretch(0, 75)
@@ -169,17 +186,25 @@ class Ui_MainWindow(object):
     def retranslateUi(self, MainWindow):
         _translate = QtCore.QCoreApplication.translate
         MainWindow.setWindowTitle(_translate("MainWindow", "MainWindow"))
-        self.pb_button_a.setText(_translate("MainWindow", "PushButton"))
-        self.pb_button_b.setText(_translate("MainWindow", "PushButton"))
+        self.hs_progress.setToolTip(_translate("MainWindow", "Steps of the simulated run, drag to scrub"))
+        self.sb_speed.setToolTip(_translate("MainWindow", "Playback speed"))
+        self.sb_speed.setSuffix(_translate("MainWindow", " cells/s"))
+        self.lbl_frame_time.setToolTip(_translate("MainWindow", "Time between frames, red when the display cannot keep up"))
+        self.pb_run.setToolTip(_translate("MainWindow", "Play or pause a simulated exploration run of the maze"))
+        self.pb_run.setText(_translate("MainWindow", "Run"))
+        self.pb_stop.setToolTip(_translate("MainWindow", "Stop the run and go back to editing"))
+        self.pb_stop.setText(_translate("MainWindow", "Stop"))
         self.label_3.setText(_translate("MainWindow", "Solver Types"))
-        self.cb_solve_manhattan.setText(_translate("MainWindow", "Manhattan"))
+        self.cmb_solver.setToolTip(_translate("MainWindow", "Solver used for the costs, directions and path"))
         self.cb_solve_weighted.setText(_translate("MainWindow", "Corner Weighted"))
         self.label_2.setText(_translate("MainWindow", "Options"))
         self.cb_show_costs.setText(_translate("MainWindow", "Costs"))
+        self.cb_show_heatmap.setToolTip(_translate("MainWindow", "Colour the cells by their cost to the goal"))
+        self.cb_show_heatmap.setText(_translate("MainWindow", "Heatmap"))
         self.cb_show_directions.setText(_translate("MainWindow", "Directions"))
         self.cb_show_paths.setText(_translate("MainWindow", "Paths"))
         self.label.setText(_translate("MainWindow", "Mazes"))
-        self.le_maze_filter.setPlaceholderText(_translate("MainWindow", "Filter"))
+        self.le_maze_filter.setPlaceholderText(_translate("MainWindow", "Filter, e.g. japan path>100 goal=ne"))
         self.actionOpen.setText(_translate("MainWindow", "Open"))
         self.actionSave.setText(_translate("MainWindow", "Save"))
         self.actionSave_As.setText(_translate("MainWindow", "Save As"))
@@ -12,6 +12,7 @@
 
 import sys
 import numpy as np
+from instrumentation import timed
 
 MAZE_SIZE = 16
 
@@ -21,6 +22,10 @@ SOUTH_BIT = 4
 WEST_BIT = 8
 VISITED_BIT = 16
 
+# what reading a maze file can raise: the file itself, its text encoding,
+# or a layout that parse_maze_lines cannot follow, such as an empty file
+MAZE_FILE_ERRORS = (OSError, ValueError, IndexError)
+
 
 class Maze:
     """
@@ -48,6 +53,17 @@ class Maze:
         # start and goal cells
         self.start = []
         self.goals = []
+        # connected regions, created on demand and kept current by wall edits
+        self.connectivity = None
+
+    def copy(self):
+        """ a separate maze with the same walls, start and goals """
+        maze = Maze(self.size)
+        np.copyto(maze.walls, self.walls)
+        np.copyto(maze.knowns, self.knowns)
+        maze.start = [list(cell) for cell in self.start]
+        maze.goals = [list(cell) for cell in self.goals]
+        return maze
 
     @classmethod
     def uniquify(cls, x, y, d):
@@ -90,7 +106,7 @@ class Maze:
 
     def get_cell_xy(self, i):
         """ calculate the cell_x and cell_y from an index """
-        return i // self.size, i % self.size
+        return i % self.size, i // self.size
 
     def is_outside_maze(self, x, y):
         """
@@ -114,8 +130,10 @@ class Maze:
         if self.is_outside_maze(x, y):
             return True
         i = self.get_wall_index(x, y, z)
-        if new_state is not None:
+        if new_state is not None and self.walls[i] != new_state:
             self.walls[i] = new_state
+            if self.connectivity is not None:
+                self.connectivity.on_wall_changed(x, y, z, new_state)
         if new_known is not None:
             self.knowns[i] = new_known
         return self.walls[i]
@@ -157,6 +175,29 @@ class Maze:
             wall_data += WEST_BIT
         return wall_data
 
+    def get_passages(self):
+        """
+        get the open passages between neighbouring cells as two boolean arrays
+        indexed [y, x]. east[y, x] is True when a mouse can move from (x, y) to
+        (x + 1, y) and north[y, x] is True when it can move from (x, y) to (x, y + 1).
+        The outer walls are always closed.
+        """
+        n = self.size
+        east = ~self.walls[:self.cell_index_size].reshape(n, n)
+        north = ~self.walls[self.cell_index_size:].reshape(n, n)
+        east[:, -1] = False
+        north[-1, :] = False
+        return east, north
+
+    def get_connectivity(self):
+        """
+        get the connected regions of the maze, labelling them on first use
+        """
+        if self.connectivity is None:
+            from connectivity import Connectivity  # connectivity imports this module
+            self.connectivity = Connectivity(self)
+        return self.connectivity
+
     def _known(self, x, y, d, new_known=None):
         """
         get or update a known flag of a wall
@@ -197,6 +238,7 @@ class Maze:
                'goals: ' + ', '.join([f'({x}, {y})' for x, y in self.goals])
 
     @staticmethod
+    @timed()
     def parse_maze_file(file):
         """
         parse a maze string from file and construct a maze object
@@ -6,6 +6,7 @@
 # description: A Maze Editor written using PyQt5
 # python version >= 3.8
 # ============================================================================ #
+import hashlib
 import math
 import struct
 from itertools import product
@@ -14,9 +15,9 @@ import numpy
 
 # from PyQt5.QtCore import
 import numpy as np
-from PyQt5.QtGui import QBrush, QPen, QColor, QPicture, QFont, QPainter, QFontMetrics
+from PyQt5.QtGui import QBrush, QPen, QColor, QFont, QPainter, QFontMetrics, QPixmap, QPixmapCache, QRegion, QStaticText
 from PyQt5.QtCore import QPointF
-from PyQt5.QtWidgets import QGraphicsItem
+from PyQt5.QtWidgets import QGraphicsItem, QStyleOptionGraphicsItem
 # from PyQt5 import QtGui
 from PyQt5 import QtCore
 
@@ -27,12 +28,19 @@ from maze import SOUTH_BIT
 from maze import VISITED_BIT
 from maze import WEST_BIT
 from maze import Maze
-from flooding import Manhattan
+from flooding import SOLVERS, DualFlood
+from floodworker import MazeSnapshot
+from heatmap import Heatmap
+from instrumentation import timed
+from geometry import geometry_for, to_lines, to_points, to_rects
+from layers import OverlayLayer
+from routes import RouteStats
 
 BLACK = QColor(0, 0, 0)
 DARK_GRAY = QColor(10, 10, 10)
 GOAL_COLOR = QColor(0,42,0)
 HOME_COLOR = QColor(16,0,16)
+UNREACHABLE_COLOR = QColor(40, 40, 40)
 GRAY = QColor(100, 100, 100)
 GREEN = QColor(0, 255, 0)
 RED = QColor(255, 0, 0)
@@ -44,6 +52,26 @@ WALL_COLOR = RED
 POST_COLOR = YELLOW
 NO_PEN = QtCore.Qt.PenStyle.NoPen
 
+# how the static layer of cells, posts and walls is kept between repaints
+CACHE_NONE = 0  # redraw every time
+CACHE_PIXMAP = 1  # blit a QPixmap rendered at the device resolution
+MAX_CACHE_PIXMAP_SIZE = 4096  # larger pixmaps fall back to drawing every time
+# a pixmap this many times the area on show is no quicker to blit than drawing the walls, so they are drawn
+MAX_CACHE_PIXMAP_EXPOSURE = 3
+MAX_DIRTY_RECTS = 256  # after this many edits the pixmap is redrawn in full
+
+# level of detail: overlays that would be unreadable are not drawn below these cell sizes
+MIN_TEXT_CELL_PIXELS = 24
+MIN_ARROW_CELL_PIXELS = 10
+
+# walls painted by dragging are shown at most once a frame and flooded when the stroke ends or pauses
+STROKE_FRAME_MS = 16
+STROKE_IDLE_MS = 150
+
+# overlays waiting for a flood on the worker thread are dimmed if it takes longer than this
+FLOOD_DIM_DELAY_MS = 100
+STALE_OVERLAY_OPACITY = 0.4
+
 
 class Arrow():
     def __init__(self, start, end):
@@ -52,9 +80,8 @@ class Arrow():
 
 
     @classmethod
-    def draw(self, painter, src, dst, color=WHITE):
-        """ draw an arrow between two points """
-        painter.drawLine(src, dst)
+    def lines(cls, src, dst):
+        """ the shaft and the two sides of the head of an arrow between two points """
         line = QtCore.QLineF(src, dst)
         angle = math.acos(line.dx() / line.length())
         if line.dy() >= 0:
@@ -62,8 +89,12 @@ class Arrow():
         size = line.length() / 4
         p1 = dst + QPointF(math.sin(angle - math.pi / 3) * size, math.cos(angle - math.pi / 3) * size)
         p2 = dst + QPointF(math.sin(angle - math.pi + math.pi / 3) * size, math.cos(angle - math.pi + math.pi / 3) * size)
-        painter.drawLine(dst, p1)
-        painter.drawLine(dst, p2)
+        return [line, QtCore.QLineF(dst, p1), QtCore.QLineF(dst, p2)]
+
+    @classmethod
+    def draw(self, painter, src, dst, color=WHITE):
+        """ draw an arrow between two points """
+        painter.drawLines(self.lines(src, dst))
         return
 
 
@@ -75,301 +106,809 @@ class MazeItem(QGraphicsItem):
         self.x = 0
         self.y = 0
         # set some basic default values
-        self.maze_size = 16
-        self.cell_width = 2880 // self.maze_size
-        self.wall_width = max(4, 192 // self.maze_size)
-        self.width = self.maze_size * self.cell_width + self.wall_width
-        self.base_rect = QtCore.QRect(0, 0, self.width, self.width)
+        self.geometry = None
+        self.set_geometry(geometry_for(16))
         self.path_length = 0
         self.notes = ''
+        self.shown_notes = None
+        self.glyphs = {}  # prepared cost numbers keyed by value and font size
         self.is_modified = False
+        self.read_only = False  # clicks do not edit the maze, for example during playback
+        self.journal = None  # records every edit so that it can be recovered after a crash
+        self.new_journal = None  # makes the journal at the first edit, so mazes that are only looked at cost no disk writes
         self.needs_flood = True
         self.flooder = None
+        self.solver_name = 'Manhattan'
+        self.route_stats = RouteStats()
+        self.track_routes = True  # route statistics are redone with every flood
+        # with a worker the floods run off the GUI thread and the last one stays on show until the next arrives
+        self.flood_worker = None
+        self.flood_version = 0  # counts the floods asked for, results of older ones are dropped
+        self.flood_pending = False
+        self.dim_timer = QtCore.QTimer()
+        self.dim_timer.setSingleShot(True)
+        self.dim_timer.setInterval(FLOOD_DIM_DELAY_MS)
+        self.dim_timer.timeout.connect(self.dim_overlays)
         self.display_costs = False
+        self.display_heatmap = False
+        self.heatmap = Heatmap()
+        self.heatmap_image = None  # the heatmap of the last flood, None when it has to be made again
         self.display_arrows = False
         self.display_paths = False
+        # the static layer is recorded once for each version of the maze
+        self.maze_version = 0
+        self.static_cache = CACHE_PIXMAP
+        self.static_pixmap = None
+        self.static_pixmap_key = None
+        self.static_digest = None  # identifies the maze drawn, so that items showing the same maze share pixmaps
+        self.static_digest_version = -1
+        self.static_rects = None
+        self.static_rects_version = -1
+        self.static_dirty = None  # rectangles edited since the pixmap was drawn, None for all of it
+        self.unreachable = None  # the unreachable cells as last drawn
+        self.region_notes = None  # the dead end, loop and isolated area counts, which only change with the walls
+        self.region_notes_version = -1
+        # a drag sets or clears walls as it goes, with a single flood for the stroke
+        self.stroke = None  # the state being painted into the walls, None when not dragging
+        self.stroke_position = None
+        self.stroke_rects = []  # walls edited but not repainted yet
+        self.stroke_needs_flood = False
+        self.stroke_frame_timer = QtCore.QTimer()
+        self.stroke_frame_timer.setSingleShot(True)
+        self.stroke_frame_timer.setInterval(STROKE_FRAME_MS)
+        self.stroke_frame_timer.timeout.connect(self.show_stroke)
+        self.stroke_idle_timer = QtCore.QTimer()
+        self.stroke_idle_timer.setSingleShot(True)
+        self.stroke_idle_timer.setInterval(STROKE_IDLE_MS)
+        self.stroke_idle_timer.timeout.connect(self.flood_stroke)
+        # overlays are child items, each with its own cache, drawn in this order
+        self.heatmap_layer = OverlayLayer(self, self.paint_heatmap)
+        # the heatmap goes under the walls, which are drawn without the cells while it is shown
+        self.heatmap_layer.setFlag(QGraphicsItem.ItemStacksBehindParent)
+        self.cost_layer = OverlayLayer(self, self.paint_costs)
+        self.arrow_layer = OverlayLayer(self, self.paint_arrows)
+        self.path_layer = OverlayLayer(self, self.paint_path)
+        self.notes_layer = OverlayLayer(self, self.paint_notes)
+        self.heatmap_layer.setVisible(self.display_heatmap)
+        self.cost_layer.setVisible(self.display_costs)
+        self.arrow_layer.setVisible(self.display_arrows)
+        self.path_layer.setVisible(self.display_paths)
 
     def boundingRect(self):
         ''' all graphics items must implement this '''
-        return QtCore.QRectF(self.base_rect.adjusted(-20, -20, 20, 80))
+        return QtCore.QRectF(self.base_rect.adjusted(-20, -20, 20, 240))
+
+    def set_geometry(self, geometry):
+        ''' use the shared tables for a maze size to place everything '''
+        if self.geometry is not None:
+            self.prepareGeometryChange()
+        self.geometry = geometry
+        self.maze_size = geometry.size
+        self.cell_width = geometry.cell_width
+        self.wall_width = geometry.wall_width
+        self.width = geometry.width
+        self.base_rect = QtCore.QRect(0, 0, self.width, self.width)
 
-    def set_maze(self, maze):
+    def set_maze(self, maze, flooded=None):
+        '''
+        show a maze. flooded can give a solver and route statistics already
+        updated for it, as a loader.LoadedMaze does, so it is not flooded again
+        '''
         self.maze = maze
-        self.maze_size = self.maze.size
-        self.cell_width = 2880 // self.maze_size
-        self.wall_width = max(4, 192 // self.maze_size)
-        self.width = self.maze_size * self.cell_width + self.wall_width
-        self.flooder = Manhattan(maze)
+        if maze.size != self.geometry.size:
+            self.set_geometry(geometry_for(maze.size))
+        # a flood of the last maze still on the worker is of no use now
+        self.flood_version += 1
+        self.set_flood_pending(False)
+        if flooded is not None and not isinstance(flooded.flooder, SOLVERS[self.solver_name]):
+            flooded = None
+        if flooded is not None:
+            self.flooder = flooded.flooder
+            self.route_stats = flooded.route_stats
+        else:
+            if not isinstance(self.flooder, SOLVERS[self.solver_name]):
+                self.flooder = SOLVERS[self.solver_name](maze)
+            self.route_stats.set_maze(maze)
+            if self.flood_worker is not None:
+                # the last maze's overlays would be wrong for this one, so show none until it is flooded
+                self.flooder.set_maze(maze)
+                self.flooder.result.clear()
         self.is_modified = False
+        self.maze_changed()
+        if flooded is not None:
+            self.needs_flood = False
+            self.path_length = self.measure_path()
+
+    def maze_changed(self, rect=None, flood=True):
+        '''
+        call after any edit so that the flood and the cached layers are redone.
+        An edit that gives the rectangle it changed, or a list of them for
+        several edits at once, is flooded straight away and only the parts of
+        the layers that changed are repainted. With flood False only the walls
+        are repainted and the overlays keep the last flood until reflood().
+        '''
+        self.maze_version += 1
+        if flood:
+            self.needs_flood = True
+        rects = [rect] if isinstance(rect, QtCore.QRectF) else rect
+        if rects is None or self.static_dirty is None or len(self.static_dirty) + len(rects) > MAX_DIRTY_RECTS:
+            self.static_dirty = None
+            self.unreachable = self.maze.get_connectivity().unreachable_cells().copy()
+            self.update()
+            self.update_overlays()
+            return
+        for rect in rects:
+            self.static_dirty.append(rect)
+            self.update(rect)
+        unreachable = self.maze.get_connectivity().unreachable_cells().copy()
+        for cell in np.flatnonzero(unreachable != self.unreachable):
+            self.static_dirty.append(self.cell_rect(cell % self.maze_size, cell // self.maze_size))
+            self.update(self.static_dirty[-1])
+        self.unreachable = unreachable
+        if flood:
+            self.reflood()
+
+    def reflood(self):
+        ''' flood after edits and repaint the overlay cells that changed '''
         self.needs_flood = True
-        self.update()
+        self.ensure_flood()
+        if self.flood_worker is None:
+            self.update_changed_overlays()
+
+    def set_journal(self, journal):
+        ''' record the edits made from now on in a journal, or in one from new_journal at the next edit with None '''
+        self.journal = journal
+
+    def edit_journal(self):
+        ''' the journal to record an edit in '''
+        if self.journal is None and self.new_journal is not None:
+            self.journal = self.new_journal()
+        return self.journal
+
+    def set_flood_worker(self, worker):
+        ''' flood on a worker thread from now on, or on the GUI thread again with None '''
+        if self.flood_worker is not None:
+            self.flood_worker.flooded.disconnect(self.on_flooded)
+            self.flood_worker.flood_failed.disconnect(self.on_flood_failed)
+        self.flood_worker = worker
+        self.flood_version += 1
+        self.set_flood_pending(False)
+        if worker is not None:
+            worker.flooded.connect(self.on_flooded)
+            worker.flood_failed.connect(self.on_flood_failed)
+
+    def request_flood(self):
+        ''' send a snapshot of the maze to the worker, leaving the overlays as they are until it comes back '''
+        self.flooder.set_maze(self.maze)  # the result must fit the maze while it is drawn in the meantime
+        self.flood_version += 1
+        self.flood_worker.submit(MazeSnapshot(self.maze, self.flood_version, self.solver_name, self.track_routes))
+        self.needs_flood = False
+        self.set_flood_pending(True)
+
+    def on_flooded(self, version, flooder, route_stats):
+        ''' take a flood from the worker if it is of the latest snapshot, and repaint what it changed '''
+        if version != self.flood_version:
+            return
+        self.set_flood_pending(False)
+        self.flooder.set_maze(self.maze)
+        self.flooder.result.remember()
+        self.flooder.result.copy_from(flooder.result)
+        self.flooder.expansions = flooder.expansions
+        if route_stats is not None:
+            self.route_stats = route_stats
+        self.path_length = self.measure_path()
+        self.update_changed_overlays()
+
+    def on_flood_failed(self, version):
+        ''' keep showing the last flood, undimmed, when the latest one raised '''
+        if version == self.flood_version:
+            self.set_flood_pending(False)
+
+    def set_flood_pending(self, pending):
+        self.flood_pending = pending
+        if pending:
+            if not self.dim_timer.isActive():
+                self.dim_timer.start()
+            return
+        self.dim_timer.stop()
+        for layer in self.overlay_layers():
+            layer.setOpacity(1.0)
+
+    def dim_overlays(self):
+        ''' show that the overlays are out of date while a slow flood runs '''
+        if self.flood_pending:
+            for layer in self.overlay_layers():
+                layer.setOpacity(STALE_OVERLAY_OPACITY)
+
+    def overlay_layers(self):
+        return [self.heatmap_layer, self.cost_layer, self.arrow_layer, self.path_layer, self.notes_layer]
+
+    def update_overlays(self):
+        ''' invalidate the overlay caches, leaving the static layer alone '''
+        self.heatmap_image = None
+        for layer in self.overlay_layers():
+            layer.update()
+
+    def update_changed_overlays(self):
+        ''' invalidate only the cells of the overlays that the last flood changed '''
+        result = self.flooder.result
+        changed = result.changed_cells()
+        if changed is None:
+            self.update_overlays()
+            return
+        if changed.any():
+            # the colours are scaled to the highest cost so the whole map can change
+            self.heatmap_image = None
+            self.heatmap_layer.update()
+        for cell in np.flatnonzero(changed):
+            rect = self.cell_rect(cell % self.maze_size, cell // self.maze_size)
+            self.cost_layer.update(rect)
+            self.arrow_layer.update(rect)
+        if result.path_changed():
+            old = self.path_pieces(result.previous_path, result.previous_heading)
+            new = self.path_pieces(result.path, result.heading)
+            for x, y, _, _ in old ^ new:
+                self.path_layer.update(self.cell_rect(x, y))
+            # the costs along the path are drawn in a different colour
+            old_cells = {(x, y) for x, y, _, _ in old}
+            new_cells = {(x, y) for x, y, _, _ in new}
+            for x, y in old_cells ^ new_cells:
+                self.cost_layer.update(self.cell_rect(x, y))
+        lines = self.notes_lines()
+        if self.shown_notes is None:
+            self.notes_layer.update()
+            return
+        for row, (line, shown) in enumerate(zip(lines, self.shown_notes)):
+            if line != shown:
+                self.notes_layer.update(self.notes_rect(row, max(line, shown, key=len)))
+
+    def path_pieces(self, path, headings):
+        ''' the cells of a path with the directions the path enters and leaves each one '''
+        cells = path.tolist()
+        leaving = [int(headings[self.maze.get_cell_index(x, y)]) for x, y in cells]
+        entering = [Maze.Unknown] + leaving[:-1]
+        return {(x, y, a, b) for (x, y), a, b in zip(cells, entering, leaving)}
+
+    def ensure_flood(self):
+        ''' flood the maze if it has changed since the last flood, or ask the worker to '''
+        if not self.needs_flood or self.maze is None:
+            return
+        if self.flood_worker is not None:
+            self.request_flood()
+            return
+        self.flooder.set_maze(self.maze)
+        self.flooder.result.remember()
+        self.flooder.update()
+        if self.track_routes:
+            self.route_stats.update()
+        self.path_length = self.measure_path()
+        self.heatmap_image = None
+        self.needs_flood = False
+
+    def set_solver(self, name):
+        ''' choose one of the registered solvers by name '''
+        self.solver_name = name
+        previous = self.flooder
+        self.flooder = SOLVERS[name](self.maze)
+        if self.flood_worker is not None and self.maze is not None and previous is not None \
+                and previous.result.cost.size == self.maze.cell_index_size:
+            # keep showing the last solver's flood until this one's arrives
+            self.flooder.set_maze(self.maze)
+            self.flooder.result.copy_from(previous.result)
+        self.needs_flood = True
+        self.update_overlays()
 
     def show_arrows(self):
         self.display_arrows = True
+        self.arrow_layer.setVisible(True)
 
     def hide_arrows(self):
         self.display_arrows = False
+        self.arrow_layer.setVisible(False)
 
     def show_costs(self):
         self.display_costs = True
+        self.cost_layer.setVisible(True)
 
     def hide_costs(self):
         self.display_costs = False
+        self.cost_layer.setVisible(False)
+
+    def show_heatmap(self):
+        self.display_heatmap = True
+        self.heatmap_layer.setVisible(True)
+        self.static_changed()
+
+    def hide_heatmap(self):
+        self.display_heatmap = False
+        self.heatmap_layer.setVisible(False)
+        self.static_changed()
+
+    def static_changed(self):
+        ''' redraw the whole static layer, when how it is drawn changes rather than the maze '''
+        self.maze_version += 1
+        self.static_dirty = None
+        self.update()
 
     def show_paths(self):
         self.display_paths = True
+        self.path_layer.setVisible(True)
 
     def hide_paths(self):
         self.display_paths = False
+        self.path_layer.setVisible(False)
 
     def cell_origin(self, cell_x, cell_y) -> QtCore.QPointF:
         cx = cell_x * self.cell_width + self.wall_width / 2
         cy = self.width - (cell_y + 1) * self.cell_width - self.wall_width / 2
         return QtCore.QPointF(cx, cy)
 
+    def cell_rect(self, cell_x, cell_y) -> QtCore.QRectF:
+        ''' the cell and the walls and posts around it, with a margin for the pens '''
+        return QtCore.QRectF(*self.geometry.cell_rects[self.geometry.cell_index(cell_x, cell_y)])
+
+    def wall_rect(self, cell_x, cell_y, direction) -> QtCore.QRectF:
+        ''' one wall and the posts at its ends, with a margin for the pens '''
+        margin = self.wall_width / 2
+        left = cell_x * self.cell_width
+        top = (self.maze_size - 1 - cell_y) * self.cell_width
+        length = self.cell_width + self.wall_width
+        if direction == Maze.East:
+            rect = QtCore.QRectF(left + self.cell_width, top, self.wall_width, length)
+        elif direction == Maze.West:
+            rect = QtCore.QRectF(left, top, self.wall_width, length)
+        elif direction == Maze.North:
+            rect = QtCore.QRectF(left, top, length, self.wall_width)
+        else:
+            rect = QtCore.QRectF(left, top + self.cell_width, length, self.wall_width)
+        return rect.adjusted(-margin, -margin, margin, margin)
+
+    def notes_font(self):
+        font = QFont()
+        font.setPixelSize(64)
+        return font
+
+    def notes_rect(self, row, text) -> QtCore.QRectF:
+        ''' the area of one line of the notes '''
+        metrics = QFontMetrics(self.notes_font())
+        top = self.maze_size * self.cell_width + self.wall_width + row * metrics.height()
+        return QtCore.QRectF(self.wall_width, top, metrics.horizontalAdvance(text), metrics.height()).adjusted(-4, 0, 4, metrics.descent() + 4)
+
     def cell_center(self, cell_x, cell_y) -> QtCore.QPointF:
-        return self.cell_origin(cell_x, cell_y) + QtCore.QPointF(self.cell_width / 2, self.cell_width / 2)
+        return QtCore.QPointF(*self.geometry.centres[self.geometry.cell_index(cell_x, cell_y)])
 
     def cell_top_center(self, cell_x, cell_y) -> QtCore.QPointF:
-        return self.cell_origin(cell_x, cell_y) + QtCore.QPointF(self.cell_width / 2, 0)
+        return QtCore.QPointF(*self.geometry.edge_points[Maze.North, self.geometry.cell_index(cell_x, cell_y)])
 
     def cell_left_center(self, cell_x, cell_y) -> QtCore.QPointF:
-        return self.cell_origin(cell_x, cell_y) + QtCore.QPointF(0, self.cell_width / 2)
+        return QtCore.QPointF(*self.geometry.edge_points[Maze.West, self.geometry.cell_index(cell_x, cell_y)])
 
     def cell_right_center(self, cell_x, cell_y) -> QtCore.QPointF:
-        return self.cell_origin(cell_x, cell_y) + QtCore.QPointF(self.cell_width, self.cell_width / 2)
+        return QtCore.QPointF(*self.geometry.edge_points[Maze.East, self.geometry.cell_index(cell_x, cell_y)])
 
     def cell_bottom_center(self, cell_x, cell_y) -> QtCore.QPointF:
-        return self.cell_origin(cell_x, cell_y) + QtCore.QPointF(self.cell_width / 2, self.cell_width)
+        return QtCore.QPointF(*self.geometry.edge_points[Maze.South, self.geometry.cell_index(cell_x, cell_y)])
+
+    def path_points(self):
+        ''' the points along the path line, from the start cell centre to the goal cell centre '''
+        path = self.flooder.path
+        if path is None:
+            return None
+        geometry = self.geometry
+        cells = path[:, 1] * self.maze_size + path[:, 0]
+        inner = cells[1:-1]
+        headings = self.flooder.result.heading[inner]
+        inner = inner[headings < Maze.Unknown]
+        edges = geometry.edge_points[headings[headings < Maze.Unknown], inner]
+        first = self.flooder.result.heading[cells[0]]
+        first = Maze.North if first == Maze.Unknown else first  # the start is a goal cell
+        start = [geometry.centres[cells[0]], geometry.edge_points[first, cells[0]]]
+        return to_points(np.concatenate([start, edges, geometry.centres[cells[-1:]]]))
+
+    def measure_path(self):
+        points = self.path_points()
+        if points is None:
+            return None
+        path_length = 0
+        for p1, p2 in zip(points[1:-2], points[2:-1]):
+            path_length += QtCore.QLineF(p1, p2).length()
+        return int(path_length) + self.cell_width  # add in the first and last half-cells
 
+    @timed()
     def paint_path(self, painter):
-        if self.flooder.path is None:
-            return
         if not self.display_paths:
             return
-        if self.flooder.get_cost_at(0, 0) == np.inf:
+        points = self.path_points()
+        if points is None:
             return
-        path_length = 0
         painter.save()
         painter.setPen(QPen(GREEN, self.wall_width / 2, QtCore.Qt.SolidLine, QtCore.Qt.RoundCap, QtCore.Qt.RoundJoin))
-        p0 = self.cell_center(0, 0)
-        p1 = self.cell_top_center(0, 0)
-        p2 = p1
-        painter.drawLine(p0, p1)
-        for x, y in self.flooder.path[1:-1]:
-            this_heading = self.flooder.get_heading(x, y)
-            if this_heading == Maze.North:
-                p2 = self.cell_top_center(x, y)
-            elif this_heading == Maze.East:
-                p2 = self.cell_right_center(x, y)
-            elif this_heading == Maze.South:
-                p2 = self.cell_bottom_center(x, y)
-            elif this_heading == Maze.West:
-                p2 = self.cell_left_center(x, y)
-            painter.drawLine(p1, p2)
-            path_length += QtCore.QLineF(p1,p2).length()
-            p1 = p2
-        x, y = self.flooder.path[-1]
-        painter.drawLine(p1, self.cell_center(x, y))
+        painter.drawPolyline(*points)
         painter.restore()
-        path_length = int(path_length) + self.cell_width # add in the first and last half-cells
-        return path_length
 
+    def cell_pixels(self, painter):
+        ''' how many device pixels a cell is wide with the painter's transform '''
+        return self.cell_width * QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+
+    def cost_text(self, cost, font):
+        '''
+        a prepared QStaticText for a cost and the offset that centres it in a cell.
+        Only the font size and the value matter, the colour comes from the pen.
+        '''
+        key = (cost, font.pixelSize())
+        glyph = self.glyphs.get(key)
+        if glyph is None:
+            text = QStaticText(str(cost))
+            text.setTextFormat(QtCore.Qt.PlainText)
+            text.prepare(font=font)
+            size = text.size()
+            glyph = (text, QPointF(size.width() / 2, size.height() / 2))
+            self.glyphs[key] = glyph
+        return glyph
+
+    @timed()
     def paint_costs(self, painter):
         if self.display_costs == False:
             return
         if self.flooder.path is None:
             return
-
+        if self.cell_pixels(painter) < MIN_TEXT_CELL_PIXELS:
+            return
         font = QFont()
         font.setPixelSize(int(self.cell_width / 3))
-        font_height = QFontMetrics(font).height()
         painter.save()
         painter.setFont(font)
-        painter.setPen(YELLOW)
-        painter.setBrush(BLACK)
-        for (x, y) in product(range(self.maze_size), repeat=2):
-            left = x * self.cell_width
-            top = self.width - y * self.cell_width - self.cell_width - self.wall_width
-            inner_rect = QtCore.QRect(left, top, self.cell_width, self.cell_width)
-            inner_rect.adjust(self.wall_width, self.wall_width, 0, 0)
-            cost = self.flooder.get_cost_at(x, y)
-            if [x, y] in self.flooder.path:
-                painter.setPen(YELLOW)
-            else:
-                painter.setPen(ORANGE)
-            if cost != np.inf:
-                painter.drawText(inner_rect, QtCore.Qt.AlignCenter, F"{cost}")
+        result = self.flooder.result
+        known = np.isfinite(result.cost)
+        for color, cells in [(YELLOW, known & result.path_mask), (ORANGE, known & ~result.path_mask)]:
+            painter.setPen(color)
+            cells = np.flatnonzero(cells)
+            costs = result.cost[cells].astype(np.int32).tolist()
+            for cost, point in zip(costs, self.geometry.text_centres[cells].tolist()):
+                text, centre = self.cost_text(cost, font)
+                painter.drawStaticText(QPointF(*point) - centre, text)
+        painter.restore()
+
+    @timed()
+    def paint_heatmap(self, painter):
+        '''
+        the costs as colours, one image pixel per cell stretched over the
+        maze under the walls. The image is only made again after a flood
+        '''
+        if not self.display_heatmap:
+            return
+        if self.heatmap_image is None:
+            self.heatmap_image = self.heatmap.update(self.flooder.result.cost, self.maze_size)
+        half_wall = self.wall_width / 2
+        target = QtCore.QRectF(half_wall, half_wall, self.maze_size * self.cell_width, self.maze_size * self.cell_width)
+        painter.save()
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, False)
+        painter.fillRect(self.base_rect, BLACK)  # under the cells with no cost
+        painter.drawImage(target, self.heatmap_image)
         painter.restore()
 
+    @timed()
     def paint_arrows(self, painter):
         if self.display_arrows == False:
             return
+        if self.cell_pixels(painter) < MIN_ARROW_CELL_PIXELS:
+            return
         painter.save()
         painter.setPen(QPen(YELLOW, self.wall_width / 2, QtCore.Qt.SolidLine, QtCore.Qt.RoundCap, QtCore.Qt.RoundJoin))
         # painter.setBrush(BLACK)
-        for (x, y) in product(range(self.maze_size), repeat=2):
-            left_x = x * self.cell_width + self.wall_width / 2 + 1 * self.cell_width / 4
-            mid_x = left_x + self.cell_width / 4
-            right_x = left_x + self.cell_width / 2
-            top_y = self.width - y * self.cell_width - self.cell_width - self.wall_width / 2 + self.cell_width / 4
-            mid_y = top_y + self.cell_width / 4
-            bottom_y = top_y + self.cell_width / 2
-            n = QPointF(mid_x, top_y)
-            e = QPointF(right_x, mid_y)
-            s = QPointF(mid_x, bottom_y)
-            w = QPointF(left_x, mid_y)
-            i = self.maze.get_cell_index(x, y)
-            if self.flooder.heading_map[i] == Maze.North:
-                Arrow.draw(painter, s, n)
-            elif self.flooder.heading_map[i] == Maze.East:
-                Arrow.draw(painter, w, e)
-            elif self.flooder.heading_map[i] == Maze.South:
-                Arrow.draw(painter, n, s)
-            elif self.flooder.heading_map[i] == Maze.West:
-                Arrow.draw(painter, e, w)
-            else:
-                pass
-
+        headings = self.flooder.result.heading
+        known = headings < Maze.Unknown
+        cells = np.flatnonzero(known)
+        lines = to_lines(self.geometry.arrow_lines[headings[known], cells].reshape(-1, 4))
+        painter.drawLines(lines)
         painter.restore()
 
+    def get_static_rects(self):
+        '''
+        the rectangles of the static layer for this version of the maze, as
+        lists of QRectF ready for drawRects. The cells are grouped by colour.
+        '''
+        if self.static_rects_version == self.maze_version:
+            return self.static_rects
+        geometry = self.geometry
+        walls = geometry.wall_rects(self.maze)
+
+        # cell colours in priority order, each cell only takes the first that applies
+        kind = np.where(self.maze.get_connectivity().unreachable_cells(), 1, 0)
+        for value, cells in [(2, self.maze.start), (3, self.maze.goals)]:
+            for x, y in cells:
+                if not self.maze.is_outside_maze(x, y):
+                    kind[geometry.cell_index(x, y)] = value
+        cells = []
+        for value, color in enumerate([BLACK, UNREACHABLE_COLOR, HOME_COLOR, GOAL_COLOR]):
+            rects = geometry.inner_rects[kind == value]
+            if len(rects):
+                cells.append((color, to_rects(rects)))
+
+        self.static_rects = {
+            'walls': to_rects(walls),
+            'posts': geometry.post_qrects,
+            'cells': cells,
+        }
+        self.static_rects_version = self.maze_version
+        return self.static_rects
+
+    @timed()
     def paint_posts(self, painter):
         painter.save()
         painter.setBrush(WALL_COLOR)
         painter.setPen(QPen(BLACK))
-        for (col, row) in product(range(self.maze_size + 1), repeat=2):
-            x = self.cell_width * col
-            y = self.cell_width * row
-            painter.drawRect(x, y, self.wall_width, self.wall_width)
+        painter.drawRects(self.get_static_rects()['posts'])
         painter.restore()
 
+    @timed()
     def paint_cells(self, painter):
         painter.save()
         painter.setPen(NO_PEN)
-        for (x, y) in product(range(self.maze_size), repeat=2):
-            left = x * self.cell_width
-            top = self.width - y * self.cell_width - self.cell_width - self.wall_width
-            inner_rect = QtCore.QRect(left, top, self.cell_width, self.cell_width)
-            inner_rect.adjust(self.wall_width, self.wall_width, 0, 0)
-            if self.maze.is_goal_cell(x, y):
-                painter.setBrush(GOAL_COLOR)
-            elif self.maze.is_home_cell(x, y):
-                painter.setBrush(HOME_COLOR)
-            else:
-                painter.setBrush(BLACK)
-            painter.drawRect(inner_rect)
+        for color, rects in self.get_static_rects()['cells']:
+            painter.setBrush(color)
+            painter.drawRects(rects)
         painter.restore()
 
+    @timed()
     def paint_walls(self, painter):
         if self.maze is None:
             return
-        painter.setBrush(QBrush(RED))
-        painter.setPen(QPen(NO_PEN))
-        for (x, y) in product(range(self.maze_size), repeat=2):
-            left = x * self.cell_width
-            top = self.width - y * self.cell_width - self.cell_width - self.wall_width
-            inner_rect = QtCore.QRect(left, top, self.cell_width, self.cell_width)
-            inner_rect.adjust(self.wall_width, self.wall_width, 0, 0)
-            painter.setBrush(WALL_COLOR)
-            painter.setPen(QPen(BLACK))
-            walls_here = self.maze.get_walls(x, y)
-            if walls_here & EAST_BIT:
-                wall_left = left + self.cell_width
-                wall_top = top + self.wall_width
-                wall_width = self.wall_width
-                wall_height = self.cell_width - self.wall_width
-                wall_rect = QtCore.QRectF(wall_left, wall_top, wall_width, wall_height)
-                painter.drawRect(wall_rect)
-            if walls_here & WEST_BIT:
-                wall_left = left
-                wall_top = top + self.wall_width
-                wall_width = self.wall_width
-                wall_height = self.cell_width - self.wall_width
-                wall_rect = QtCore.QRectF(wall_left, wall_top, wall_width, wall_height)
-                painter.drawRect(wall_rect)
-            if walls_here & SOUTH_BIT:
-                wall_left = left + self.wall_width
-                wall_top = top + self.cell_width
-                wall_width = self.cell_width - self.wall_width
-                wall_height = self.wall_width
-                wall_rect = QtCore.QRectF(wall_left, wall_top, wall_width, wall_height)
-                painter.drawRect(wall_rect)
-            if walls_here & NORTH_BIT:
-                wall_left = left + self.wall_width
-                wall_top = top
-                wall_width = self.cell_width - self.wall_width
-                wall_height = self.wall_width
-                wall_rect = QtCore.QRectF(wall_left, wall_top, wall_width, wall_height)
-                painter.drawRect(wall_rect)
+        painter.save()
+        painter.setBrush(WALL_COLOR)
+        painter.setPen(QPen(BLACK))
+        painter.drawRects(self.get_static_rects()['walls'])
+        painter.restore()
 
-    def paint_notes(self, painter):
-        ''' This will be where we display route metrics from a list of strings'''
-        if self.flooder.get_cost_at(0, 0) == np.inf:
-            self.notes = 'There is no path to the goal'
+    def notes_lines(self):
+        ''' the lines of route metrics shown under the maze '''
+        path = self.flooder.path
+        if path is None:
+            notes = 'There is no path to the goal'
         else:
-            self.notes = F'Simple Manhattan flood gives cell count to goal of {self.flooder.get_cost_at(0, 0)}'
+            notes = F'{self.solver_name} gives cell count to goal of {self.flooder.get_cost_at(*path[0]):.0f}'
             if self.path_length is not None:
-                self.notes += F' (path length = {self.path_length}mm)'
-        font = QFont()
-        font.setPixelSize(64)
+                notes += F' (path length = {self.path_length}mm)'
+            if isinstance(self.flooder, DualFlood):
+                notes += F', {np.count_nonzero(self.flooder.differs)} cells could still shorten it'
+        route_notes = ''
+        stats = self.route_stats
+        if self.track_routes and stats.length is not None:
+            route_notes = F'{stats.route_count} shortest routes, '
+            route_notes += F'{np.count_nonzero(stats.critical_cells)} critical cells, '
+            route_notes += F'{np.count_nonzero(stats.critical_walls)} critical walls, '
+            route_notes += F'{np.count_nonzero(stats.shortcut_walls)} shortcut walls'
+        if self.region_notes_version != self.maze_version:
+            regions = self.maze.get_connectivity()
+            self.region_notes = F'{regions.dead_end_count()} dead ends, {regions.loop_count()} loops, '
+            self.region_notes += F'{regions.isolated_area_count()} isolated areas'
+            self.region_notes_version = self.maze_version
+        return [notes, route_notes, self.region_notes]
+
+    @timed()
+    def paint_notes(self, painter):
+        ''' This will be where we display route metrics from a list of strings'''
+        lines = self.notes_lines()
+        self.notes = lines[0]
+        self.shown_notes = lines
+        font = self.notes_font()
         font_height = QFontMetrics(font).height()
         painter.setFont(font)
         painter.setPen(YELLOW)
-        painter.drawText(self.wall_width, self.maze_size * self.cell_width + self.wall_width + font_height, str(self.notes))
-
-    def paint(self, painter, *args):
-        if self.needs_flood:
-            self.flooder.set_maze(self.maze)
-            self.flooder.update()
-            self.needs_flood = False
-        painter.setBrush(DARK_GRAY)
-        painter.drawRect(self.base_rect)
-        self.paint_cells(painter)
+        bottom = self.maze_size * self.cell_width + self.wall_width
+        for row, line in enumerate(lines):
+            if line:
+                painter.drawText(self.wall_width, bottom + (row + 1) * font_height, line)
+
+    @timed()
+    def paint_static(self, painter):
+        ''' the parts of the maze that only change when it is edited '''
+        painter.save()
+        if not self.display_heatmap:  # which is drawn under the walls in place of the cells
+            painter.setBrush(DARK_GRAY)
+            painter.drawRect(self.base_rect)
+            self.paint_cells(painter)
         self.paint_posts(painter)
         self.paint_walls(painter)
-        self.paint_costs(painter)
-        self.paint_arrows(painter)
-        self.path_length  = self.paint_path(painter)
-        self.paint_notes(painter)
+        painter.restore()
 
-    def on_maze_click(self, pos, buttons, modifiers):
-        # self.notes = ''
+    def get_static_pixmap(self, scale):
+        ''' the static layer rendered at a given scale, or None if it would be too big '''
+        size = int(math.ceil(self.base_rect.width() * scale)) + 1
+        if size > MAX_CACHE_PIXMAP_SIZE:
+            return None
+        key = (self.maze_version, size)
+        if self.static_pixmap_key == key:
+            return self.static_pixmap
+        if self.static_pixmap_key is not None and self.static_pixmap_key[1] == size and self.static_dirty is not None:
+            # only redraw the parts of the pixmap that have been edited, in one clipped pass
+            region = QRegion()
+            for rect in self.static_dirty:
+                region += rect.toAlignedRect()
+            pixmap_painter = QPainter(self.static_pixmap)
+            pixmap_painter.scale(scale, scale)
+            pixmap_painter.setClipRegion(region)
+            self.paint_static(pixmap_painter)
+            pixmap_painter.end()
+        else:
+            shared_key = self.shared_static_key(size)
+            self.static_pixmap = QPixmapCache.find(shared_key)
+            if self.static_pixmap is None:
+                self.static_pixmap = QPixmap(size, size)
+                self.static_pixmap.fill(QtCore.Qt.transparent)
+                pixmap_painter = QPainter(self.static_pixmap)
+                pixmap_painter.scale(scale, scale)
+                self.paint_static(pixmap_painter)
+                pixmap_painter.end()
+                QPixmapCache.insert(shared_key, self.static_pixmap)
+        self.static_pixmap_key = key
+        self.static_dirty = []
+        return self.static_pixmap
+
+    def shared_static_key(self, size):
+        '''
+        the key of the static layer at a size in the global pixmap cache. It
+        depends only on what is drawn, so every item showing the same maze at
+        the same scale, or one going back to a maze and a zoom it has shown
+        before, uses the same pixmap. Edits paint into the item's own copy.
+        '''
+        if self.static_digest_version != self.maze_version:
+            digest = hashlib.blake2b(np.packbits(self.maze.walls).tobytes(), digest_size=16)
+            digest.update(repr((self.maze.size, self.maze.start, self.maze.goals, self.display_heatmap)).encode())
+            self.static_digest = digest.hexdigest()
+            self.static_digest_version = self.maze_version
+        return f'maze-static-{self.static_digest}-{size}'
+
+    def exposed_area(self, painter):
+        '''
+        the device pixels of the maze that are on show. The clip is left out,
+        as a small repaint blits a small part of the pixmap and is quick anyway
+        '''
+        exposed = QtCore.QRectF(0, 0, painter.device().width(), painter.device().height())
+        exposed &= painter.worldTransform().mapRect(QtCore.QRectF(self.base_rect))
+        return exposed.width() * exposed.height()
+
+    def draw_static_layer(self, painter):
+        if self.static_cache == CACHE_PIXMAP:
+            transform = painter.worldTransform()
+            scale = transform.m11()
+            side = self.base_rect.width() * scale
+            if not transform.isRotating() and side * side <= MAX_CACHE_PIXMAP_EXPOSURE * self.exposed_area(painter):
+                pixmap = self.get_static_pixmap(scale)
+                if pixmap is not None:
+                    size = pixmap.width() / scale
+                    painter.drawPixmap(QtCore.QRectF(0, 0, size, size), pixmap, QtCore.QRectF(pixmap.rect()))
+                    return
+        self.paint_static(painter)
+
+    @timed()
+    def paint(self, painter, *args):
+        ''' only the static layer, the overlays are drawn by the child layers '''
+        if self.maze is None:
+            return  # nothing to show until the first maze is loaded
+        self.draw_static_layer(painter)
+
+    def wall_at(self, pos, near_posts=True):
+        '''
+        the cell and direction of the inner wall nearest a scene position, or
+        None outside the maze or for the outer walls. With near_posts False a
+        position close to both a row and a column of walls gives None too, as
+        it is not clear which of them is meant.
+        '''
         x = int(pos.x())
         y = self.maze_size * self.cell_width - int(pos.y())
         cell_x = x // self.cell_width
         cell_y = y // self.cell_width
         if cell_x >= self.maze_size or cell_x < 0 or cell_y >= self.maze_size or cell_y < 0:
-            return
+            return None
         offset_x = x % self.cell_width
         offset_y = y % self.cell_width
-        cell_id = cell_x * self.maze_size + cell_y
-        # self.notes += F'Mouse: ({x},{y}) -> cell({cell_x},{cell_y})'
-        # self.notes += F' offset:({offset_x},{offset_y})'
-        self.is_modified = True
-        self.needs_flood = True
+        if not near_posts:
+            margin = self.cell_width / 4
+            if min(offset_x, self.cell_width - offset_x) < margin and min(offset_y, self.cell_width - offset_y) < margin:
+                return None
+        direction = None
+        if offset_y > offset_x:
+            if offset_y > self.cell_width - offset_x:
+                if cell_y < self.maze_size - 1:
+                    direction = Maze.North
+            else:
+                if cell_x > 0:
+                    direction = Maze.West
+        else:
+            if offset_y > self.cell_width - offset_x:
+                if cell_x < self.maze_size - 1:
+                    direction = Maze.East
+            else:
+                if cell_y > 0:
+                    direction = Maze.South
+        if direction is None:
+            return None
+        return cell_x, cell_y, direction
+
+    def on_maze_click(self, pos, buttons, modifiers):
+        '''
+        shift-click toggles a goal cell. A click toggles the nearest wall and
+        starts a stroke, which sets or clears walls the same way as the
+        mouse is dragged until it is released.
+        '''
+        if self.read_only or self.maze is None:
+            return
         if modifiers == QtCore.Qt.ShiftModifier:
+            x = int(pos.x())
+            y = self.maze_size * self.cell_width - int(pos.y())
+            cell_x = x // self.cell_width
+            cell_y = y // self.cell_width
+            if cell_x >= self.maze_size or cell_x < 0 or cell_y >= self.maze_size or cell_y < 0:
+                return
             goal = [cell_x, cell_y]
             if goal in self.maze.goals:
                 self.maze.goals.remove(goal)
             else:
                 self.maze.goals.append(goal)
-        elif buttons == QtCore.Qt.RightButton:
+            journal = self.edit_journal()
+            if journal is not None:
+                journal.record_goal(cell_x, cell_y, goal in self.maze.goals)
+            self.is_modified = True
+            self.maze_changed(self.cell_rect(cell_x, cell_y))
+            return
+        if buttons == QtCore.Qt.RightButton:
             # self.notes += ' - change target cell'
-            pass
-        else:
-            if offset_y > offset_x:
-                if offset_y > self.cell_width - offset_x:
-                    if cell_y < self.maze_size - 1:
-                        self.maze.toggle_wall(cell_x, cell_y, Maze.North)
-                else:
-                    if cell_x > 0:
-                        self.maze.toggle_wall(cell_x, cell_y, Maze.West)
-            else:
-                if offset_y > self.cell_width - offset_x:
-                    if cell_x < self.maze_size - 1:
-                        self.maze.toggle_wall(cell_x, cell_y, Maze.East)
-                else:
-                    if cell_y > 0:
-                        self.maze.toggle_wall(cell_x, cell_y, Maze.South)
-
-        self.update()
+            return
+        wall = self.wall_at(pos)
+        if wall is None:
+            return
+        self.maze.toggle_wall(*wall)
+        self.stroke = bool(self.maze.is_wall(*wall))
+        self.stroke_position = QPointF(pos)
+        self.stroke_edited(wall)
+
+    def on_maze_drag(self, pos, buttons, modifiers):
+        ''' carry on a stroke over every wall between the last position and this one '''
+        if self.stroke is None:
+            return
+        line = QtCore.QLineF(self.stroke_position, QPointF(pos))
+        self.stroke_position = QPointF(pos)
+        # look often enough along the line that a fast drag does not jump a wall
+        samples = max(1, int(line.length() / (self.cell_width / 4)))
+        for i in range(1, samples + 1):
+            wall = self.wall_at(line.pointAt(i / samples), near_posts=False)
+            if wall is None or bool(self.maze.is_wall(*wall)) == self.stroke:
+                continue
+            self.maze.wall(*wall, self.stroke, True)
+            self.stroke_edited(wall)
+
+    def on_maze_release(self):
+        ''' end a stroke with a flood of everything it changed '''
+        if self.stroke is None:
+            return
+        self.stroke = None
+        self.stroke_frame_timer.stop()
+        self.stroke_idle_timer.stop()
+        self.flood_stroke()
+
+    def stroke_edited(self, wall):
+        journal = self.edit_journal()
+        if journal is not None:
+            journal.record_wall(*wall, self.maze.is_wall(*wall))
+        self.is_modified = True
+        self.stroke_rects.append(self.wall_rect(*wall))
+        self.stroke_needs_flood = True
+        # show the first edit straight away and any more once per frame
+        if not self.stroke_frame_timer.isActive():
+            self.show_stroke()
+            self.stroke_frame_timer.start()
+        self.stroke_idle_timer.start()
+
+    def show_stroke(self):
+        ''' repaint the walls edited since the last frame, leaving the flood as it was '''
+        if self.stroke_rects:
+            rects = self.stroke_rects
+            self.stroke_rects = []
+            self.maze_changed(rects, flood=False)
+
+    def flood_stroke(self):
+        self.show_stroke()
+        if self.stroke_needs_flood:
+            self.stroke_needs_flood = False
+            self.reflood()
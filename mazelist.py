@@ -0,0 +1,331 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+# ============================================================================ #
+# Copyright (c) Peter Harrison 2022
+# License: MIT
+# description: The maze file list model and its indexed filename filter
+# python version >= 3.8
+# ============================================================================ #
+import heapq
+import os
+import re
+
+import numpy as np
+from PyQt5 import QtCore
+from PyQt5.QtCore import QAbstractListModel, QAbstractProxyModel, QModelIndex, QObject, pyqtSignal
+
+from corpus_index import FeatureTable, parse_query
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+SEPARATOR_PATTERN = re.compile(r'[^a-z0-9\n]+')
+GRAM_SIZE = 3  # the longest substring of a token that is indexed
+CODE_BASE = 0x110000  # one more than the largest code point, so a gram packs into an int64
+
+
+def name_key(name):
+    ''' the order of the list, by directory and then by file name '''
+    return name.split(os.sep)
+
+
+def gram_code(gram):
+    ''' a substring of up to GRAM_SIZE characters as one integer '''
+    code = 0
+    for i in range(GRAM_SIZE):
+        code = code * CODE_BASE + (ord(gram[i]) if i < len(gram) else 0)
+    return code
+
+
+class NameIndex:
+    """
+    A lowercase index of file names for filtering by keywords. Names are
+    split into tokens of letters and digits and every distinct token is
+    indexed by its substrings up to three long, packed into integers and
+    sorted so that the tokens holding one are found by a binary search.
+    A short keyword is then a single lookup, and a longer one is only
+    checked against the tokens that hold all of its trigrams rather than
+    against every name.
+
+    Keywords match anywhere in a name, ignoring case, as they always have.
+    When names are added or removed only the new names are tokenised.
+    """
+
+    def __init__(self, names):
+        self.names = []
+        self.tokens = []
+        self.token_ids = {}
+        # every (token, row) pair, so the rows holding a set of tokens come from one mask
+        self.occurrence_tokens = np.zeros(0, dtype=np.int32)
+        self.occurrence_rows = np.zeros(0, dtype=np.int32)
+        self.gram_codes = np.zeros(0, dtype=np.int64)
+        self.gram_tokens = np.zeros(0, dtype=np.int32)
+        self.move(names, np.zeros(0, dtype=np.int32))
+
+    def move(self, names, moved):
+        """
+        index a new list of names, where moved gives the row in it of each
+        name indexed so far, or -1 if it has gone. The rest are new.
+        """
+        kept = moved[self.occurrence_rows] >= 0
+        self.occurrence_tokens = self.occurrence_tokens[kept]
+        self.occurrence_rows = moved[self.occurrence_rows][kept]
+        added = np.ones(len(names), dtype=bool)
+        added[moved[moved >= 0]] = False
+        added = np.flatnonzero(added).astype(np.int32)
+        self.names = [name.lower() for name in names]
+        if len(added) == 0:
+            return
+        # one regular expression pass over all the new names splits them into tokens
+        spaced = SEPARATOR_PATTERN.sub(' ', '\n'.join(self.names[row] for row in added)).split('\n')
+        name_tokens = [line.split() for line in spaced]
+        first_new = len(self.tokens)
+        self.occurrence_tokens = np.concatenate([self.occurrence_tokens, np.array(
+            [self.token_ids.setdefault(token, len(self.token_ids)) for tokens in name_tokens for token in tokens],
+            dtype=np.int32)])
+        self.occurrence_rows = np.concatenate([self.occurrence_rows,
+                                               np.repeat(added, [len(tokens) for tokens in name_tokens])])
+        self.tokens = list(self.token_ids)
+        self.add_grams(first_new)
+
+    def add_grams(self, first_new):
+        ''' index the substrings of the tokens from first_new on '''
+        tokens = np.array(self.tokens[first_new:], dtype=str)
+        if len(tokens) == 0:
+            return
+        # the code points of each token in a row, padded with zeros
+        chars = tokens.view(np.uint32).reshape(len(tokens), tokens.itemsize // 4)
+        chars = np.pad(chars, ((0, 0), (0, GRAM_SIZE - 1))).astype(np.int64)
+        codes = []
+        token_ids = []
+        for n in range(1, GRAM_SIZE + 1):
+            for i in range(chars.shape[1] - GRAM_SIZE + 1):
+                code = np.zeros(len(tokens), dtype=np.int64)
+                for j in range(GRAM_SIZE):
+                    code = code * CODE_BASE + (chars[:, i + j] if j < n else 0)
+                whole = chars[:, i + n - 1] != 0  # grams running off the end of a token are not indexed
+                codes.append(code[whole])
+                token_ids.append(np.flatnonzero(whole).astype(np.int32) + first_new)
+        codes = np.concatenate(codes)
+        token_ids = np.concatenate(token_ids)
+        order = np.argsort(codes, kind='stable')
+        # merged into the sorted grams already indexed by one pass of insertions
+        places = np.searchsorted(self.gram_codes, codes[order])
+        self.gram_codes = np.insert(self.gram_codes, places, codes[order])
+        self.gram_tokens = np.insert(self.gram_tokens, places, token_ids[order])
+
+    def __len__(self):
+        return len(self.names)
+
+    def gram_tokens_mask(self, gram):
+        ''' a mask of the tokens containing a substring of up to GRAM_SIZE characters '''
+        code = gram_code(gram)
+        begin, end = np.searchsorted(self.gram_codes, [code, code + 1])
+        held = np.zeros(len(self.tokens), dtype=bool)
+        held[self.gram_tokens[begin:end]] = True
+        return held
+
+    def matching_tokens(self, part):
+        ''' a mask of the tokens containing a run of letters and digits '''
+        if len(part) <= GRAM_SIZE:
+            return self.gram_tokens_mask(part)
+        wanted = np.ones(len(self.tokens), dtype=bool)
+        for i in range(len(part) - GRAM_SIZE + 1):
+            wanted &= self.gram_tokens_mask(part[i:i + GRAM_SIZE])
+        for token_id in np.flatnonzero(wanted).tolist():
+            wanted[token_id] = part in self.tokens[token_id]
+        return wanted
+
+    def search(self, text):
+        ''' the rows, in order, of the names containing every keyword in some text '''
+        shown = np.ones(len(self.names), dtype=bool)
+        for keyword in text.lower().split():
+            parts = TOKEN_PATTERN.findall(keyword)
+            for part in parts:
+                held = np.zeros(len(self.names), dtype=bool)
+                held[self.occurrence_rows[self.matching_tokens(part)[self.occurrence_tokens]]] = True
+                shown &= held
+            if parts != [keyword]:
+                # a keyword with punctuation in it can run across tokens so check the names themselves
+                for row in np.flatnonzero(shown).tolist():
+                    shown[row] = keyword in self.names[row]
+        return np.flatnonzero(shown).astype(np.int32)
+
+
+class MazeListModel(QAbstractListModel):
+    """
+    The names of the maze files in the list, with their thumbnails as
+    decorations. Thumbnails are looked up when a row is drawn, so one
+    arriving only needs dataChanged for its own row.
+
+    Names added or removed by update_names keep the list in order without
+    a reset, and names_changed gives the new row of every old one, or -1 if
+    it was removed, so that a proxy can follow along.
+    """
+    names_changed = pyqtSignal(object)
+
+    def __init__(self, thumbnails=None, parent=None):
+        super().__init__(parent)
+        self.thumbnails = thumbnails
+        self.names = []
+        self.rows = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.names)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        name = self.names[index.row()]
+        if role == QtCore.Qt.DisplayRole:
+            return name
+        if role == QtCore.Qt.DecorationRole and self.thumbnails is not None:
+            return self.thumbnails.icon(name)
+        return None
+
+    def set_names(self, names):
+        self.beginResetModel()
+        self.names = [str(name) for name in names]
+        self.rows = {name: row for row, name in enumerate(self.names)}
+        self.endResetModel()
+
+    def update_names(self, added, removed):
+        removed = set(removed)
+        added = sorted((name for name in set(added) if name not in self.rows), key=name_key)
+        if not added and not removed.intersection(self.rows):
+            return
+        kept = [name for name in self.names if name not in removed]
+        names = list(heapq.merge(kept, added, key=name_key))
+        rows = {name: row for row, name in enumerate(names)}
+        moved = np.array([rows.get(name, -1) for name in self.names], dtype=np.int32)
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        self.names = names
+        self.rows = rows
+        self.changePersistentIndexList(persistent, [self.index(int(moved[index.row()])) if moved[index.row()] >= 0
+                                                    else QModelIndex() for index in persistent])
+        self.layoutChanged.emit()
+        self.names_changed.emit(moved)
+
+    def name_at(self, row):
+        return self.names[row]
+
+    def row_of(self, name):
+        return self.rows.get(name, -1)
+
+    def thumbnail_ready(self, name, icon):
+        row = self.row_of(name)
+        if row >= 0:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [QtCore.Qt.DecorationRole])
+
+
+class MazeFilterModel(QAbstractProxyModel):
+    """
+    The rows of a MazeListModel whose names contain every keyword of the
+    filter and whose features, from the corpus index, satisfy every field
+    term in it, such as path>100. The rows shown are kept in a sorted numpy array, so mapping
+    between the proxy and the source is an array lookup one way and a
+    binary search the other.
+
+    QSortFilterProxyModel would call back into python for every row on
+    every change of the filter, which is too slow for a large list.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.index_of_names = NameIndex([])
+        self.feature_entries = {}
+        self.features = FeatureTable([], {})
+        self.filter_text = ''
+        self.rows = np.zeros(0, dtype=np.int32)
+
+    def setSourceModel(self, model):
+        super().setSourceModel(model)
+        model.modelReset.connect(self.source_reset)
+        model.dataChanged.connect(self.source_data_changed)
+        model.names_changed.connect(self.source_names_changed)
+        self.source_reset()
+
+    def source_reset(self):
+        self.index_of_names = NameIndex(self.sourceModel().names)
+        self.features = FeatureTable(self.sourceModel().names, self.feature_entries)
+        self.set_filter(self.filter_text)
+
+    def source_data_changed(self, top_left, bottom_right, roles):
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            index = self.mapFromSource(self.sourceModel().index(row))
+            if index.isValid():
+                self.dataChanged.emit(index, index, roles)
+
+    def source_names_changed(self, moved):
+        ''' follow names added to or removed from the source, keeping the selection and the scroll position '''
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        source_rows = [int(moved[self.rows[index.row()]]) for index in persistent]
+        names = self.sourceModel().names
+        self.index_of_names.move(names, moved)
+        self.features = self.features.moved(names, moved, self.feature_entries)
+        self.rows = self.filtered_rows()
+        self.changePersistentIndexList(persistent, [self.mapFromSource(self.sourceModel().index(row))
+                                                    for row in source_rows])
+        self.layoutChanged.emit()
+
+    def set_features(self, entries, updated=None):
+        '''
+        take the entries of a corpus index, where only the names in updated
+        have changed unless it is None. The filter is not applied again until set_filter
+        '''
+        self.feature_entries = entries
+        if updated is None or len(self.features) != len(self.sourceModel().names):
+            self.features = FeatureTable(self.sourceModel().names, entries)
+            return
+        rows = [self.sourceModel().row_of(name) for name in updated]
+        self.features.set_rows([row for row in rows if row >= 0], entries)
+
+    def set_filter(self, text):
+        self.beginResetModel()
+        self.filter_text = text
+        self.rows = self.filtered_rows()
+        self.endResetModel()
+
+    def filtered_rows(self):
+        keywords, terms = parse_query(self.filter_text)
+        rows = self.index_of_names.search(keywords)
+        if terms:
+            rows = rows[self.features.matches(terms)[rows]]
+        return rows
+
+    def name_at(self, row):
+        return self.sourceModel().name_at(int(self.rows[row]))
+
+    def row_of(self, name):
+        index = self.mapFromSource(self.sourceModel().index(self.sourceModel().row_of(name)))
+        return index.row()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 1
+
+    def index(self, row, column=0, parent=QModelIndex()):
+        if parent.isValid() or column != 0 or not 0 <= row < len(self.rows):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=None):
+        if index is None:
+            return QObject.parent(self)  # the QObject parent, not the parent of an index
+        return QModelIndex()
+
+    def mapToSource(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        return self.sourceModel().index(int(self.rows[index.row()]))
+
+    def mapFromSource(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        row = int(np.searchsorted(self.rows, index.row()))
+        if row < len(self.rows) and self.rows[row] == index.row():
+            return self.createIndex(row, 0)
+        return QModelIndex()
@@ -13,6 +13,8 @@ from PyQt5 import QtCore, QtGui, QtWidgets
 class MazeView(QtWidgets.QGraphicsView):
     # photoClicked = QtCore.pyqtSignal(QtCore.QPoint)
     maze_clicked = QtCore.pyqtSignal(QtCore.QPoint, int, int)
+    maze_dragged = QtCore.pyqtSignal(QtCore.QPoint, int, int)
+    maze_released = QtCore.pyqtSignal()
 
     def __init__(self, parent):
         super(MazeView, self).__init__(parent)
@@ -86,6 +88,17 @@ class MazeView(QtWidgets.QGraphicsView):
 
     # END def fake_left_mouse_button_event
 
+    def mouseMoveEvent(self, event):
+        """
+        dragging with the left button carries on editing the maze
+        @param event: the event
+        @type event: object
+        """
+        if not self.panning and event.buttons() & QtCore.Qt.MouseButton.LeftButton:
+            pos = self.mapToScene(event.pos()).toPoint()
+            self.maze_dragged.emit(pos, event.buttons(), event.modifiers())
+        super(MazeView, self).mouseMoveEvent(event)
+
     def mouseReleaseEvent(self, event):
         """
         @param event: the event
@@ -95,4 +108,6 @@ class MazeView(QtWidgets.QGraphicsView):
             self.panning = False
             self.setDragMode(QtWidgets.QGraphicsView.NoDrag)
             # event = self.fake_left_mouse_button_event(event)
+        elif event.button() == QtCore.Qt.MouseButton.LeftButton:
+            self.maze_released.emit()
         super(MazeView, self).mouseReleaseEvent(event)
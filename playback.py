@@ -0,0 +1,293 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+# ============================================================================ #
+# Copyright (c) Peter Harrison 2022
+# License: MIT
+# description: Playback of simulated mouse exploration runs over a maze
+# python version >= 3.8
+# ============================================================================ #
+import numpy as np
+from PyQt5 import QtCore
+from PyQt5.QtCore import QElapsedTimer, QObject, QPointF, QTimer, pyqtSignal
+from PyQt5.QtGui import QPolygonF
+from PyQt5.QtWidgets import QGraphicsItem
+
+from flooding import neighbour_table, wavefront
+from maze import Maze
+from mazeitem import NO_PEN, WHITE
+
+FRAME_RATE = 60  # frames per second while playing
+FRAME_INTERVAL_MS = 1000 // FRAME_RATE
+READOUT_INTERVAL_MS = 250  # how often the frame times are reported
+BEHIND_FACTOR = 1.5  # frames this much longer than the interval count as falling behind
+DEFAULT_SPEED = 20  # cells per second
+MOUSE_COLOR = WHITE
+
+
+def explored_maze(maze):
+    """
+    a maze of the same size with the same start and goal cells that only
+    has its outer walls, as a mouse knows it before it starts
+    """
+    explored = Maze(maze.size)
+    explored.start = [list(cell) for cell in maze.start]
+    explored.goals = [list(cell) for cell in maze.goals]
+    for i in range(maze.size):
+        explored.set_wall(maze.size - 1, i, Maze.East)
+        explored.set_wall(i, maze.size - 1, Maze.North)
+    return explored
+
+
+def sense_walls(maze, explored, x, y):
+    """
+    mark the walls around a cell as known in the explored maze.
+    Returns the newly seen walls as (x, y, direction, present)
+    """
+    seen = []
+    for direction in range(4):
+        if explored.is_known_wall(x, y, direction):
+            continue
+        present = bool(maze.is_wall(x, y, direction))
+        explored.wall(x, y, direction, present, True)
+        seen.append((x, y, direction, present))
+    return seen
+
+
+def record_run(maze, max_steps=None):
+    """
+    simulate a mouse searching a maze from the start to the goal and back
+    again. It only knows the walls of the cells it has been in and treats
+    the rest as open, so it heads for the target by the cell count through
+    the maze as it knows it, going straight on when there is a choice.
+
+    Returns the steps of the run as (x, y, heading, walls), where walls
+    are the walls first seen in that cell as given by sense_walls
+    """
+    explored = explored_maze(maze)
+    cells = maze.cell_index_size
+    max_steps = max_steps or 4 * cells
+    neighbours = np.empty((4, cells), dtype=np.int32)
+    dist = np.empty(cells, dtype=np.int32)
+    start = maze.start[:1] or [[0, 0]]
+    x, y = start[0]
+    heading = Maze.North
+    steps = [(x, y, heading, sense_walls(maze, explored, x, y))]
+    for targets in [maze.goals, start]:
+        seeds = [maze.get_cell_index(tx, ty) for tx, ty in targets if not maze.is_outside_maze(tx, ty)]
+        cell = maze.get_cell_index(x, y)
+        flooded = False
+        while seeds and cell not in seeds and len(steps) < max_steps:
+            # a new wall only changes the costs if it cuts a step down the costs
+            stale = not flooded
+            for wx, wy, direction, present in steps[-1][3]:
+                if present and not stale:
+                    a = maze.get_cell_index(wx, wy)
+                    b = neighbours[direction, a]
+                    stale = b >= 0 and abs(dist[a] - dist[b]) == 1
+            neighbour_table(explored, out=neighbours)
+            if stale:
+                wavefront(neighbours, seeds, dist)
+                flooded = True
+            best = None
+            for turn in (0, 1, 3, 2):  # ahead, left, right then back
+                direction = (heading + turn) % 4
+                next_cell = neighbours[direction, cell]
+                if next_cell >= 0 and dist[next_cell] >= 0:
+                    if best is None or dist[next_cell] < dist[best[1]]:
+                        best = (direction, next_cell)
+            if best is None:
+                return steps  # the target cannot be reached
+            heading, cell = best
+            x, y = cell % maze.size, cell // maze.size
+            steps.append((x, y, heading, sense_walls(maze, explored, x, y)))
+    return steps
+
+
+class MouseSprite(QGraphicsItem):
+    """
+    The simulated mouse. It is drawn once into its own device cache and
+    then only moved and turned, so a frame does not redraw it.
+    """
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.radius = 0
+        self.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
+        self.setAcceptedMouseButtons(QtCore.Qt.NoButton)
+
+    def set_cell_width(self, cell_width):
+        self.prepareGeometryChange()
+        self.radius = cell_width * 0.3
+
+    def boundingRect(self):
+        r = self.radius + 1
+        return QtCore.QRectF(-r, -r, 2 * r, 2 * r)
+
+    def paint(self, painter, *args):
+        ''' an arrow head pointing east, turned by the rotation '''
+        r = self.radius
+        painter.setPen(NO_PEN)
+        painter.setBrush(MOUSE_COLOR)
+        painter.drawPolygon(QPolygonF([QPointF(r, 0), QPointF(-0.7 * r, -0.8 * r), QPointF(-0.7 * r, 0.8 * r)]))
+
+    def move_to(self, centre, heading):
+        self.setPos(centre)
+        self.setRotation(-90 * heading)  # headings turn anticlockwise, rotations clockwise
+
+
+class Playback(QObject):
+    """
+    Plays a recorded run over a MazeItem. While a run is shown the item
+    holds a maze with only the walls seen so far, and each frame applies
+    the steps that are due at the current speed and then floods once.
+    Only the walls and cells that changed are repainted.
+
+    frame_timed reports the mean and worst time between frames in ms, and
+    whether the display is falling behind the frame rate.
+    """
+    position_changed = pyqtSignal(int)
+    playing_changed = pyqtSignal(bool)
+    frame_timed = pyqtSignal(float, float, bool)
+
+    def __init__(self, item, parent=None):
+        super().__init__(parent)
+        self.item = item
+        self.sprite = MouseSprite(item)
+        self.sprite.hide()
+        self.steps = []
+        self.position = 0  # the steps up to and including this one have been applied
+        self.original = None  # the maze being edited, put back when the run stops
+        self.original_modified = False
+        self.explored = None
+        self.blank = None  # the explored maze before the first step
+        self.speed = DEFAULT_SPEED
+        self.due = 0.0  # steps owed by the timer but not applied yet
+        self.timer = QTimer(self)
+        self.timer.setTimerType(QtCore.Qt.PreciseTimer)
+        self.timer.setInterval(FRAME_INTERVAL_MS)
+        self.timer.timeout.connect(self.on_frame)
+        self.frame_clock = QElapsedTimer()
+        self.readout_clock = QElapsedTimer()
+        self.frame_times = []
+
+    @property
+    def active(self):
+        return self.original is not None
+
+    @property
+    def playing(self):
+        return self.timer.isActive()
+
+    @property
+    def last_position(self):
+        return max(0, len(self.steps) - 1)
+
+    def start(self, maze):
+        ''' record a run of a maze and show its first step '''
+        self.stop()
+        self.original = maze
+        self.original_modified = self.item.is_modified
+        self.steps = record_run(maze)
+        self.explored = explored_maze(maze)
+        self.blank = explored_maze(maze)
+        # counting the routes through a half explored maze costs more than the rest of a frame
+        self.item.track_routes = False
+        self.item.set_maze(self.explored)
+        self.item.read_only = True
+        self.sprite.set_cell_width(self.item.cell_width)
+        self.sprite.show()
+        self.position = 0
+        self.item.maze_changed(self.apply_steps(0, 1))
+        self.move_sprite()
+        self.position_changed.emit(self.position)
+
+    def stop(self):
+        ''' put the edited maze back '''
+        self.pause()
+        if not self.active:
+            return
+        self.sprite.hide()
+        self.item.read_only = False
+        self.item.track_routes = True
+        self.item.set_maze(self.original)
+        self.item.is_modified = self.original_modified
+        self.original = None
+        self.explored = None
+        self.blank = None
+        self.steps = []
+
+    def play(self):
+        if not self.active or self.playing:
+            return
+        if self.position == self.last_position:
+            self.seek(0)
+        self.due = 0.0
+        self.frame_times = []
+        self.frame_clock.start()
+        self.readout_clock.start()
+        self.timer.start()
+        self.playing_changed.emit(True)
+
+    def pause(self):
+        if not self.playing:
+            return
+        self.timer.stop()
+        self.playing_changed.emit(False)
+
+    def set_speed(self, cells_per_second):
+        self.speed = cells_per_second
+
+    def seek(self, position):
+        ''' show the run as it was after a step, going back by replaying from the start '''
+        if not self.active:
+            return
+        position = min(max(position, 0), self.last_position)
+        if position == self.position:
+            return
+        if position > self.position:
+            rects = self.apply_steps(self.position + 1, position + 1)
+            if rects:
+                self.item.maze_changed(rects)
+        else:
+            np.copyto(self.explored.walls, self.blank.walls)
+            np.copyto(self.explored.knowns, self.blank.knowns)
+            self.explored.connectivity = None
+            self.apply_steps(0, position + 1)
+            self.item.maze_changed()
+        self.position = position
+        self.move_sprite()
+        self.position_changed.emit(position)
+
+    def apply_steps(self, begin, end):
+        ''' add the walls seen in some steps to the explored maze and return their rectangles '''
+        rects = []
+        for _, _, _, walls in self.steps[begin:end]:
+            for x, y, direction, present in walls:
+                self.explored.wall(x, y, direction, present, True)
+                if present:
+                    rects.append(self.item.wall_rect(x, y, direction))
+        return rects
+
+    def move_sprite(self):
+        x, y, heading, _ = self.steps[self.position]
+        self.sprite.move_to(self.item.cell_center(x, y), heading)
+
+    def on_frame(self):
+        interval = self.frame_clock.restart()
+        self.frame_times.append(interval)
+        self.due += interval * self.speed / 1000
+        count = int(self.due)
+        self.due -= count
+        if count:
+            self.seek(self.position + count)
+        if self.position == self.last_position:
+            self.pause()
+        if self.readout_clock.elapsed() >= READOUT_INTERVAL_MS:
+            self.report_frame_times()
+
+    def report_frame_times(self):
+        mean = sum(self.frame_times) / len(self.frame_times)
+        behind = mean > FRAME_INTERVAL_MS * BEHIND_FACTOR
+        self.frame_timed.emit(mean, max(self.frame_times), behind)
+        self.frame_times = []
+        self.readout_clock.restart()
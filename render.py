@@ -0,0 +1,197 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+# ============================================================================ #
+# Copyright (c) Peter Harrison 2022
+# License: MIT
+# description: Headless batch rendering of maze files to PNG or SVG images
+# usage: $ python render.py [--out images] [--format png|svg] [--paths] [mazefiles ...]
+# python version >= 3.8
+# ============================================================================ #
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# draw off screen unless told otherwise, the workers inherit this
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5 import QtCore
+from PyQt5.QtGui import QImage, QPainter
+from PyQt5.QtWidgets import QApplication
+
+import mazeitem
+from corpuswatcher import MAZE_SUFFIXES
+from maze import MAZE_FILE_ERRORS, Maze
+from mazeitem import MazeItem
+
+THUMBNAIL_SIZE = 128  # pixels across a thumbnail
+FULL_SIZE = 0  # pixels across a full size image, 0 for one pixel per scene unit
+
+# every colour the maze and path are drawn in. Qt's PNG encoder is slow, so
+# images are written with this palette, which is several times quicker than
+# writing full colour images and makes smaller files
+PALETTE = [color.rgb() for color in [
+    mazeitem.BLACK, mazeitem.DARK_GRAY, mazeitem.GOAL_COLOR, mazeitem.HOME_COLOR,
+    mazeitem.UNREACHABLE_COLOR, mazeitem.WALL_COLOR, mazeitem.GREEN,
+]]
+
+
+class MazeRenderer:
+    """
+    Draws mazes into images with the MazeItem painting code, without a scene
+    or a window. One renderer keeps a single MazeItem so the geometry tables
+    and glyphs it builds are reused for every maze of the same size.
+    """
+
+    def __init__(self, paths=False):
+        self.item = MazeItem()
+        self.paths = paths
+        if paths:
+            self.item.show_paths()
+
+    def set_maze(self, maze):
+        self.item.set_maze(maze)
+        if self.paths:
+            self.item.ensure_flood()
+
+    def draw(self, painter, size):
+        ''' draw the current maze scaled to size pixels across '''
+        scale = size / self.item.width
+        painter.save()
+        if scale < 1:
+            # walls thinner than a pixel disappear without antialiasing
+            painter.setRenderHint(QPainter.Antialiasing)
+        painter.scale(scale, scale)
+        self.item.paint_static(painter)
+        if self.paths:
+            self.item.paint_path(painter)
+        painter.restore()
+
+    def image_size(self, size):
+        return size if size > 0 else self.item.width
+
+    def to_image(self, size):
+        size = self.image_size(size)
+        image = QImage(size, size, QImage.Format_RGB32)
+        image.fill(mazeitem.DARK_GRAY)
+        painter = QPainter(image)
+        self.draw(painter, size)
+        painter.end()
+        return image
+
+    def save_png(self, filename, size):
+        image = self.to_image(size)
+        if self.image_size(size) >= self.item.width:
+            # only images drawn without antialiasing fit the palette
+            image = image.convertToFormat(QImage.Format_Indexed8, PALETTE, QtCore.Qt.ThresholdDither | QtCore.Qt.AvoidDither)
+        return image.save(str(filename), 'PNG')
+
+    def save_svg(self, filename, size):
+        from PyQt5.QtSvg import QSvgGenerator  # only needed for SVG output
+        size = self.image_size(size)
+        generator = QSvgGenerator()
+        generator.setFileName(str(filename))
+        generator.setSize(QtCore.QSize(size, size))
+        generator.setViewBox(QtCore.QRect(0, 0, size, size))
+        generator.setTitle(Path(filename).stem)
+        painter = QPainter(generator)
+        self.draw(painter, size)
+        painter.end()
+        return True
+
+
+# each worker process has its own application and renderer
+_app = None
+_renderer = None
+
+
+def init_worker(paths):
+    global _app, _renderer
+    _app = QApplication.instance() or QApplication(sys.argv[:1])
+    _renderer = MazeRenderer(paths)
+
+
+def render_file(job):
+    """
+    render one maze file as a full size image and a thumbnail.
+    Returns the number of images written, or an error message
+    """
+    source, full_name, thumb_name, file_format, full_size, thumb_size = job
+    try:
+        with open(source, 'r') as file:
+            maze = Maze.parse_maze_file(file)
+    except MAZE_FILE_ERRORS as error:
+        return f'{source}: {error}'
+    _renderer.set_maze(maze)
+    save = _renderer.save_svg if file_format == 'svg' else _renderer.save_png
+    written = 0
+    for filename, size in [(full_name, full_size), (thumb_name, thumb_size)]:
+        if filename is None:
+            continue
+        Path(filename).parent.mkdir(parents=True, exist_ok=True)
+        if save(filename, size):
+            written += 1
+    return written
+
+
+def find_maze_files(sources):
+    """ maze files under each source directory, as (file, name relative to the source) """
+    for source in sources:
+        source = Path(source)
+        if source.is_file():
+            yield source, Path(source.name)
+            continue
+        # the same files as the editor lists
+        for filename in sorted(source.rglob('*')):
+            if not filename.name.endswith(MAZE_SUFFIXES) or not filename.is_file():
+                continue
+            if filename.name.lower() == 'readme.txt':
+                continue
+            yield filename, filename.relative_to(source)
+
+
+def make_jobs(args):
+    jobs = []
+    out = Path(args.out)
+    for source, name in find_maze_files(args.sources):
+        name = name.with_suffix('.' + args.format)
+        full_name = None if args.no_full else out / 'full' / name
+        thumb_name = None if args.no_thumbnails else out / 'thumbnails' / name
+        jobs.append((str(source), full_name, thumb_name, args.format, args.full_size, args.thumbnail_size))
+    return jobs
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Render maze files to images without opening a window')
+    parser.add_argument('sources', nargs='*', default=['mazefiles'], help='maze files or directories of them')
+    parser.add_argument('--out', default='images', help='directory for the images')
+    parser.add_argument('--format', choices=['png', 'svg'], default='png')
+    parser.add_argument('--paths', action='store_true', help='draw the shortest path')
+    parser.add_argument('--full-size', type=int, default=FULL_SIZE, help='pixels across full size images')
+    parser.add_argument('--thumbnail-size', type=int, default=THUMBNAIL_SIZE, help='pixels across thumbnails')
+    parser.add_argument('--no-full', action='store_true', help='only write thumbnails')
+    parser.add_argument('--no-thumbnails', action='store_true', help='only write full size images')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='worker processes, 1 to render in this process')
+    args = parser.parse_args(argv)
+
+    jobs = make_jobs(args)
+    start_time = time.perf_counter()
+    if args.jobs == 1:
+        init_worker(args.paths)
+        results = [render_file(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(args.jobs, initializer=init_worker, initargs=(args.paths,)) as pool:
+            results = list(pool.map(render_file, jobs, chunksize=8))
+    elapsed = time.perf_counter() - start_time
+
+    images = sum(result for result in results if isinstance(result, int))
+    for result in results:
+        if isinstance(result, str):
+            print(result, file=sys.stderr)
+    print(f'{images} images from {len(jobs)} mazes in {elapsed:.2f}s ({images / max(elapsed, 1e-9):.1f} images/s)')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
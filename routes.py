@@ -0,0 +1,173 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+# ============================================================================ #
+# Copyright (c) Peter Harrison 2022
+# License: MIT
+# description: Statistics of the shortest routes through a maze
+# usage: $ python routes.py mazefile.txt
+# python version >= 3.8
+# ============================================================================ #
+import sys
+import numpy as np
+
+from maze import Maze
+from flooding import neighbour_table, wavefront
+
+
+class RouteStats:
+    """
+    Counts the shortest routes from the start to the goal region and finds
+    the cells and walls that decide the length of those routes.
+
+    Two floods are used, one from the start and one from the goals. A cell is
+    on a shortest route when its two costs add up to the optimal length.
+    Route counts are kept as python integers so that they cannot overflow.
+    """
+
+    def __init__(self, maze=None):
+        self.maze = None
+        self.length = None  # cell count of the optimal route, None if there is no route
+        self.route_count = 0
+        self.from_start = None
+        self.to_goal = None
+        self.on_route = None  # cells on at least one shortest route
+        self.critical_cells = None  # cells on every shortest route
+        self.critical_walls = None  # adding a wall here makes the optimal route longer
+        self.shortcut_walls = None  # removing this wall makes the optimal route shorter
+        if maze is not None:
+            self.set_maze(maze)
+
+    def set_maze(self, maze):
+        self.maze = maze
+        cells = maze.cell_index_size
+        self.from_start = np.full(cells, -1, dtype=np.int32)
+        self.to_goal = np.full(cells, -1, dtype=np.int32)
+
+    def start_cells(self):
+        start = self.maze.start if self.maze.start else [[0, 0]]
+        return [self.maze.get_cell_index(x, y) for x, y in start]
+
+    def goal_cells(self):
+        return [self.maze.get_cell_index(x, y) for x, y in self.maze.goals]
+
+    def update(self):
+        if self.maze is None:
+            return
+        maze = self.maze
+        neighbours = neighbour_table(maze)
+        start_levels = wavefront(neighbours, self.start_cells(), self.from_start)
+        goals = self.goal_cells()
+        goal_levels = wavefront(neighbours, goals, self.to_goal) if goals else []
+        if not goals:
+            self.to_goal.fill(-1)
+
+        reached = self.from_start >= 0
+        reached_goals = [g for g in goals if reached[g]]
+        self.length = int(self.from_start[reached_goals].min()) if reached_goals else None
+        self.shortcut_walls = self._find_shortcuts()
+        if self.length is None:
+            self.route_count = 0
+            self.on_route = np.zeros(maze.cell_index_size, dtype=bool)
+            self.critical_cells = np.zeros(maze.cell_index_size, dtype=bool)
+            self.critical_walls = np.zeros(maze.wall_index_size, dtype=bool)
+            return
+
+        routes_from_start = self._count_routes(neighbours, self.from_start, start_levels)
+        routes_to_goal = self._count_routes(neighbours, self.to_goal, goal_levels)
+        self.route_count = sum(routes_from_start[g] for g in reached_goals if self.from_start[g] == self.length)
+
+        self.on_route = reached & (self.to_goal >= 0) & (self.from_start + self.to_goal == self.length)
+        cells = np.flatnonzero(self.on_route)
+        through = routes_from_start[cells] * routes_to_goal[cells]
+        self.critical_cells = np.zeros(maze.cell_index_size, dtype=bool)
+        self.critical_cells[cells[through == self.route_count]] = True
+        self.critical_walls = self._find_critical_walls(routes_from_start, routes_to_goal)
+
+    @staticmethod
+    def _count_routes(neighbours, dist, levels):
+        """
+        count the shortest routes reaching each cell, one level at a time.
+        Every cell in a level adds up the counts of its neighbours in the level before
+        """
+        counts = np.zeros(dist.size, dtype=object)
+        if not levels:
+            return counts
+        counts[levels[0]] = 1
+        for level, layer in enumerate(levels[1:], start=1):
+            previous = neighbours[:, layer]
+            # blocked moves index the last cell but are masked out here
+            ok = (previous >= 0) & (dist[previous] == level - 1)
+            counts[layer] = np.where(ok, counts[previous], 0).sum(axis=0)
+        return counts
+
+    def _wall_pairs(self):
+        """ the two cells either side of every inner wall, in wall index order """
+        size = self.maze.size
+        cells = np.arange(self.maze.cell_index_size)
+        x = cells % size
+        y = cells // size
+        east = np.where(x < size - 1, cells + 1, -1)
+        north = np.where(y < size - 1, cells + size, -1)
+        first = np.concatenate([cells, cells])
+        second = np.concatenate([east, north])
+        return first, second
+
+    def _find_shortcuts(self):
+        first, second = self._wall_pairs()
+        inner = second >= 0
+        shortcut = np.zeros(self.maze.wall_index_size, dtype=bool)
+        limit = np.inf if self.length is None else self.length
+        from_start = np.where(self.from_start >= 0, self.from_start, np.inf)
+        to_goal = np.where(self.to_goal >= 0, self.to_goal, np.inf)
+        a = first[inner]
+        b = second[inner]
+        via = np.minimum(from_start[a] + 1 + to_goal[b], from_start[b] + 1 + to_goal[a])
+        shortcut[np.flatnonzero(inner)] = self.maze.walls[inner] & (via < limit)
+        return shortcut
+
+    def _find_critical_walls(self, routes_from_start, routes_to_goal):
+        first, second = self._wall_pairs()
+        critical = np.zeros(self.maze.wall_index_size, dtype=bool)
+        walls = np.flatnonzero((second >= 0) & ~self.maze.walls)
+        walls = walls[self.on_route[first[walls]] & self.on_route[second[walls]]]
+        a = first[walls]
+        b = second[walls]
+        # orient each passage so that it leads away from the start
+        swap = self.from_start[b] < self.from_start[a]
+        a, b = np.where(swap, b, a), np.where(swap, a, b)
+        step = self.from_start[a] + 1 == self.from_start[b]
+        through = routes_from_start[a[step]] * routes_to_goal[b[step]]
+        critical[walls[step][through == self.route_count]] = True
+        return critical
+
+    def is_forgiving(self):
+        """ a maze is forgiving when no single wall decides the optimal route """
+        return self.length is not None and not self.critical_walls.any()
+
+    def __str__(self):
+        if self.length is None:
+            return 'no route to the goal'
+        return f'length: {self.length}\n' + \
+               f'routes: {self.route_count}\n' + \
+               f'cells on a route: {np.count_nonzero(self.on_route)}\n' + \
+               f'critical cells: {np.count_nonzero(self.critical_cells)}\n' + \
+               f'critical walls: {np.count_nonzero(self.critical_walls)}\n' + \
+               f'shortcut walls: {np.count_nonzero(self.shortcut_walls)}'
+
+
+# ============================================================================ #
+# example
+if __name__ == "__main__":
+    # check arguments
+    if len(sys.argv) < 2:
+        print('please specify a maze file.')
+        sys.exit(1)
+
+    # read maze file
+    with open(sys.argv[1], 'r') as file:
+        maze = Maze.parse_maze_file(file)
+
+    stats = RouteStats(maze)
+    stats.update()
+    print(maze)
+    print(stats)
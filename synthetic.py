@@ -0,0 +1,83 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+# ============================================================================ #
+# Copyright (c) Peter Harrison 2022
+# License: MIT
+# description: Generates random mazes of any size for testing and benchmarks
+# usage: $ python synthetic.py size [loops] [seed] > mazefile.txt
+# python version >= 3.8
+# ============================================================================ #
+import sys
+import numpy as np
+
+from maze import Maze
+
+
+def random_maze(size, loops=0.0, seed=None):
+    """
+    generate a perfect maze with a randomised depth first search and then
+    remove a fraction of the remaining inner walls to make loops.
+    The start is in the south west corner and the goal is the centre of the maze.
+
+    :returns: Maze object
+    """
+    rng = np.random.default_rng(seed)
+    maze = Maze(size)
+    cells = maze.cell_index_size
+    maze.walls[:] = True
+    maze.knowns[:] = True
+    visited = np.zeros(cells, dtype=bool)
+    stack = np.zeros(cells, dtype=np.int32)
+    choices = rng.random(cells)
+    walls = maze.walls
+    top = 0
+    visited[0] = True
+    picks = 0
+    while top >= 0:
+        cell = stack[top]
+        x = cell % size
+        options = []
+        if x < size - 1 and not visited[cell + 1]:
+            options.append((cell + 1, cell))
+        if cell < cells - size and not visited[cell + size]:
+            options.append((cell + size, cells + cell))
+        if x > 0 and not visited[cell - 1]:
+            options.append((cell - 1, cell - 1))
+        if cell >= size and not visited[cell - size]:
+            options.append((cell - size, cells + cell - size))
+        if not options:
+            top -= 1
+            continue
+        next_cell, wall = options[int(choices[picks % cells] * len(options))]
+        picks += 1
+        walls[wall] = False
+        visited[next_cell] = True
+        top += 1
+        stack[top] = next_cell
+
+    if loops > 0:
+        index = np.arange(maze.wall_index_size)
+        inner = np.where(index < cells, index % size < size - 1, index < 2 * cells - size)
+        walls[inner & (rng.random(maze.wall_index_size) < loops)] = False
+
+    maze.start = [[0, 0]]
+    middle = size // 2
+    if size % 2:
+        maze.goals = [[middle, middle]]
+    else:
+        maze.goals = [[x, y] for x in (middle - 1, middle) for y in (middle - 1, middle)]
+    return maze
+
+
+# ============================================================================ #
+# example
+if __name__ == "__main__":
+    # check arguments
+    if len(sys.argv) < 2:
+        print('please specify a maze size.')
+        sys.exit(1)
+
+    size = int(sys.argv[1])
+    loops = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    print(random_maze(size, loops, seed).get_maze_string(), end='')
@@ -0,0 +1,32 @@
+"""
+Tests of the command line search of the corpus index.
+"""
+import shutil
+from pathlib import Path
+
+import corpus_index
+
+MAZE_FILES = Path(__file__).parent / 'mazefiles'
+
+
+def test_main_lists_unreadable_files(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv('MAZE_EDITOR_CACHE', str(tmp_path / 'cache'))
+    root = tmp_path / 'mazes'
+    root.mkdir()
+    shutil.copy(MAZE_FILES / 'classic' / '000-empty.txt', root)
+    (root / 'empty.txt').write_text('')  # cannot be parsed
+    corpus_index.main(['--root', str(root), '--jobs', '1'])
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].startswith('000-empty.txt size=16 ')
+    assert lines[1] == 'empty.txt unreadable'
+
+
+def test_terms_leave_out_unreadable_files(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv('MAZE_EDITOR_CACHE', str(tmp_path / 'cache'))
+    root = tmp_path / 'mazes'
+    root.mkdir()
+    shutil.copy(MAZE_FILES / 'classic' / '000-empty.txt', root)
+    (root / 'empty.txt').write_text('')
+    corpus_index.main(['--root', str(root), '--jobs', '1', 'size=16'])
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 1 and lines[0].startswith('000-empty.txt ')
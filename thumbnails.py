@@ -0,0 +1,175 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+# ============================================================================ #
+# Copyright (c) Peter Harrison 2022
+# License: MIT
+# description: Maze thumbnails drawn on worker threads and cached on disk
+# python version >= 3.8
+# ============================================================================ #
+import os
+from collections import OrderedDict
+
+from PyQt5 import QtCore
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice, QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QIcon, QImage, QPainter, QPen, QPixmap
+
+from diskcache import cache_path, write_atomic
+from geometry import geometry_for, to_rects
+from maze import MAZE_FILE_ERRORS, Maze
+from mazeitem import BLACK, DARK_GRAY, GOAL_COLOR, HOME_COLOR, NO_PEN, WALL_COLOR
+
+THUMBNAIL_SIZE = 64  # pixels across a thumbnail in the maze list
+ICON_CACHE_SIZE = 1024  # thumbnails kept in memory, a few screens of the list at about 16KB each
+
+
+def draw_thumbnail(maze, size):
+    """
+    draw a maze into a small image. This only uses QImage and QPainter so it
+    is safe to call away from the GUI thread.
+    """
+    geometry = geometry_for(maze.size)
+    image = QImage(size, size, QImage.Format_RGB32)
+    image.fill(DARK_GRAY)
+    painter = QPainter(image)
+    painter.scale(size / geometry.width, size / geometry.width)
+    painter.setPen(NO_PEN)
+    painter.setBrush(BLACK)
+    painter.drawRect(QtCore.QRectF(0, 0, geometry.width, geometry.width))
+    for color, cells in [(HOME_COLOR, maze.start), (GOAL_COLOR, maze.goals)]:
+        painter.setBrush(color)
+        for x, y in cells:
+            if not maze.is_outside_maze(x, y):
+                painter.drawRect(QtCore.QRectF(*geometry.inner_rects[geometry.cell_index(x, y)]))
+    # a one pixel outline keeps walls that are much thinner than a pixel visible
+    painter.setPen(QPen(WALL_COLOR, 0))
+    painter.setBrush(WALL_COLOR)
+    painter.drawRects(to_rects(geometry.wall_rects(maze)))
+    painter.end()
+    return image
+
+
+def load_thumbnail(source, size):
+    """
+    the thumbnail of a maze file from the disk cache, drawing and caching it
+    first if needed. Returns a null QImage if the file cannot be read
+    """
+    cached = cache_path(f'thumbnails-{size}', source, '.png')
+    if cached is not None and cached.exists():
+        image = QImage(str(cached))
+        if not image.isNull():
+            return image
+    try:
+        with open(source, 'r') as file:
+            maze = Maze.parse_maze_file(file)
+    except MAZE_FILE_ERRORS:
+        return QImage()
+    image = draw_thumbnail(maze, size)
+    if cached is not None:
+        data = QByteArray()
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.WriteOnly)
+        image.save(buffer, 'PNG')
+        buffer.close()
+        try:
+            write_atomic(cached, bytes(data))
+        except OSError:
+            pass  # the thumbnail is still shown, it is just made again next time
+    return image
+
+
+class ThumbnailSignals(QObject):
+    ready = pyqtSignal(str, QImage)
+
+
+class ThumbnailTask(QRunnable):
+    """ loads or draws one thumbnail on a pool thread """
+
+    def __init__(self, name, source, size, signals):
+        super().__init__()
+        self.name = name
+        self.source = source
+        self.size = size
+        self.signals = signals
+        self.setAutoDelete(False)  # the loader keeps it so that it can be cancelled
+
+    def run(self):
+        self.signals.ready.emit(self.name, load_thumbnail(self.source, self.size))
+
+
+class ThumbnailLoader(QObject):
+    """
+    Hands out thumbnails of maze files by name. Thumbnails that are not in
+    memory yet are requested from a thread pool and thumbnail_ready is
+    emitted on the GUI thread when each one arrives. Only the most recently
+    used ICON_CACHE_SIZE are kept. A file that cannot be read is given an
+    empty icon, so it is not asked for again until it changes.
+    """
+    thumbnail_ready = pyqtSignal(str, QIcon)
+
+    def __init__(self, size=THUMBNAIL_SIZE, parent=None):
+        super().__init__(parent)
+        self.size = size
+        self.icons = OrderedDict()  # by name, least recently used first
+        self.queued = {}  # tasks not finished yet, by name
+        self.signals = ThumbnailSignals()
+        self.signals.ready.connect(self.on_ready)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(1, QThreadPool.globalInstance().maxThreadCount() - 1))
+
+    def icon(self, name):
+        icon = self.icons.get(name)
+        if icon is not None:
+            self.icons.move_to_end(name)
+        return icon
+
+    def request(self, name, source):
+        """ start loading a thumbnail unless it is already loaded or on its way """
+        if name in self.icons or name in self.queued:
+            return
+        task = ThumbnailTask(name, str(source), self.size, self.signals)
+        self.queued[name] = task
+        self.pool.start(task)
+
+    def forget(self, name, source, info):
+        """
+        drop the thumbnail of a file that has changed or gone, from memory and
+        from the disk cache. info is the stat result of the file it was drawn from
+        """
+        self.icons.pop(name, None)
+        task = self.queued.pop(name, None)
+        if task is not None:
+            self.pool.tryTake(task)
+        cached = cache_path(f'thumbnails-{self.size}', source, '.png', info)
+        if cached is not None:
+            try:
+                os.unlink(cached)
+            except OSError:
+                pass
+
+    def cancel_except(self, names):
+        """ drop the requests that have not started for any names not given """
+        for name in list(self.queued):
+            if name not in names and self.pool.tryTake(self.queued[name]):
+                del self.queued[name]
+
+    def on_ready(self, name, image):
+        if self.queued.pop(name, None) is None:
+            return  # forgotten while it was being drawn
+        if image.isNull():
+            self.remember(name, QIcon())
+            return
+        icon = QIcon(QPixmap.fromImage(image))
+        self.remember(name, icon)
+        self.thumbnail_ready.emit(name, icon)
+
+    def remember(self, name, icon):
+        self.icons[name] = icon
+        self.icons.move_to_end(name)
+        while len(self.icons) > ICON_CACHE_SIZE:
+            self.icons.popitem(last=False)
+
+    def stop(self):
+        """ drop the waiting requests and wait for the running ones """
+        self.pool.clear()
+        self.pool.waitForDone()
+        self.queued.clear()
@@ -0,0 +1,80 @@
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+# ============================================================================ #
+# Copyright (c) Peter Harrison 2022
+# License: MIT
+# description: A dock showing the rolling timings of painting and flooding
+# python version >= 3.8
+# ============================================================================ #
+from PyQt5 import QtCore, QtWidgets
+from PyQt5.QtWidgets import QDockWidget, QHeaderView, QTableWidget, QTableWidgetItem
+
+from instrumentation import TIMINGS
+
+REFRESH_MS = 500  # how often the table is brought up to date while it is shown
+COLUMNS = ['Routine', 'Calls', 'p50', 'p95', 'Max']
+
+
+class TimingsDock(QDockWidget):
+    """
+    Shows the count, median, 95th percentile and worst time of each timed
+    routine over the calls held in its ring buffer. Recording is turned on
+    and off with the dock, so the routines are only timed while it is shown.
+    """
+
+    def __init__(self, parent=None, timings=TIMINGS):
+        super().__init__('Timings (ms)', parent)
+        self.setObjectName('timings_dock')
+        # only the menu opens and closes the dock so that recording follows it
+        self.setFeatures(QDockWidget.DockWidgetMovable | QDockWidget.DockWidgetFloatable)
+        self.timings = timings
+
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels(COLUMNS)
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().hide()
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        clear_button = QtWidgets.QPushButton('Clear')
+        clear_button.clicked.connect(self.clear)
+        layout = QtWidgets.QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.table)
+        layout.addWidget(clear_button)
+        contents = QtWidgets.QWidget()
+        contents.setLayout(layout)
+        self.setWidget(contents)
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(REFRESH_MS)
+        self.timer.timeout.connect(self.refresh)
+
+    def set_recording(self, recording):
+        ''' show the dock and time the routines, or hide it and stop '''
+        self.timings.enabled = recording
+        self.setVisible(recording)
+        if recording:
+            self.timer.start()
+            self.refresh()
+        else:
+            self.timer.stop()
+
+    def clear(self):
+        self.timings.clear()
+        self.refresh()
+
+    def refresh(self):
+        stats = self.timings.summary()
+        self.table.setRowCount(len(stats))
+        for row, (name, values) in enumerate(stats.items()):
+            cells = [name, str(values['count'])] + [f"{values[key]:.2f}" for key in ('p50', 'p95', 'max')]
+            for column, text in enumerate(cells):
+                item = self.table.item(row, column)
+                if item is None:
+                    item = QTableWidgetItem()
+                    if column:
+                        item.setTextAlignment(QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter)
+                    self.table.setItem(row, column, item)
+                item.setText(text)
+        # keep every column in view as the routine names come in
+        self.table.resizeColumnsToContents()
+        self.table.setMinimumWidth(self.table.horizontalHeader().length() + 2 * self.table.frameWidth())